@@ -1,134 +1,322 @@
 #!/usr/bin/env python3
 """
 Shopping Cart Management
-Handles cart operations with JSON file-based persistence.
+Handles cart operations with SQLite-based persistence.
 """
 
+import asyncio
 import json
 import os
-from typing import List, Dict, Any, Optional
+import sqlite3
+import threading
+from operator import itemgetter, mul
+from typing import List, Dict, Any, Optional, Tuple, Union
 from utils.logger import setup_logger
 
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib encoder
+    orjson = None
+
 logger = setup_logger(__name__)
 
+# One row per cart line; the primary key is the line's identity in the cart,
+# and rowid keeps the order lines were added in
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cart (
+    user_id INTEGER NOT NULL,
+    product_id TEXT NOT NULL,
+    size TEXT NOT NULL,
+    quantity INTEGER NOT NULL,
+    price NUMERIC NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (user_id, product_id, size)
+)
+"""
+
+# Legacy JSON cart files already moved into the cart table
+_IMPORTED_SCHEMA = """
+CREATE TABLE IF NOT EXISTS imported_files (
+    file_name TEXT PRIMARY KEY
+)
+"""
+
+_UPSERT_ITEM = """
+INSERT INTO cart (user_id, product_id, size, quantity, price, data)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (user_id, product_id, size)
+DO UPDATE SET quantity = quantity + excluded.quantity
+"""
+
+# Column accessors used to total a cart without a Python-level loop
+_get_price = itemgetter('price')
+_get_quantity = itemgetter('quantity')
+
+
+def _cart_total(cart_items: List[Dict[str, Any]]) -> float:
+    """Sum price * quantity over the price and quantity columns"""
+    return sum(
+        map(mul, map(_get_price, cart_items), map(_get_quantity, cart_items)))
+
+
+def _cart_stats(cart_items: List[Dict[str, Any]]) -> Tuple[int, int, float]:
+    """Return (unique products, item count, total price) for a cart"""
+    return (len(cart_items), sum(map(_get_quantity, cart_items)),
+            _cart_total(cart_items))
+
+
+def _dumps(item: Dict[str, Any]) -> str:
+    """Encode a cart item as JSON text"""
+    if orjson is not None:
+        return orjson.dumps(item).decode('utf-8')
+    return json.dumps(item, ensure_ascii=False)
+
+
+def _loads(data: Union[str, bytes]) -> Any:
+    """Decode JSON text, such as a stored cart item"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _size_key(size: Optional[str]) -> str:
+    """Key column value for a size; items without a size share one key"""
+    return '' if size is None else str(size)
+
+
+def _item_row(user_id: int, item: Dict[str, Any]) -> Tuple:
+    """Build the cart table row for an item"""
+    return (user_id, item['product_id'], _size_key(item['size']),
+            item['quantity'], item['price'], _dumps(item))
+
+
 class CartManager:
-    """Manages shopping cart operations with file-based persistence"""
-    
+    """Manages shopping cart operations with SQLite-based persistence
+
+    The public methods are coroutines that run the database work in a
+    worker thread, so a slow disk never stalls the bot's event loop. The
+    blocking implementations are kept as the matching ``_*_sync`` methods.
+    """
+
     def __init__(self, cart_data_dir: str = "cart_data"):
         self.cart_data_dir = cart_data_dir
         # Ensure cart data directory exists
         os.makedirs(self.cart_data_dir, exist_ok=True)
-    
-    def _get_cart_file_path(self, user_id: int) -> str:
-        """Get the file path for a user's cart"""
-        return os.path.join(self.cart_data_dir, f"cart_{user_id}.json")
-    
-    def get_cart(self, user_id: int) -> List[Dict[str, Any]]:
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(self.cart_data_dir, "carts.db"),
+                                     isolation_level=None,
+                                     check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(_SCHEMA)
+        self._conn.execute(_IMPORTED_SCHEMA)
+        self._import_json_carts()
+
+    def _import_json_carts(self):
+        """Move carts saved by the old JSON backend into the database
+
+        Imported files are recorded in the database rather than renamed,
+        so files tracked in git stay untouched and are never imported twice.
+        """
+        with self._lock:
+            imported = {name for name, in self._conn.execute(
+                "SELECT file_name FROM imported_files")}
+        for file_name in os.listdir(self.cart_data_dir):
+            if not (file_name.startswith("cart_") and file_name.endswith(".json")):
+                continue
+            if file_name in imported:
+                continue
+            cart_file = os.path.join(self.cart_data_dir, file_name)
+            try:
+                user_id = int(file_name[len("cart_"):-len(".json")])
+                with open(cart_file, 'rb') as f:
+                    cart_items = _loads(f.read())
+                with self._lock:
+                    self._conn.execute("BEGIN")
+                    try:
+                        self._conn.executemany(
+                            _UPSERT_ITEM,
+                            [_item_row(user_id, item) for item in cart_items])
+                        self._conn.execute(
+                            "INSERT INTO imported_files (file_name) VALUES (?)",
+                            (file_name,))
+                        self._conn.execute("COMMIT")
+                    except Exception:
+                        self._conn.execute("ROLLBACK")
+                        raise
+                logger.info("Imported JSON cart for user %s: %d items", user_id, len(cart_items))
+            except Exception as e:
+                logger.error("Error importing cart file %s: %s", file_name, e)
+
+    def _get_cart_sync(self, user_id: int) -> List[Dict[str, Any]]:
         """Get cart items for a user"""
-        cart_file = self._get_cart_file_path(user_id)
-        
         try:
-            if os.path.exists(cart_file):
-                with open(cart_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT data, quantity FROM cart WHERE user_id = ? ORDER BY rowid",
+                    (user_id,)).fetchall()
+        except sqlite3.Error as e:
+            logger.error("Error loading cart for user %s: %s", user_id, e)
             return []
+
+        cart_items = []
+        for data, quantity in rows:
+            item = _loads(data)
+            item['quantity'] = quantity
+            cart_items.append(item)
+        return cart_items
+
+    def _save_cart_sync(self, user_id: int, cart_items: List[Dict[str, Any]]) -> bool:
+        """Replace the cart items for a user"""
+        try:
+            with self._lock:
+                self._conn.execute("BEGIN")
+                try:
+                    self._conn.execute("DELETE FROM cart WHERE user_id = ?", (user_id,))
+                    self._conn.executemany(
+                        _UPSERT_ITEM, [_item_row(user_id, item) for item in cart_items])
+                    self._conn.execute("COMMIT")
+                except Exception:
+                    self._conn.execute("ROLLBACK")
+                    raise
+            logger.info("Cart saved for user %s: %d items", user_id, len(cart_items))
+            return True
         except Exception as e:
-            logger.error(f"Error loading cart for user {user_id}: {e}")
-            return []
-    
-    def save_cart(self, user_id: int, cart_items: List[Dict[str, Any]]) -> bool:
-        """Save cart items for a user"""
-        cart_file = self._get_cart_file_path(user_id)
-        
+            logger.error("Error saving cart for user %s: %s", user_id, e)
+            return False
+
+    def _add_to_cart_sync(self, user_id: int, item: Dict[str, Any]) -> bool:
+        """Add an item to user's cart, merging it with the same product and size"""
         try:
-            with open(cart_file, 'w', encoding='utf-8') as f:
-                json.dump(cart_items, f, ensure_ascii=False, indent=2)
-            logger.info(f"Cart saved for user {user_id}: {len(cart_items)} items")
+            with self._lock:
+                self._conn.execute(_UPSERT_ITEM, _item_row(user_id, item))
+            logger.info("Added product %s to cart of user %s", item['product_id'], user_id)
             return True
         except Exception as e:
-            logger.error(f"Error saving cart for user {user_id}: {e}")
+            logger.error("Error adding to cart for user %s: %s", user_id, e)
             return False
-    
-    def add_to_cart(self, user_id: int, item: Dict[str, Any]) -> bool:
-        """Add an item to user's cart"""
-        cart_items = self.get_cart(user_id)
-        
-        # Check if item already exists in cart
-        existing_item = None
-        for cart_item in cart_items:
-            if (cart_item['product_id'] == item['product_id'] and 
-                cart_item['size'] == item['size']):
-                existing_item = cart_item
-                break
-        
-        if existing_item:
-            # Update quantity
-            existing_item['quantity'] += item['quantity']
-            logger.info(f"Updated quantity for product {item['product_id']} in cart of user {user_id}")
-        else:
-            # Add new item
-            cart_items.append(item)
-            logger.info(f"Added new product {item['product_id']} to cart of user {user_id}")
-        
-        return self.save_cart(user_id, cart_items)
-    
-    def remove_from_cart(self, user_id: int, product_id: str, size: str) -> bool:
+
+    def _remove_from_cart_sync(self, user_id: int, product_id: str, size: str) -> bool:
         """Remove an item from user's cart"""
-        cart_items = self.get_cart(user_id)
-        
-        # Find and remove the item
-        cart_items = [
-            item for item in cart_items 
-            if not (item['product_id'] == product_id and item['size'] == size)
-        ]
-        
-        logger.info(f"Removed product {product_id} (size {size}) from cart of user {user_id}")
-        return self.save_cart(user_id, cart_items)
-    
-    def update_quantity(self, user_id: int, product_id: str, size: str, new_quantity: int) -> bool:
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "DELETE FROM cart WHERE user_id = ? AND product_id = ? AND size = ?",
+                    (user_id, product_id, _size_key(size)))
+        except sqlite3.Error as e:
+            logger.error("Error removing from cart for user %s: %s", user_id, e)
+            return False
+
+        logger.info("Removed product %s (size %s) from cart of user %s", product_id, size, user_id)
+        return True
+
+    def _update_quantity_sync(self, user_id: int, product_id: str, size: str, new_quantity: int) -> bool:
         """Update quantity of an item in user's cart"""
-        cart_items = self.get_cart(user_id)
-        
-        for item in cart_items:
-            if item['product_id'] == product_id and item['size'] == size:
+        key = (user_id, product_id, _size_key(size))
+        try:
+            with self._lock:
                 if new_quantity <= 0:
                     # Remove item if quantity is 0 or negative
-                    return self.remove_from_cart(user_id, product_id, size)
+                    cursor = self._conn.execute(
+                        "DELETE FROM cart WHERE user_id = ? AND product_id = ? AND size = ?",
+                        key)
                 else:
-                    item['quantity'] = new_quantity
-                    logger.info(f"Updated quantity of product {product_id} to {new_quantity} for user {user_id}")
-                    return self.save_cart(user_id, cart_items)
-        
-        logger.warning(f"Product {product_id} (size {size}) not found in cart of user {user_id}")
-        return False
-    
-    def clear_cart(self, user_id: int) -> bool:
+                    cursor = self._conn.execute(
+                        "UPDATE cart SET quantity = ? "
+                        "WHERE user_id = ? AND product_id = ? AND size = ?",
+                        (new_quantity,) + key)
+        except sqlite3.Error as e:
+            logger.error("Error updating cart for user %s: %s", user_id, e)
+            return False
+
+        if cursor.rowcount == 0:
+            logger.warning("Product %s (size %s) not found in cart of user %s", product_id, size, user_id)
+            return False
+
+        if new_quantity <= 0:
+            logger.info("Removed product %s (size %s) from cart of user %s", product_id, size, user_id)
+        else:
+            logger.info("Updated quantity of product %s to %s for user %s", product_id, new_quantity, user_id)
+        return True
+
+    def _clear_cart_sync(self, user_id: int) -> bool:
         """Clear all items from user's cart"""
-        return self.save_cart(user_id, [])
-    
-    def get_cart_total(self, user_id: int) -> float:
+        return self._save_cart_sync(user_id, [])
+
+    def _get_stats(self, user_id: int) -> Tuple[int, int, float]:
+        """Get (unique products, item count, total price) for a user's cart"""
+        try:
+            with self._lock:
+                return self._conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(quantity), 0), "
+                    "COALESCE(SUM(price * quantity), 0) "
+                    "FROM cart WHERE user_id = ?", (user_id,)).fetchone()
+        except sqlite3.Error as e:
+            logger.error("Error totalling cart for user %s: %s", user_id, e)
+            return 0, 0, 0
+
+    def _get_cart_total_sync(self, user_id: int) -> float:
         """Calculate total price of items in user's cart"""
-        cart_items = self.get_cart(user_id)
-        total = sum(item['price'] * item['quantity'] for item in cart_items)
-        return total
-    
-    def get_cart_item_count(self, user_id: int) -> int:
+        return self._get_stats(user_id)[2]
+
+    def _get_cart_item_count_sync(self, user_id: int) -> int:
         """Get total number of items in user's cart"""
-        cart_items = self.get_cart(user_id)
-        return sum(item['quantity'] for item in cart_items)
-    
-    def is_cart_empty(self, user_id: int) -> bool:
+        return self._get_stats(user_id)[1]
+
+    def _is_cart_empty_sync(self, user_id: int) -> bool:
         """Check if user's cart is empty"""
-        cart_items = self.get_cart(user_id)
-        return len(cart_items) == 0
-    
-    def get_cart_summary(self, user_id: int) -> Dict[str, Any]:
+        return self._get_stats(user_id)[0] == 0
+
+    def _get_cart_summary_sync(self, user_id: int) -> Dict[str, Any]:
         """Get a summary of user's cart"""
-        cart_items = self.get_cart(user_id)
-        
+        cart_items = self._get_cart_sync(user_id)
+        unique_products, item_count, total_price = _cart_stats(cart_items)
+
         return {
             'items': cart_items,
-            'item_count': sum(item['quantity'] for item in cart_items),
-            'total_price': sum(item['price'] * item['quantity'] for item in cart_items),
-            'unique_products': len(cart_items)
+            'item_count': item_count,
+            'total_price': total_price,
+            'unique_products': unique_products
         }
+
+    async def get_cart(self, user_id: int) -> List[Dict[str, Any]]:
+        """Get cart items for a user"""
+        return await asyncio.to_thread(self._get_cart_sync, user_id)
+
+    async def save_cart(self, user_id: int, cart_items: List[Dict[str, Any]]) -> bool:
+        """Replace the cart items for a user"""
+        return await asyncio.to_thread(self._save_cart_sync, user_id, cart_items)
+
+    async def add_to_cart(self, user_id: int, item: Dict[str, Any]) -> bool:
+        """Add an item to user's cart, merging it with the same product and size"""
+        return await asyncio.to_thread(self._add_to_cart_sync, user_id, item)
+
+    async def remove_from_cart(self, user_id: int, product_id: str, size: str) -> bool:
+        """Remove an item from user's cart"""
+        return await asyncio.to_thread(self._remove_from_cart_sync, user_id, product_id, size)
+
+    async def update_quantity(self, user_id: int, product_id: str, size: str, new_quantity: int) -> bool:
+        """Update quantity of an item in user's cart"""
+        return await asyncio.to_thread(
+            self._update_quantity_sync, user_id, product_id, size, new_quantity)
+
+    async def clear_cart(self, user_id: int) -> bool:
+        """Clear all items from user's cart"""
+        return await asyncio.to_thread(self._clear_cart_sync, user_id)
+
+    async def get_cart_total(self, user_id: int) -> float:
+        """Calculate total price of items in user's cart"""
+        return await asyncio.to_thread(self._get_cart_total_sync, user_id)
+
+    async def get_cart_item_count(self, user_id: int) -> int:
+        """Get total number of items in user's cart"""
+        return await asyncio.to_thread(self._get_cart_item_count_sync, user_id)
+
+    async def is_cart_empty(self, user_id: int) -> bool:
+        """Check if user's cart is empty"""
+        return await asyncio.to_thread(self._is_cart_empty_sync, user_id)
+
+    async def get_cart_summary(self, user_id: int) -> Dict[str, Any]:
+        """Get a summary of user's cart"""
+        return await asyncio.to_thread(self._get_cart_summary_sync, user_id)
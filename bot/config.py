@@ -6,74 +6,102 @@ Manages environment variables and configuration settings.
 
 import os
 import logging
-from typing import List, Optional
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+
+def _parse_admin_ids() -> List[int]:
+    """Parse admin IDs from environment variable"""
+    admin_ids_str = os.getenv("ADMIN_IDS", "")
+    if not admin_ids_str:
+        return []
+
+    try:
+        return [
+            int(id_str.strip()) for id_str in admin_ids_str.split(",")
+            if id_str.strip()
+        ]
+    except ValueError:
+        logging.warning("Invalid ADMIN_IDS format. Using empty list.")
+        return []
+
+
+@lru_cache(maxsize=1)
+def _load_settings() -> Dict[str, Any]:
+    """Resolve configuration from environment variables once per process"""
+    # Get bot token from environment or use provided token
+    bot_token = os.getenv("BOT_TOKEN", "482872229:AAEG0hySlWspi-KOF5lbR2fMZGJ1qWUPLn0")
+
+    if not bot_token:
+        raise ValueError("BOT_TOKEN not found in environment variables")
+
+    # Order group settings
+    order_group_chat_id = os.getenv('ORDER_GROUP_CHAT_ID')
+
+    # اگر تنظیم نشده، از Chat ID گروه DecoTeen Bot Orders استفاده کن
+    if not order_group_chat_id:
+        # Chat ID از عکس: -4804296164 (گروه DecoTeen Bot Orders)
+        order_group_chat_id = -4804296164
+        logging.info(
+            f"✅ استفاده از گروه پیش‌فرض: {order_group_chat_id}")
+    else:
+        # تبدیل به int
+        try:
+            order_group_chat_id = int(order_group_chat_id)
+            logging.info(
+                f"✅ استفاده از گروه تنظیم شده: {order_group_chat_id}")
+        except ValueError:
+            logging.error(
+                f"❌ ORDER_GROUP_CHAT_ID نامعتبر: {order_group_chat_id}"
+            )
+            # استفاده از گروه پیش‌فرض
+            order_group_chat_id = -4804296164
+            logging.info(
+                f"✅ استفاده از گروه پیش‌فرض به جای نامعتبر: {order_group_chat_id}"
+            )
+
+    return {
+        'bot_token': bot_token,
+        # ZarinPal configuration - using your provided merchant ID
+        'zarinpal_merchant_id': os.getenv(
+            "ZARINPAL_MERCHANT_ID", "fd4166f9-78e2-4228-ac7d-077a5168f064"),
+        'zarinpal_sandbox': os.getenv("ZARINPAL_SANDBOX",
+                                      "True").lower() == "true",
+        'order_group_chat_id': order_group_chat_id,
+        # Optional configurations with safe defaults
+        'admin_ids': _parse_admin_ids(),
+        'log_level': os.getenv("LOG_LEVEL", "INFO"),
+        'cart_data_dir': os.getenv("CART_DATA_DIR", "cart_data"),
+        'max_cart_items': int(os.getenv("MAX_CART_ITEMS", "50")),
+        # Bot domain for payment callbacks
+        'bot_domain': os.getenv("BOT_DOMAIN", "example.com"),
+    }
 
 
 class Config:
     """Configuration class for the Telegram bot"""
 
+    bot_token: str
+    zarinpal_merchant_id: str
+    zarinpal_sandbox: bool
+    order_group_chat_id: int
+    admin_ids: List[int]
+    log_level: str
+    cart_data_dir: str
+    max_cart_items: int
+    bot_domain: str
+
     def __init__(self):
         """Initialize configuration from environment variables"""
-        # Get bot token from environment or use provided token
-        self.bot_token: str = os.getenv("BOT_TOKEN", "482872229:AAEG0hySlWspi-KOF5lbR2fMZGJ1qWUPLn0")
-
-        if not self.bot_token:
-            raise ValueError("BOT_TOKEN not found in environment variables")
-
-        # ZarinPal configuration - using your provided merchant ID
-        self.zarinpal_merchant_id: str = os.getenv(
-            "ZARINPAL_MERCHANT_ID", "fd4166f9-78e2-4228-ac7d-077a5168f064")
-        self.zarinpal_sandbox: bool = os.getenv("ZARINPAL_SANDBOX",
-                                                "True").lower() == "true"
-
-        # Order group settings
-        self.order_group_chat_id = os.getenv('ORDER_GROUP_CHAT_ID')
-
-        # اگر تنظیم نشده، از Chat ID گروه DecoTeen Bot Orders استفاده کن
-        if not self.order_group_chat_id:
-            # Chat ID از عکس: -4804296164 (گروه DecoTeen Bot Orders)
-            self.order_group_chat_id = -4804296164
-            logging.info(
-                f"✅ استفاده از گروه پیش‌فرض: {self.order_group_chat_id}")
-        else:
-            # تبدیل به int
-            try:
-                self.order_group_chat_id = int(self.order_group_chat_id)
-                logging.info(
-                    f"✅ استفاده از گروه تنظیم شده: {self.order_group_chat_id}")
-            except ValueError:
-                logging.error(
-                    f"❌ ORDER_GROUP_CHAT_ID نامعتبر: {self.order_group_chat_id}"
-                )
-                # استفاده از گروه پیش‌فرض
-                self.order_group_chat_id = -4804296164
-                logging.info(
-                    f"✅ استفاده از گروه پیش‌فرض به جای نامعتبر: {self.order_group_chat_id}"
-                )
-
-        # Optional configurations with safe defaults
-        self.admin_ids: List[int] = self._parse_admin_ids()
-        self.log_level: str = os.getenv("LOG_LEVEL", "INFO")
-        self.cart_data_dir: str = os.getenv("CART_DATA_DIR", "cart_data")
-        self.max_cart_items: int = int(os.getenv("MAX_CART_ITEMS", "50"))
-
-        # Bot domain for payment callbacks
-        self.bot_domain: str = os.getenv("BOT_DOMAIN", "example.com")
-
-    def _parse_admin_ids(self) -> List[int]:
-        """Parse admin IDs from environment variable"""
-        admin_ids_str = os.getenv("ADMIN_IDS", "")
-        if not admin_ids_str:
-            return []
-
-        try:
-            return [
-                int(id_str.strip()) for id_str in admin_ids_str.split(",")
-                if id_str.strip()
-            ]
-        except ValueError:
-            logging.warning("Invalid ADMIN_IDS format. Using empty list.")
-            return []
+        # The environment is read once per process; see reload()
+        settings = _load_settings()
+        self.__dict__.update(settings)
+        self.admin_ids = list(settings['admin_ids'])
+
+    @staticmethod
+    def reload():
+        """Re-read environment variables on the next Config()"""
+        _load_settings.cache_clear()
 
     def get_callback_url(self) -> str:
         """Get payment callback URL"""
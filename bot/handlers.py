@@ -6,13 +6,16 @@ Main bot handlers for commands, callbacks, and message processing.
 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes, CommandHandler, CallbackQueryHandler, MessageHandler, filters
-from bot.keyboards import BotKeyboards
+from telegram.error import TelegramError
+from bot.keyboards import (BotKeyboards, PAGE_CURSOR_PREFIXES,
+                           resolve_page_cursor, resolve_alphabet_cursor)
 from bot.cart import CartManager
 from bot.pricing import PricingManager
 from bot.zarinpal import ZarinPalGateway
 from bot.payment_scheduler import PaymentScheduler
 from bot.order_server import OrderManagementServer, OrderStatus
 from bot.config import Config
+from bot.session import UserSession
 from data.customer_service import CustomerService
 from data.product_data import (get_products_by_category, get_product_by_id,
                                search_products_by_name,
@@ -21,12 +24,146 @@ from data.product_data import (get_products_by_category, get_product_by_id,
                                PRODUCT_PRICES)
 from utils.logger import setup_logger
 from utils.persian_utils import format_price, persian_numbers
+from contextlib import suppress
 from datetime import datetime
 from typing import Dict, List
-import json
+import asyncio
+import re
 
 logger = setup_logger(__name__)
 
+# Message text shown above each paginated icon category
+_ICON_PAGE_TITLES = {
+    'baby': "👶 کالای خواب نوزاد\n\nعالیه! حالا بگو کدوم طرح؟",
+    'curtain_only': " پرده\n\nعالیه! حالا بگو کدوم طرح؟",
+    'cushion': " کوسن\n\nعالیه! حالا بگو کدوم طرح؟",
+    'tablecloth': " فرشینه\n\nعالیه! حالا بگو کدوم طرح؟",
+}
+
+# Keyboards whose buttons never change, built once instead of per message
+_RECEIPT_CONFIRM_KB = InlineKeyboardMarkup((
+    (InlineKeyboardButton("✅ سفارش را تایید می‌کنم",
+                          callback_data="confirm_payment_receipt"), ),
+    (InlineKeyboardButton("🔄 ارسال عکس جدید", callback_data="upload_receipt"), ),
+))
+_REMAINING_RECEIPT_CONFIRM_KB = InlineKeyboardMarkup((
+    (InlineKeyboardButton("✅ تایید و ارسال به پشتیبانی",
+                          callback_data="confirm_remaining_payment_receipt"), ),
+    (InlineKeyboardButton("🔄 ارسال عکس جدید",
+                          callback_data="upload_remaining_receipt"), ),
+))
+_REMAINING_RECEIPT_UPLOAD_KB = InlineKeyboardMarkup((
+    (InlineKeyboardButton("📸 ارسال فیش واریزی",
+                          callback_data="upload_remaining_receipt"), ),
+    (InlineKeyboardButton("🔙 بازگشت", callback_data="main_menu"), ),
+))
+_DAILY_INVOICES_KB = InlineKeyboardMarkup((
+    (InlineKeyboardButton("💾 ذخیره گزارش", callback_data="save_daily_invoices"),
+     InlineKeyboardButton("📧 ارسال ایمیل", callback_data="email_daily_invoices")),
+    (InlineKeyboardButton("🔄 بروزرسانی", callback_data="refresh_daily_invoices"), ),
+))
+_BACK_TO_DAILY_ORDERS_KB = InlineKeyboardMarkup((
+    (InlineKeyboardButton("🔙 بازگشت", callback_data="back_to_daily_orders"), ),
+))
+_BACK_TO_INVOICE_BTN = InlineKeyboardButton("🔙 بازگشت",
+                                            callback_data="view_invoice")
+_UPLOAD_RECEIPT_KB = InlineKeyboardMarkup((
+    (InlineKeyboardButton("📸 ارسال فیش واریزی", callback_data="upload_receipt"), ),
+    (_BACK_TO_INVOICE_BTN, ),
+))
+_UPLOAD_CHECK_KB = InlineKeyboardMarkup((
+    (InlineKeyboardButton("📸  ارسال چک ثبت شده ", callback_data="upload_receipt"), ),
+    (_BACK_TO_INVOICE_BTN, ),
+))
+_PAYMENT_TYPE_60DAY_KB = InlineKeyboardMarkup((
+    (InlineKeyboardButton("💰 پرداخت نقدی",
+                          callback_data="payment_type_cash_60day"), ),
+    (InlineKeyboardButton("📋 پرداخت چکی",
+                          callback_data="payment_type_check_60day"), ),
+    (_BACK_TO_INVOICE_BTN, ),
+))
+_PAYMENT_TYPE_90DAY_KB = InlineKeyboardMarkup((
+    (InlineKeyboardButton("💰 پرداخت نقدی",
+                          callback_data="payment_type_cash_90day"), ),
+    (InlineKeyboardButton("📋 پرداخت چکی",
+                          callback_data="payment_type_check_90day"), ),
+    (_BACK_TO_INVOICE_BTN, ),
+))
+_CONFIRM_ORDER_KB = InlineKeyboardMarkup((
+    (InlineKeyboardButton("✅ تایید سفارش", callback_data="confirm_order"), ),
+    (InlineKeyboardButton("🏠 منوی اصلی", callback_data="main_menu"), ),
+))
+
+# Keywords that make a support group message a command, by command. A
+# message may contain several; the handler decides which one wins.
+_GROUP_COMMANDS = {
+    'orders': ('سفارش', 'سفارشات', 'order', 'orders'),
+    'invoices': ('فاکتور', 'فاکتورها', 'invoice', 'invoices'),
+    'stats': ('آمار', 'stat', 'statistics'),
+    'help': ('راهنما', 'help', 'کمک', 'دستور'),
+    'bot': ('ربات', 'bot', '@decoteen_bot'),
+}
+# Finds every command keyword in a message in one pass
+_GROUP_COMMAND_RE = re.compile("|".join(
+    f"(?P<{command}>" +
+    "|".join(map(re.escape, sorted(words, key=len, reverse=True))) + ")"
+    for command, words in _GROUP_COMMANDS.items()))
+_BOT_MENTIONS = frozenset(_GROUP_COMMANDS['bot'])
+_STATUS_PREFIXES = ('وضعیت ', 'status ')
+
+
+def _format_invoice_items(cart_items: List[Dict]) -> str:
+    """Format cart items as the numbered item lines of an invoice"""
+    return "".join(
+        f"{persian_numbers(i)}. {item.get('product_name', 'محصول')}\n"
+        f"   📏 {item.get('size', 'نامشخص')} | "
+        f"📦 {persian_numbers(item.get('quantity', 0))} عدد | "
+        f"💰 {format_price(item.get('price', 0) * item.get('quantity', 0))}\n"
+        for i, item in enumerate(cart_items, 1))
+
+
+# Message layouts shared by several handlers, filled in with format_map
+_FINAL_INVOICE_TMPL = ("✅ فاکتور نهایی\n"
+                       "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n"
+                       "👤 مشتری: {name}\n"
+                       "🏙️ شهر: {city}\n"
+                       "💳 روش پرداخت: {method}\n\n"
+                       "💰 مبلغ کل: {subtotal} تومان\n"
+                       "🎁 تخفیف ({discount_percent}٪): {discount} تومان\n"
+                       "💰 مبلغ پرداختی: {amount} تومان\n\n"
+                       "📸 فیش واریزی دریافت شد\n"
+                       "✅ آماده تایید نهایی سفارش")
+_ORDER_STATUS_TMPL = ("📋 وضعیت سفارش: {order_id}\n"
+                      "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n"
+                      "👤 مشتری: {name}\n"
+                      "🏙️ شهر: {city}\n"
+                      "📊 وضعیت فعلی: {status}\n"
+                      "💰 مبلغ کل: {total} تومان\n"
+                      "⏰ تاریخ ثبت: {created}\n")
+
+
+def _format_final_invoice(customer: Dict, payment_info: Dict) -> str:
+    """Format the final invoice shown after a receipt photo is received"""
+    return _FINAL_INVOICE_TMPL.format_map({
+        'name': customer['name'],
+        'city': customer['city'],
+        'method': payment_info['payment_method'],
+        'subtotal': format_price(payment_info['subtotal']),
+        'discount_percent': persian_numbers(
+            int(payment_info['discount_rate'] * 100)),
+        'discount': format_price(payment_info['discount']),
+        'amount': format_price(payment_info['amount']),
+    })
+
+
+def _group_prefix_routes(routes):
+    """Group (prefix, handler) callback routes by the prefix's first token"""
+    grouped = {}
+    for prefix, handler in routes:
+        grouped.setdefault(prefix.split("_", 1)[0], []).append(
+            (prefix, handler))
+    return {token: tuple(group) for token, group in grouped.items()}
+
 
 class BotHandlers:
     """Main class handling all bot interactions"""
@@ -42,8 +179,87 @@ class BotHandlers:
             sandbox=self.config.zarinpal_sandbox)
         self.payment_scheduler = PaymentScheduler()
         self.order_server = OrderManagementServer()
-        self.user_sessions = {}  # Store user session data
+        self.user_sessions: Dict[int, UserSession] = {}
+        # Per-chat queues of pending group work and the tasks draining them
+        self._chat_workers: Dict[int, asyncio.Queue] = {}
+        self._chat_worker_tasks: Dict[int, asyncio.Task] = {}
         self.bot = None  # Bot instance برای اطلاع‌رسانی
+
+        # Callback routing tables, built once instead of per button press
+        self._callback_handlers = {
+            "authenticate": self._handle_authentication_request,
+            "main_menu": self._handle_main_menu,
+            "start_shopping": self._handle_start_shopping,
+            "view_cart": self._handle_view_cart,
+            "view_invoice": self._handle_view_invoice,
+            "upload_receipt": self._handle_upload_receipt_request,
+            "confirm_payment_receipt":
+            self._handle_payment_receipt_confirmation,
+            "confirm_payment_terms": self._handle_payment_terms_confirmation,
+            "confirm_order": self._handle_order_confirmation,
+            "cart_clear": self._handle_cart_clear,
+            "verify_payment": self._handle_payment_verification,
+            "payment_completed": self._handle_payment_completed,
+            "back_to_categories": self._handle_back_to_categories,
+            "back_to_alphabet": self._handle_back_to_alphabet,
+            "back_to_curtain_subcategories":
+            self._handle_back_to_curtain_subcategories,
+            "back_to_products": self._handle_back_to_products,
+            "back_to_fabric_selection": self._handle_back_to_fabric_selection,
+            "back_to_sewing_type": self._handle_back_to_sewing_type,
+            "daily_stats": self._handle_daily_stats_request,
+            "refresh_daily_orders": self._handle_refresh_daily_orders,
+            "back_to_daily_orders": self._handle_back_to_daily_orders,
+            "contact_support": self._handle_contact_support_request,
+            "faq": self._handle_faq_request,
+            "confirm_60day_order": self._handle_60day_order_confirmation,
+            "upload_check_photo": self._handle_upload_check_photo_request,
+            "check_follow_up": self._handle_check_follow_up,
+            "confirm_check_submission": self._handle_confirm_check_submission,
+            "upload_remaining_receipt": self._handle_upload_remaining_receipt,
+        }
+        # Prefixes sharing a first token are tried in order, so a longer
+        # prefix must come before any shorter one it starts with
+        self._callback_prefixes = _group_prefix_routes((
+            ("category_", self._handle_category_selection),
+            ("subcategory_", self._handle_subcategory_selection),
+            ("alpha_after_", self._handle_alpha_cursor),
+            ("alpha_before_", self._handle_alpha_cursor),
+            ("alpha_page_", self._handle_alpha_page),
+            ("alpha_", self._handle_alphabet_selection),
+            ("product_", self._handle_product_selection),
+            ("size_selection_", self._handle_size_selection_from_category),
+            ("size_", self._handle_size_selection),
+            # Pagination handlers
+            ("baby_page_", self._handle_baby_page),
+            ("curtain_page_", self._handle_curtain_page),
+            ("cushion_page_", self._handle_cushion_page),
+            ("tablecloth_page_", self._handle_tablecloth_page),
+            *((prefix, self._handle_page_cursor)
+              for prefix in PAGE_CURSOR_PREFIXES),
+            ("qty_", self._handle_quantity_selection),
+            ("payment_type_", self._handle_payment_type_selection),
+            ("payment_confirmed_",
+             self._handle_payment_confirmation_from_group),
+            ("payment_", self._handle_payment_selection),
+            ("order_status_", self._handle_order_status_update),
+            ("order_details_", self._handle_order_details_request),
+            ("order_", self._handle_order_actions),
+            ("alphabet_search_", self._handle_alphabet_search),
+            ("sewing_", self._handle_sewing_type_selection),
+            ("fabric_", self._handle_fabric_selection),
+            ("contact_made_", self._handle_contact_made_from_group),
+            ("remind_tomorrow_", self._handle_remind_tomorrow_from_group),
+            ("pay_remaining_", self._handle_pay_remaining_balance),
+            ("confirm_remaining_payment_",
+             self._handle_confirm_remaining_payment),
+            ("check_info_sent_", self._handle_check_info_sent),
+            ("check_contacted_", self._handle_check_contacted),
+            ("check_recipient_", self._handle_check_recipient_selection),
+            ("check_customer_confirm_",
+             self._handle_check_customer_confirmation),
+        ))
+
         logger.info(
             "🔄 PricingManager initialized with updated payment display configurations"
         )
@@ -87,9 +303,7 @@ class BotHandlers:
         logger.info(f"User {user_id} started the bot")
 
         # Set user state to awaiting customer code directly
-        if user_id not in self.user_sessions:
-            self.user_sessions[user_id] = {}
-        self.user_sessions[user_id]['awaiting_customer_code'] = True
+        self._session(user_id).awaiting_customer_code = True
 
         welcome_text = ("🔐 خوش آمدید به فروشگاه دکوتین\n\n"
                         "لطفاً کد شش رقمی نمایندگی خود را وارد کنید:")
@@ -178,125 +392,31 @@ class BotHandlers:
 
         logger.debug(f"User {user_id} pressed: {data}")
 
-        # Quick routing dictionary for better performance
-        handlers = {
-            "authenticate": self._handle_authentication_request,
-            "main_menu": self._handle_main_menu,
-            "start_shopping": self._handle_start_shopping,
-            "view_cart": self._handle_view_cart,
-            "view_invoice": self._handle_view_invoice,
-            "upload_receipt": self._handle_upload_receipt_request,
-            "confirm_payment_receipt":
-            self._handle_payment_receipt_confirmation,
-            "confirm_payment_terms": self._handle_payment_terms_confirmation,
-            "confirm_order": self._handle_order_confirmation,
-            "cart_clear": self._handle_cart_clear,
-            "verify_payment": self._handle_payment_verification,
-            "payment_completed": self._handle_payment_completed,
-            "back_to_categories": self._handle_back_to_categories,
-            "back_to_alphabet": self._handle_back_to_alphabet,
-            "back_to_curtain_subcategories":
-            self._handle_back_to_curtain_subcategories,
-            "back_to_products": self._handle_back_to_products,
-            "daily_stats": self._handle_daily_stats_request,
-            "refresh_daily_orders": self._handle_refresh_daily_orders,
-            "back_to_daily_orders": self._handle_back_to_daily_orders,
-            "contact_support": self._handle_contact_support_request,
-            "faq": self._handle_faq_request,
-            "confirm_60day_order": self._handle_60day_order_confirmation,
-            "upload_check_photo": self._handle_upload_check_photo_request,
-            "check_follow_up": self._handle_check_follow_up,
-            "confirm_check_submission": self._handle_confirm_check_submission,
-        }
-
         try:
             # Direct handler for exact matches
-            if data in handlers:
-                await handlers[data](query)
+            handler = self._callback_handlers.get(data)
+            if handler is not None:
+                await handler(query)
                 return
 
-            # Prefix-based routing for better performance
-            if data.startswith("category_"):
-                await self._handle_category_selection(query, data)
-            elif data.startswith("subcategory_"):
-                await self._handle_subcategory_selection(query, data)
-            elif data.startswith("alpha_"):
-                await self._handle_alphabet_selection(query, data)
-            elif data.startswith("product_"):
-                await self._handle_product_selection(query, data)
-            elif data.startswith("size_selection_"):
-                await self._handle_size_selection_from_category(query, data)
-            elif data.startswith("size_"):
-                await self._handle_size_selection(query, data)
-            # Pagination handlers
-            elif data.startswith("baby_page_"):
-                await self._handle_baby_page(query, data)
-            elif data.startswith("curtain_page_"):
-                await self._handle_curtain_page(query, data)
-            elif data.startswith("cushion_page_"):
-                await self._handle_cushion_page(query, data)
-            elif data.startswith("tablecloth_page_"):
-                await self._handle_tablecloth_page(query, data)
-            elif data.startswith("alpha_page_"):
-                await self._handle_alpha_page(query, data)
-            elif data.startswith("qty_"):
-                await self._handle_quantity_selection(query, data)
-            elif data.startswith("payment_type_"):
-                await self._handle_payment_type_selection(query, data)
-            elif data.startswith("payment_"):
-                await self._handle_payment_selection(query, data)
-            elif data.startswith("order_status_"):
-                await self._handle_order_status_update(query, data)
-            elif data.startswith("order_details_"):
-                await self._handle_order_details_request(query, data)
-            elif data.startswith("order_"):
-                await self._handle_order_actions(query, data)
-            elif data.startswith("alphabet_search_"):
-                await self._handle_alphabet_search(query, data)
-
-            elif data.startswith("sewing_"):
-                await self._handle_sewing_type_selection(query, data)
-            elif data.startswith("fabric_"):
-                await self._handle_fabric_selection(query, data)
-            elif data == "back_to_fabric_selection":
-                await self._handle_back_to_fabric_selection(query)
-            elif data == "back_to_sewing_type":
-                await self._handle_back_to_sewing_type(query)
-            elif data.startswith("payment_confirmed_"):
-                await self._handle_payment_confirmation_from_group(query, data)
-            elif data.startswith("contact_made_"):
-                await self._handle_contact_made_from_group(query, data)
-            elif data.startswith("remind_tomorrow_"):
-                await self._handle_remind_tomorrow_from_group(query, data)
-            elif data.startswith("pay_remaining_"):
-                await self._handle_pay_remaining_balance(query, data)
-            elif data.startswith("confirm_remaining_payment_"):
-                await self._handle_confirm_remaining_payment(query, data)
-            elif data == "confirm_remaining_payment_receipt":
-                await self._handle_confirm_remaining_payment(query, "confirm_remaining_payment_receipt")
-            elif data == "upload_remaining_receipt":
-                await self._handle_upload_remaining_receipt(query)
-            elif data.startswith("check_info_sent_"):
-                await self._handle_check_info_sent(query, data)
-            elif data.startswith("check_contacted_"):
-                await self._handle_check_contacted(query, data)
-            elif data.startswith("check_recipient_"):
-                await self._handle_check_recipient_selection(query, data)
-            elif data.startswith("check_customer_confirm_"):
-                await self._handle_check_customer_confirmation(query, data)
-            else:
-                logger.warning(f"Unhandled callback data: {data}")
-                await query.edit_message_text(" سفارش درحال پیگیری است .")
+            # Prefix-based routing: only the prefixes sharing the data's
+            # first token are tried
+            for prefix, handler in self._callback_prefixes.get(
+                    data.split("_", 1)[0], ()):
+                if data.startswith(prefix):
+                    await handler(query, data)
+                    return
+
+            logger.warning(f"Unhandled callback data: {data}")
+            await query.edit_message_text(" سفارش درحال پیگیری است .")
 
         except Exception as e:
             logger.error(f"Callback error for {data}: {e}")
             logger.error(f"Exception type: {type(e)}")
             logger.error(f"Exception traceback:", exc_info=True)
-            try:
+            with suppress(TelegramError):  # Prevent secondary errors
                 await query.edit_message_text(
                     "❌ خطایی رخ داد. لطفاً دوباره تلاش کنید.")
-            except:
-                pass  # Prevent secondary errors
 
     async def handle_text_message(self, update: Update,
                                   context: ContextTypes.DEFAULT_TYPE):
@@ -304,13 +424,13 @@ class BotHandlers:
         user_id = update.effective_user.id
         text = update.message.text.strip()
 
+        session = self.user_sessions.get(user_id)
+
         # Check if user is in authentication process
-        if user_id in self.user_sessions and self.user_sessions[user_id].get(
-                'awaiting_customer_code'):
+        if session and session.awaiting_customer_code:
             await self._handle_customer_code_input(update, text)
         # Check if user is inputting curtain height
-        elif user_id in self.user_sessions and self.user_sessions[user_id].get(
-                'awaiting_curtain_height'):
+        elif session and session.awaiting_curtain_height:
             await self._handle_curtain_height_input(update, text)
         else:
             await update.message.reply_text(
@@ -322,43 +442,43 @@ class BotHandlers:
                                    context: ContextTypes.DEFAULT_TYPE):
         """Handle photo messages (for receipt uploads)"""
         user_id = update.effective_user.id
+        session = self.user_sessions.get(user_id)
 
         # Check if user is waiting for receipt upload (for orders)
-        if (user_id in self.user_sessions and self.user_sessions[user_id].get(
-                'payment_info', {}).get('awaiting_receipt')):
+        if (session and session.payment_info
+                and session.payment_info.get('awaiting_receipt')):
             await self._handle_order_receipt_upload(update, user_id)
         # Check if user is waiting for remaining balance receipt upload
-        elif (user_id in self.user_sessions and self.user_sessions[user_id].get(
-                'remaining_payment', {}).get('awaiting_receipt')):
+        elif (session and session.remaining_payment
+              and session.remaining_payment.get('awaiting_receipt')):
             await self._handle_remaining_receipt_upload(update, user_id)
         # Check if user is waiting for check photo upload
-        elif (user_id in self.user_sessions and self.user_sessions[user_id].get(
-                'awaiting_check_photo')):
+        elif session and session.awaiting_check_photo:
             await self._handle_check_photo_upload(update, user_id)
 
             # Store photo info
             photo = update.message.photo[-1]  # Get highest resolution photo
-            self.user_sessions[user_id]['receipt_photo'] = {
+            self.user_sessions[user_id].receipt_photo = {
                 'file_id': photo.file_id,
                 'file_unique_id': photo.file_unique_id
             }
 
             # Get payment info for final invoice display - handle both payment_info and check_payment_info
-            payment_info = self.user_sessions[user_id].get('payment_info')
-            check_payment_info = self.user_sessions[user_id].get('check_payment_info')
+            payment_info = self.user_sessions[user_id].payment_info
+            check_payment_info = self.user_sessions[user_id].check_payment_info
             
             # Use check_payment_info if payment_info is not available (for 60/90 day check payments)
             if not payment_info and check_payment_info:
                 payment_info = {
                     'payment_method': check_payment_info['payment_method'],
                     'amount': check_payment_info['amount'],
-                    'subtotal': self.pricing_manager.calculate_subtotal(self.cart_manager.get_cart(user_id)),
+                    'subtotal': self.pricing_manager.calculate_subtotal(await self.cart_manager.get_cart(user_id)),
                     'discount_rate': 0.25,  # 60/90 day discount rate
-                    'discount': self.pricing_manager.calculate_subtotal(self.cart_manager.get_cart(user_id)) - check_payment_info.get('final_amount', check_payment_info['amount']),
+                    'discount': self.pricing_manager.calculate_subtotal(await self.cart_manager.get_cart(user_id)) - check_payment_info.get('final_amount', check_payment_info['amount']),
                     'awaiting_receipt': True
                 }
                 # Store as payment_info for consistency
-                self.user_sessions[user_id]['payment_info'] = payment_info
+                self.user_sessions[user_id].payment_info = payment_info
             
             if not payment_info:
                 # If neither payment_info nor check_payment_info is available
@@ -366,35 +486,14 @@ class BotHandlers:
                     "لطفاً دوباره روش پرداخت را انتخاب کنید.",
                     reply_markup=self.keyboards.get_main_menu(self._is_authenticated(user_id)))
                 return
-            customer = self.user_sessions[user_id]['customer']
-            cart_items = self.cart_manager.get_cart(user_id)
+            customer = self.user_sessions[user_id].customer
 
             # Generate final invoice text
-            final_invoice = (
-                f"✅ فاکتور نهایی\n"
-                f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n"
-                f"👤 مشتری: {customer['name']}\n"
-                f"🏙️ شهر: {customer['city']}\n"
-                f"💳 روش پرداخت: {payment_info['payment_method']}\n\n"
-                f"💰 مبلغ کل: {format_price(payment_info['subtotal'])} تومان\n"
-                f"🎁 تخفیف ({persian_numbers(str(int(payment_info['discount_rate'] * 100)))}٪): {format_price(payment_info['discount'])} تومان\n"
-                f"💰 مبلغ پرداختی: {format_price(payment_info['amount'])} تومان\n\n"
-                f"📸 فیش واریزی دریافت شد\n"
-                f"✅ آماده تایید نهایی سفارش")
+            final_invoice = _format_final_invoice(customer, payment_info)
 
             # Show confirmation button with final invoice
-            keyboard = [[
-                InlineKeyboardButton("✅ سفارش را تایید می‌کنم",
-                                     callback_data="confirm_payment_receipt")
-            ],
-                        [
-                            InlineKeyboardButton(
-                                "🔄 ارسال عکس جدید",
-                                callback_data="upload_receipt")
-                        ]]
-
             await update.message.reply_text(
-                final_invoice, reply_markup=InlineKeyboardMarkup(keyboard))
+                final_invoice, reply_markup=_RECEIPT_CONFIRM_KB)
         else:
             await update.message.reply_text(
                 "لطفاً ابتدا روش پرداخت را انتخاب کنید.",
@@ -405,54 +504,33 @@ class BotHandlers:
         """Handle receipt upload for regular orders"""
         # Store photo info
         photo = update.message.photo[-1]  # Get highest resolution photo
-        self.user_sessions[user_id]['receipt_photo'] = {
+        self.user_sessions[user_id].receipt_photo = {
             'file_id': photo.file_id,
             'file_unique_id': photo.file_unique_id
         }
 
         # Get payment info for final invoice display
-        payment_info = self.user_sessions[user_id]['payment_info']
-        customer = self.user_sessions[user_id]['customer']
-        cart_items = self.cart_manager.get_cart(user_id)
+        payment_info = self.user_sessions[user_id].payment_info
+        customer = self.user_sessions[user_id].customer
 
         # Generate final invoice text
-        final_invoice = (
-            f"✅ فاکتور نهایی\n"
-            f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n"
-            f"👤 مشتری: {customer['name']}\n"
-            f"🏙️ شهر: {customer['city']}\n"
-            f"💳 روش پرداخت: {payment_info['payment_method']}\n\n"
-            f"💰 مبلغ کل: {format_price(payment_info['subtotal'])} تومان\n"
-            f"🎁 تخفیف ({persian_numbers(str(int(payment_info['discount_rate'] * 100)))}٪): {format_price(payment_info['discount'])} تومان\n"
-            f"💰 مبلغ پرداختی: {format_price(payment_info['amount'])} تومان\n\n"
-            f"📸 فیش واریزی دریافت شد\n"
-            f"✅ آماده تایید نهایی سفارش")
+        final_invoice = _format_final_invoice(customer, payment_info)
 
         # Show confirmation button with final invoice
-        keyboard = [[
-            InlineKeyboardButton("✅ سفارش را تایید می‌کنم",
-                                 callback_data="confirm_payment_receipt")
-        ],
-                    [
-                        InlineKeyboardButton(
-                            "🔄 ارسال عکس جدید",
-                            callback_data="upload_receipt")
-                    ]]
-
         await update.message.reply_text(
-            final_invoice, reply_markup=InlineKeyboardMarkup(keyboard))
+            final_invoice, reply_markup=_RECEIPT_CONFIRM_KB)
 
     async def _handle_remaining_receipt_upload(self, update, user_id):
         """Handle receipt upload for remaining balance payment"""
         # Store photo info
         photo = update.message.photo[-1]  # Get highest resolution photo
-        self.user_sessions[user_id]['receipt_photo'] = {
+        self.user_sessions[user_id].receipt_photo = {
             'file_id': photo.file_id,
             'file_unique_id': photo.file_unique_id
         }
 
         # Get remaining payment info
-        remaining_payment = self.user_sessions[user_id]['remaining_payment']
+        remaining_payment = self.user_sessions[user_id].remaining_payment
         order_id = remaining_payment['order_id']
         amount = remaining_payment['amount']
 
@@ -466,16 +544,8 @@ class BotHandlers:
             f"✅ آماده تایید نهایی"
         )
 
-        keyboard = [[
-            InlineKeyboardButton("✅ تایید و ارسال به پشتیبانی",
-                                 callback_data="confirm_remaining_payment_receipt")
-        ], [
-            InlineKeyboardButton("🔄 ارسال عکس جدید",
-                                 callback_data="upload_remaining_receipt")
-        ]]
-
         await update.message.reply_text(
-            confirmation_text, reply_markup=InlineKeyboardMarkup(keyboard))
+            confirmation_text, reply_markup=_REMAINING_RECEIPT_CONFIRM_KB)
 
     async def handle_group_message(self, update: Update,
                                    context: ContextTypes.DEFAULT_TYPE):
@@ -485,32 +555,21 @@ class BotHandlers:
         ) if update.message.text else ""
         user_name = update.effective_user.first_name or "کاربر"
 
-        # Log group info for debugging
-        logger.info(f"📩 Group message received:")
-        logger.info(f"   Chat ID: {chat_id} (type: {type(chat_id)})")
-        logger.info(
-            f"   Chat Title: {getattr(update.effective_chat, 'title', 'N/A')}")
-        logger.info(f"   Message: '{message_text}'")
-        logger.info(f"   User: {user_name}")
-        logger.info(
-            f"   Configured group ID: {self.config.order_group_chat_id} (type: {type(self.config.order_group_chat_id)})"
-        )
+        # Log group info for debugging; arguments are only formatted when
+        # DEBUG is enabled
+        logger.debug("📩 Group message: chat=%s title=%s text=%r user=%s cfg=%s",
+                     chat_id, getattr(update.effective_chat, 'title', 'N/A'),
+                     message_text, user_name, self.config.order_group_chat_id)
 
-        # تبدیل chat_id به int برای مقایسه
-        try:
-            current_group_id = int(chat_id)
-            config_group_id = int(
-                self.config.order_group_chat_id
-            ) if self.config.order_group_chat_id else None
-        except (ValueError, TypeError) as e:
-            logger.error(f"Error converting chat IDs to int: {e}")
-            return
+        # Telegram chat IDs are ints, and Config already resolves the group
+        # ID to an int, so the two compare directly
+        current_group_id = chat_id
+        config_group_id = self.config.order_group_chat_id
 
         # بررسی اینکه آیا این گروه، گروه مناسب هست یا نه
         if config_group_id and current_group_id != config_group_id:
-            logger.info(
-                f"❌ پیام از گروه مختلف: {current_group_id} != {config_group_id}"
-            )
+            logger.debug("❌ پیام از گروه مختلف: %s != %s", current_group_id,
+                         config_group_id)
             return
 
         # اگر هیچ group ID تنظیم نشده، این گروه را به عنوان گروه اصلی در نظر بگیر
@@ -520,8 +579,6 @@ class BotHandlers:
             )
             self.config.order_group_chat_id = current_group_id
 
-        logger.info(f"✅ Processing group message: '{message_text}'")
-
         # اگر پیام خالی باشد، نادیده بگیر
         if not message_text:
             return
@@ -529,87 +586,108 @@ class BotHandlers:
         # فقط پردازش دستورات مشخص - جلوگیری از پردازش پیام‌های عادی
         message_lower = message_text.lower().strip()
 
-        # لیست دقیق دستورات مجاز
-        valid_commands = [
-            'سفارش', 'سفارشات', 'order', 'orders', 'فاکتور', 'فاکتورها',
-            'invoice', 'invoices', 'آمار', 'stat', 'statistics', 'راهنما',
-            'help', 'کمک', 'دستور', 'ربات', 'bot', '@decoteen_bot'
-        ]
-
-        # بررسی آیا پیام شامل دستور معتبر است یا خیر
-        is_valid_command = False
-        for cmd in valid_commands:
-            if cmd in message_lower:
-                is_valid_command = True
-                break
+        # دستوراتی که کلمات کلیدی آنها در پیام آمده است
+        commands = {
+            match.lastgroup
+            for match in _GROUP_COMMAND_RE.finditer(message_lower)
+        }
 
         # بررسی دستور وضعیت
-        if message_text.startswith('وضعیت ') or message_text.startswith(
-                'status '):
-            is_valid_command = True
+        is_status = message_text.startswith(_STATUS_PREFIXES)
 
         # اگر پیام دستور معتبری نیست، آن را نادیده بگیر
-        if not is_valid_command:
-            logger.debug(f"🔍 پیام عادی نادیده گرفته شد: '{message_text}'")
+        if not commands and not is_status:
+            logger.debug("🔍 پیام عادی نادیده گرفته شد: %r", message_text)
             return
 
-        try:
-            # پردازش دستورات معتبر
-            if any(word in message_lower
-                   for word in ['سفارش', 'سفارشات', 'order', 'orders']):
-                logger.info("🎯 دستور سفارش شناسایی شد")
-                await self._show_daily_orders(update)
-                return
-            elif any(
-                    word in message_lower
-                    for word in ['فاکتور', 'فاکتورها', 'invoice', 'invoices']):
-                logger.info("🎯 دستور فاکتور شناسایی شد")
-                await self._show_daily_invoices(update)
-                return
-            elif message_text.startswith('وضعیت ') or message_text.startswith(
-                    'status '):
-                order_id = message_text.replace('وضعیت ',
-                                                '').replace('status ',
-                                                            '').strip()
-                logger.info(f"🎯 درخواست وضعیت سفارش: {order_id}")
-                await self._show_order_status(update, order_id)
-                return
-            elif any(word in message_lower
-                     for word in ['آمار', 'stat', 'statistics']):
-                logger.info("🎯 دستور آمار شناسایی شد")
-                await self._show_orders_statistics(update)
-                return
-            elif any(word in message_lower
-                     for word in ['راهنما', 'help', 'کمک', 'دستور']):
-                logger.info("🎯 دستور راهنما شناسایی شد")
-                await self._show_group_help(update)
-                return
-            elif message_lower in ['ربات', 'bot', '@decoteen_bot']:
-                logger.info("🎯 دستور تست ربات شناسایی شد")
-                await update.message.reply_text(
-                    "🤖 ربات DecoTeen آماده خدمات‌رسانی است!\n\n"
-                    "📋 دستورات موجود:\n"
-                    "• سفارش - نمایش سفارشات امروز\n"
-                    "• فاکتور - نمایش فاکتورهای امروز\n"
-                    "• آمار - نمایش آمار کلی\n"
-                    "• راهنما - نمایش راهنمای کامل\n\n"
-                    f"🔧 Chat ID این گروه: {current_group_id}")
-                return
-
-        except Exception as e:
-            logger.error(f"❌ خطا در پردازش پیام گروه: {e}")
-            logger.error(
-                f"Message: '{message_text}', Chat ID: {current_group_id}")
+        # پردازش دستورات معتبر
+        if 'orders' in commands:
+            command = 'orders'
+            work = self._show_daily_orders(update)
+        elif 'invoices' in commands:
+            command = 'invoices'
+            work = self._show_daily_invoices(update)
+        elif is_status:
+            order_id = message_text.replace('وضعیت ',
+                                            '').replace('status ',
+                                                        '').strip()
+            command = 'status ' + order_id
+            work = self._show_order_status(update, order_id)
+        elif 'stats' in commands:
+            command = 'stats'
+            work = self._show_orders_statistics(update)
+        elif 'help' in commands:
+            command = 'help'
+            work = self._show_group_help(update)
+        elif message_lower in _BOT_MENTIONS:
+            command = 'bot'
+            work = update.message.reply_text(
+                "🤖 ربات DecoTeen آماده خدمات‌رسانی است!\n\n"
+                "📋 دستورات موجود:\n"
+                "• سفارش - نمایش سفارشات امروز\n"
+                "• فاکتور - نمایش فاکتورهای امروز\n"
+                "• آمار - نمایش آمار کلی\n"
+                "• راهنما - نمایش راهنمای کامل\n\n"
+                f"🔧 Chat ID این گروه: {current_group_id}")
+        else:
+            return
 
-            # ارسال پیام خطا به گروه
+        logger.info("🎯 دستور گروه شناسایی شد: %s", command)
+
+        # Order lookups can be slow, so they run in the chat's worker
+        # instead of holding up the update stream
+        self._run_in_chat_worker(current_group_id, update, work)
+
+    def _run_in_chat_worker(self, chat_id: int, update: Update, work):
+        """Queue a coroutine behind earlier work for the same chat
+
+        The update handler returns straight away, while each chat's work
+        still runs one item at a time, in the order it arrived. The update
+        is kept with the work so a failure can be reported to the chat.
+        """
+        queue = self._chat_workers.get(chat_id)
+        if queue is None:
+            queue = self._chat_workers[chat_id] = asyncio.Queue()
+            self._chat_worker_tasks[chat_id] = asyncio.create_task(
+                self._chat_worker(chat_id, queue))
+        queue.put_nowait((update, work))
+
+    async def _chat_worker(self, chat_id: int, queue: asyncio.Queue):
+        """Run the queued work of one chat in order"""
+        while True:
+            update, work = await queue.get()
             try:
-                await update.message.reply_text(
-                    f"❌ خطا در پردازش دستور: {str(e)[:100]}\n"
-                    "لطفاً دوباره تلاش کنید یا با پشتیبانی تماس بگیرید.")
-            except Exception as reply_error:
-                logger.error(f"خطا در ارسال پیام خطا: {reply_error}")
+                await work
+            except Exception as e:
+                logger.error(f"❌ خطا در پردازش دستور گروه {chat_id}: {e}")
 
-        return
+                # ارسال پیام خطا به گروه
+                try:
+                    await update.message.reply_text(
+                        f"❌ خطا در پردازش دستور: {str(e)[:100]}\n"
+                        "لطفاً دوباره تلاش کنید یا با پشتیبانی تماس بگیرید.")
+                except Exception as reply_error:
+                    logger.error(f"خطا در ارسال پیام خطا: {reply_error}")
+            finally:
+                queue.task_done()
+
+    async def stop_chat_workers(self):
+        """Cancel the chat workers and discard the work still queued
+
+        Called on shutdown; queued coroutines are closed so they are not
+        reported as never awaited.
+        """
+        tasks = list(self._chat_worker_tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        for queue in self._chat_workers.values():
+            while not queue.empty():
+                _update, work = queue.get_nowait()
+                work.close()
+        self._chat_worker_tasks.clear()
+        self._chat_workers.clear()
 
     async def _show_daily_orders(self, update: Update):
         """Show today's orders as clickable summary with icons"""
@@ -631,7 +709,7 @@ class BotHandlers:
             summary_text = (
                 f"📊 سفارشات امروز ({persian_numbers(datetime.now().strftime('%Y/%m/%d'))})\n"
                 f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n"
-                f"📦 تعداد کل: {persian_numbers(str(len(today_orders)))}\n\n"
+                f"📦 تعداد کل: {persian_numbers(len(today_orders))}\n\n"
                 f"🔽 روی هر آیکون کلیک کنید تا فاکتور کامل را ببینید:\n\n")
 
             # Create inline keyboard with clickable order icons
@@ -640,7 +718,7 @@ class BotHandlers:
                 customer = order.get('customer', {})
                 status_icon = "🆕" if order.get('status') == 'pending' else "✅"
 
-                button_text = f"{status_icon} {persian_numbers(str(i))} - {customer.get('name', 'نامشخص')[:10]}"
+                button_text = f"{status_icon} {persian_numbers(i)} - {customer.get('name', 'نامشخص')[:10]}"
                 callback_data = f"order_details_{order['order_id']}"
 
                 keyboard.append([
@@ -679,37 +757,26 @@ class BotHandlers:
                     "هیچ فاکتوری امروز صادر نشده است. 📋")
                 return
 
-            invoice_text = (
-                f"📄 فاکتورهای امروز ({persian_numbers(datetime.now().strftime('%Y/%m/%d'))})\n"
-                f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n\n")
+            today_str = persian_numbers(datetime.now().strftime('%Y/%m/%d'))
+            parts = [f"📄 فاکتورهای امروز ({today_str})\n"
+                     f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n\n"]
 
             for i, order in enumerate(today_orders, 1):
                 customer = order.get('customer', {})
                 pricing = order.get('pricing', {})
 
-                invoice_text += (
-                    f"{persian_numbers(str(i))}. 📋 {order['order_id']}\n"
+                parts.append(
+                    f"{persian_numbers(i)}. 📋 {order['order_id']}\n"
                     f"   👤 {customer.get('name', 'نامشخص')}\n"
                     f"   🏙️ {customer.get('city', 'نامشخص')}\n"
                     f"   💰 {format_price(pricing.get('total', 0))} تومان\n"
                     f"   📊 {self.order_server._get_status_text(order.get('status', 'pending'))}\n\n"
                 )
+            invoice_text = "".join(parts)
 
             # Create action keyboard
-            keyboard = [[
-                InlineKeyboardButton("💾 ذخیره گزارش",
-                                     callback_data="save_daily_invoices"),
-                InlineKeyboardButton("📧 ارسال ایمیل",
-                                     callback_data="email_daily_invoices")
-            ],
-                        [
-                            InlineKeyboardButton(
-                                "🔄 بروزرسانی",
-                                callback_data="refresh_daily_invoices")
-                        ]]
-
             await update.message.reply_text(
-                invoice_text, reply_markup=InlineKeyboardMarkup(keyboard))
+                invoice_text, reply_markup=_DAILY_INVOICES_KB)
 
         except Exception as e:
             logger.error(f"Error showing daily invoices: {e}")
@@ -732,15 +799,15 @@ class BotHandlers:
             customer = order_data.get('customer', {})
             pricing = order_data.get('pricing', {})
 
-            order_info = (
-                f"📋 وضعیت سفارش: {order_id}\n"
-                f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n"
-                f"👤 مشتری: {customer.get('name', 'نامشخص')}\n"
-                f"🏙️ شهر: {customer.get('city', 'نامشخص')}\n"
-                f"📊 وضعیت فعلی: {status_text}\n"
-                f"💰 مبلغ کل: {format_price(pricing.get('total', 0))} تومان\n"
-                f"⏰ تاریخ ثبت: {persian_numbers(order_data.get('created_at', '')[:10])}\n"
-            )
+            order_info = _ORDER_STATUS_TMPL.format_map({
+                'order_id': order_id,
+                'name': customer.get('name', 'نامشخص'),
+                'city': customer.get('city', 'نامشخص'),
+                'status': status_text,
+                'total': format_price(pricing.get('total', 0)),
+                'created': persian_numbers(
+                    order_data.get('created_at', '')[:10]),
+            })
 
             # Create management keyboard
             keyboard = self.order_server._create_admin_buttons(
@@ -767,14 +834,14 @@ class BotHandlers:
             stats_text = (
                 f"📊 آمار کلی سفارشات\n"
                 f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n"
-                f"📦 کل سفارشات: {persian_numbers(str(stats.get('total_orders', 0)))}\n"
-                f"🆕 سفارشات امروز: {persian_numbers(str(stats.get('today_orders', 0)))}\n"
+                f"📦 کل سفارشات: {persian_numbers(stats.get('total_orders', 0))}\n"
+                f"🆕 سفارشات امروز: {persian_numbers(stats.get('today_orders', 0))}\n"
                 f"💰 درآمد کل: {format_price(stats.get('total_revenue', 0))} تومان\n"
                 f"💳 درآمد امروز: {format_price(stats.get('today_revenue', 0))} تومان\n\n"
                 f"📈 توزیع وضعیت:\n")
 
             for status, count in stats.get('status_distribution', {}).items():
-                stats_text += f"• {status}: {persian_numbers(str(count))}\n"
+                stats_text += f"• {status}: {persian_numbers(count)}\n"
 
             await update.message.reply_text(stats_text)
 
@@ -815,13 +882,7 @@ class BotHandlers:
                 f"📦 آیتم‌ها:\n")
 
             # Add cart items
-            for i, item in enumerate(cart_items, 1):
-                item_total = item.get('price', 0) * item.get('quantity', 0)
-                invoice_card += (
-                    f"{persian_numbers(str(i))}. {item.get('product_name', 'محصول')}\n"
-                    f"   📏 {item.get('size', 'نامشخص')} | "
-                    f"📦 {persian_numbers(str(item.get('quantity', 0)))} عدد | "
-                    f"💰 {format_price(item_total)}\n")
+            invoice_card += _format_invoice_items(cart_items)
 
             # Add pricing
             invoice_card += (
@@ -876,9 +937,7 @@ class BotHandlers:
         user_id = query.from_user.id
 
         # Set user state to awaiting customer code
-        if user_id not in self.user_sessions:
-            self.user_sessions[user_id] = {}
-        self.user_sessions[user_id]['awaiting_customer_code'] = True
+        self._session(user_id).awaiting_customer_code = True
 
         text = ("🔐 احراز هویت \n\n"
                 " لطفاً کد نمایندگی خود را وارد کنید:")
@@ -893,11 +952,8 @@ class BotHandlers:
 
         if customer:
             # Authentication successful
-            self.user_sessions[user_id] = {
-                'authenticated': True,
-                'customer': customer,
-                'awaiting_customer_code': False
-            }
+            self.user_sessions[user_id] = UserSession(authenticated=True,
+                                                      customer=customer)
 
             welcome_text = (f"✅ خوش آمدید {customer['name']} عزیز!\n"
                             f"🏙️ شهر: {customer['city']}\n"
@@ -920,7 +976,7 @@ class BotHandlers:
         authenticated = self._is_authenticated(user_id)
 
         if authenticated:
-            customer = self.user_sessions[user_id]['customer']
+            customer = self.user_sessions[user_id].customer
             text = (f"🏠 منوی اصلی\n\n"
                     f"👤 {customer['name']}\n"
                     f"🏙️ {customer['city']}\n\n"
@@ -953,25 +1009,26 @@ class BotHandlers:
             await query.edit_message_text("ابتدا باید احراز هویت کنید.")
             return
 
-        cart_items = self.cart_manager.get_cart(user_id)
+        cart_items = await self.cart_manager.get_cart(user_id)
 
         if not cart_items:
             text = "🛍️ سبد خرید شما خالی است."
             keyboard = self.keyboards.get_main_menu(authenticated=True)
         else:
-            text = "🛍️ سبد خرید شما:\n\n"
+            parts = ["🛍️ سبد خرید شما:\n\n"]
             total = 0
 
             for i, item in enumerate(cart_items, 1):
                 item_total = item['price'] * item['quantity']
                 total += item_total
-                text += (
-                    f"{persian_numbers(str(i))}. {item['product_name']}\n"
+                parts.append(
+                    f"{persian_numbers(i)}. {item['product_name']}\n"
                     f"   📏 سایز: {item['size']}\n"
-                    f"   📦 تعداد: {persian_numbers(str(item['quantity']))}\n"
+                    f"   📦 تعداد: {persian_numbers(item['quantity'])}\n"
                     f"   💰 قیمت: {format_price(item_total)} تومان\n\n")
 
-            text += f"💰 مجموع: {format_price(total)} تومان"
+            parts.append(f"💰 مجموع: {format_price(total)} تومان")
+            text = "".join(parts)
             keyboard = self.keyboards.get_cart_management_keyboard()
 
         await query.edit_message_text(text, reply_markup=keyboard)
@@ -984,8 +1041,8 @@ class BotHandlers:
             await query.edit_message_text("ابتدا باید احراز هویت کنید.")
             return
 
-        cart_items = self.cart_manager.get_cart(user_id)
-        customer = self.user_sessions[user_id]['customer']
+        cart_items = await self.cart_manager.get_cart(user_id)
+        customer = self.user_sessions[user_id].customer
 
         invoice_text = self.pricing_manager.generate_invoice(
             cart_items, customer)
@@ -999,9 +1056,7 @@ class BotHandlers:
         user_id = query.from_user.id
 
         # Store selected category in session
-        if user_id not in self.user_sessions:
-            self.user_sessions[user_id] = {}
-        self.user_sessions[user_id]['selected_category'] = category
+        self._session(user_id).selected_category = category
 
         category_info = get_category_info(category)
         category_name = category_info.get('name', category)
@@ -1037,9 +1092,7 @@ class BotHandlers:
         user_id = query.from_user.id
 
         # Store selected subcategory in session
-        if user_id not in self.user_sessions:
-            self.user_sessions[user_id] = {}
-        self.user_sessions[user_id]['selected_subcategory'] = subcategory
+        self._session(user_id).selected_subcategory = subcategory
 
         text = f"🔤 جستجوی حروف الفبایی\n\nحرف اول نام محصول مورد نظر را انتخاب کنید:"
         keyboard = self.keyboards.get_alphabetical_keyboard(subcategory)
@@ -1056,7 +1109,7 @@ class BotHandlers:
         user_id = query.from_user.id
 
         # Get products starting with selected letter
-        subcategory = self.user_sessions[user_id].get('selected_subcategory')
+        subcategory = self.user_sessions[user_id].selected_subcategory
         actual_category = subcategory if subcategory else category
 
         products = search_products_by_name(category, letter, subcategory)
@@ -1070,7 +1123,7 @@ class BotHandlers:
             keyboard = self.keyboards.get_products_keyboard(products, category)
 
             # Store filtered products in session
-            self.user_sessions[user_id]['filtered_products'] = products
+            self.user_sessions[user_id].filtered_products = products
 
         await query.edit_message_text(text, reply_markup=keyboard)
 
@@ -1087,7 +1140,7 @@ class BotHandlers:
             return
 
         # Store selected product in session
-        self.user_sessions[user_id]['selected_product'] = product
+        self.user_sessions[user_id].selected_product = product
 
         # Get price based on product (check for special pricing first)
         category = product.get('category_id', 'baby')
@@ -1101,10 +1154,10 @@ class BotHandlers:
                         f"💰 قیمت: {format_price(price)} تومان\n\n"
                         "عالیه! انتخابت\n"
                         "ارتفاع: 240 و عرض 2×290 هست که قابل تغییر نیست")
-                self.user_sessions[user_id]['selected_fabric'] = 'special'
-                self.user_sessions[user_id]['selected_category'] = category
-                self.user_sessions[user_id][
-                    'selected_size'] = 'ارتفاع: 240 - عرض: 2×290'
+                self.user_sessions[user_id].selected_fabric = 'special'
+                self.user_sessions[user_id].selected_category = category
+                self.user_sessions[user_id].selected_size = (
+                    'ارتفاع: 240 - عرض: 2×290')
 
                 keyboard = [[
                     InlineKeyboardButton("بله همین محصول رو میخوام",
@@ -1126,14 +1179,14 @@ class BotHandlers:
                     f"💰 قیمت: از {format_price(price)} تومان\n\n"
                     "سایز مورد نظر را انتخاب کنید:")
             # Store category for size selection
-            self.user_sessions[user_id]['selected_category'] = category
+            self.user_sessions[user_id].selected_category = category
             keyboard = self.keyboards.get_size_selection_keyboard(category)
         # For cushions, skip size selection and go directly to quantity
         elif category == 'cushion':
             price = get_product_price(product['id'], category)
             # Store default size for cushions
-            self.user_sessions[user_id]['selected_size'] = 'استاندارد'
-            self.user_sessions[user_id]['selected_category'] = category
+            self.user_sessions[user_id].selected_size = 'استاندارد'
+            self.user_sessions[user_id].selected_category = category
 
             text = (f" {product['name']}\n"
                     f" قیمت: {format_price(price)} تومان\n\n"
@@ -1154,9 +1207,7 @@ class BotHandlers:
         user_id = query.from_user.id
 
         # Store selected category in session
-        if user_id not in self.user_sessions:
-            self.user_sessions[user_id] = {}
-        self.user_sessions[user_id]['selected_category'] = category
+        self._session(user_id).selected_category = category
 
         category_info = get_category_info(category)
         category_name = category_info.get('name', category)
@@ -1184,19 +1235,15 @@ class BotHandlers:
                 category = parts[-1]  # Last part is category
             else:
                 size = data.replace("size_", "")
-                category = self.user_sessions.get(query.from_user.id,
-                                                  {}).get('selected_category',
-                                                          'baby')
+                category = self._session(
+                    query.from_user.id).selected_category or 'baby'
 
             user_id = query.from_user.id
 
-            # Ensure user session exists
-            if user_id not in self.user_sessions:
-                self.user_sessions[user_id] = {}
-
             # Store selected size and category in session
-            self.user_sessions[user_id]['selected_size'] = size
-            self.user_sessions[user_id]['selected_category'] = category
+            session = self._session(user_id)
+            session.selected_size = size
+            session.selected_category = category
 
             # Get category info for price
             category_info = get_category_info(category)
@@ -1229,14 +1276,14 @@ class BotHandlers:
 
         # Get session data
         session = self.user_sessions[user_id]
-        size = session.get('selected_size')
-        category = session.get('selected_category', 'baby')
-        fabric = session.get('selected_fabric')
+        size = session.selected_size
+        category = session.selected_category or 'baby'
+        fabric = session.selected_fabric
 
         # Check if we have a specific product or just category
-        if 'selected_product' in session:
+        if session.selected_product is not None:
             # Product-based ordering
-            product = session['selected_product']
+            product = session.selected_product
             category = product.get('category_id', category)
             product_name = product['name']
             product_id = product['id']
@@ -1263,7 +1310,7 @@ class BotHandlers:
             product_name = f"{product_name} - {fabric_name}"
 
             # Add sewing type if available
-            sewing_type = session.get('selected_sewing_type')
+            sewing_type = session.selected_sewing_type
             if sewing_type:
                 sewing_type_name = "پانچ" if sewing_type == "panch" else "نواردوزی"
                 product_name = f"{product_name} - {sewing_type_name}"
@@ -1277,13 +1324,13 @@ class BotHandlers:
             'price': price
         }
 
-        self.cart_manager.add_to_cart(user_id, cart_item)
+        await self.cart_manager.add_to_cart(user_id, cart_item)
 
         total_price = price * quantity
         text = (f"✅ محصول به سبد خرید اضافه شد!\n\n"
                 f" {product_name}\n"
                 f" سایز: {size}\n"
-                f" تعداد: {persian_numbers(str(quantity))}\n"
+                f" تعداد: {persian_numbers(quantity)}\n"
                 f" قیمت کل: {format_price(total_price)} تومان\n\n"
                 "می‌خواهید چه کار کنید؟")
 
@@ -1301,20 +1348,20 @@ class BotHandlers:
                 reply_markup=self.keyboards.get_main_menu(authenticated=False))
             return
 
-        cart_items = self.cart_manager.get_cart(user_id)
+        cart_items = await self.cart_manager.get_cart(user_id)
         if not cart_items:
             await query.edit_message_text(
                 "❌ سبد خرید شما خالی است.",
                 reply_markup=self.keyboards.get_main_menu(authenticated=True))
             return
 
-        customer = self.user_sessions[user_id]['customer']
+        customer = self.user_sessions[user_id].customer
 
         # Extract payment method from callback data
         payment_method = data.replace("payment_", "").replace("_card", "")
         
         # Store payment method in session
-        self.user_sessions[user_id]['selected_payment_method'] = payment_method
+        self.user_sessions[user_id].selected_payment_method = payment_method
         
         # Calculate amounts for display
         subtotal = self.pricing_manager.calculate_subtotal(cart_items)
@@ -1361,11 +1408,11 @@ class BotHandlers:
         payment_method = parts[3]  # cash, 60day, 90day
         
         # Store payment details in session
-        self.user_sessions[user_id]['payment_type'] = payment_type
-        self.user_sessions[user_id]['selected_payment_method'] = payment_method
+        self.user_sessions[user_id].payment_type = payment_type
+        self.user_sessions[user_id].selected_payment_method = payment_method
         
-        cart_items = self.cart_manager.get_cart(user_id)
-        customer = self.user_sessions[user_id]['customer']
+        cart_items = await self.cart_manager.get_cart(user_id)
+        customer = self.user_sessions[user_id].customer
         
         # Calculate amounts
         subtotal = self.pricing_manager.calculate_subtotal(cart_items)
@@ -1397,12 +1444,12 @@ class BotHandlers:
             payment_amount = final_amount
             
         # Store payment info for receipt processing
-        self.user_sessions[user_id]['payment_info'] = {
+        self.user_sessions[user_id].payment_info = {
             'payment_method': f"پرداخت نقدی - {payment_method}",
             'amount': payment_amount,
-            'subtotal': self.pricing_manager.calculate_subtotal(self.cart_manager.get_cart(user_id)),
+            'subtotal': self.pricing_manager.calculate_subtotal(await self.cart_manager.get_cart(user_id)),
             'discount_rate': 0.30 if payment_method == "cash" else 0.25,
-            'discount': self.pricing_manager.calculate_subtotal(self.cart_manager.get_cart(user_id)) - final_amount,
+            'discount': self.pricing_manager.calculate_subtotal(await self.cart_manager.get_cart(user_id)) - final_amount,
             'awaiting_receipt': True
         }
         
@@ -1432,7 +1479,7 @@ class BotHandlers:
             payment_amount = final_amount
             
         # Store check payment info
-        self.user_sessions[user_id]['check_payment_info'] = {
+        self.user_sessions[user_id].check_payment_info = {
             'payment_method': f"پرداخت چکی - {payment_method}",
             'amount': payment_amount,
             'final_amount': final_amount,
@@ -1452,9 +1499,7 @@ class BotHandlers:
         user_id = query.from_user.id
         
         # Set awaiting check photo flag
-        if user_id not in self.user_sessions:
-            self.user_sessions[user_id] = {}
-        self.user_sessions[user_id]['awaiting_check_photo'] = True
+        self._session(user_id).awaiting_check_photo = True
         
         text = "📸 لطفاً عکس چک خود را ارسال کنید:"
         await query.edit_message_text(text)
@@ -1475,10 +1520,10 @@ class BotHandlers:
         user_id = query.from_user.id
         
         # Get check payment info and send final invoice to support group
-        check_info = self.user_sessions[user_id].get('check_payment_info', {})
-        customer = self.user_sessions[user_id]['customer']
-        cart_items = self.cart_manager.get_cart(user_id)
-        check_photo = self.user_sessions[user_id].get('check_photo')
+        check_info = self.user_sessions[user_id].check_payment_info or {}
+        customer = self.user_sessions[user_id].customer
+        cart_items = await self.cart_manager.get_cart(user_id)
+        check_photo = self.user_sessions[user_id].check_photo
         
         if not check_photo:
             await query.edit_message_text("❌ لطفاً ابتدا عکس چک را ارسال کنید.")
@@ -1488,11 +1533,11 @@ class BotHandlers:
         await self._submit_check_order_to_support(user_id, check_info, customer, cart_items, check_photo)
         
         # Clear cart and session data
-        self.cart_manager.clear_cart(user_id)
+        await self.cart_manager.clear_cart(user_id)
         if user_id in self.user_sessions:
-            self.user_sessions[user_id].pop('check_payment_info', None)
-            self.user_sessions[user_id].pop('check_photo', None)
-            self.user_sessions[user_id].pop('awaiting_check_photo', None)
+            self.user_sessions[user_id].check_payment_info = None
+            self.user_sessions[user_id].check_photo = None
+            self.user_sessions[user_id].awaiting_check_photo = False
         
         text = ("✅ سفارش شما با موفقیت ثبت شد!\n\n"
                 "📄 چک شما به همراه فاکتور نهایی برای تیم پشتیبانی ارسال شد.\n"
@@ -1506,13 +1551,13 @@ class BotHandlers:
         """Handle check photo upload"""
         # Store photo info
         photo = update.message.photo[-1]  # Get highest resolution photo
-        self.user_sessions[user_id]['check_photo'] = {
+        self.user_sessions[user_id].check_photo = {
             'file_id': photo.file_id,
             'file_unique_id': photo.file_unique_id
         }
         
         # Clear the awaiting flag
-        self.user_sessions[user_id]['awaiting_check_photo'] = False
+        self.user_sessions[user_id].awaiting_check_photo = False
         
         # Send to support group for admin review
         await self._send_check_to_support_for_review(user_id, photo)
@@ -1528,8 +1573,8 @@ class BotHandlers:
     async def _send_check_to_support_for_review(self, user_id, photo):
         """Send check photo to support group for admin review"""
         try:
-            customer = self.user_sessions[user_id]['customer']
-            check_info = self.user_sessions[user_id].get('check_payment_info', {})
+            customer = self.user_sessions[user_id].customer
+            check_info = self.user_sessions[user_id].check_payment_info or {}
             
             # Create message for support group
             support_text = (f"📄 چک جدید دریافت شد\n"
@@ -1586,12 +1631,7 @@ class BotHandlers:
                            f"📦 آیتم‌ها:\n")
             
             # Add cart items
-            for i, item in enumerate(cart_items, 1):
-                item_total = item.get('price', 0) * item.get('quantity', 0)
-                invoice_text += (f"{persian_numbers(str(i))}. {item.get('product_name', 'محصول')}\n"
-                               f"   📏 {item.get('size', 'نامشخص')} | "
-                               f"📦 {persian_numbers(str(item.get('quantity', 0)))} عدد | "
-                               f"💰 {format_price(item_total)}\n")
+            invoice_text += _format_invoice_items(cart_items)
             
             invoice_text += (f"\n🕐 چک باید طی ۱۰ روز کاری به کارخانه ارسال شود\n"
                            f"✅ آماده تایید و پردازش")
@@ -1706,8 +1746,8 @@ class BotHandlers:
                                        payment_method: str):
         """Handle ZarinPal payment"""
         user_id = query.from_user.id
-        cart_items = self.cart_manager.get_cart(user_id)
-        customer = self.user_sessions[user_id]['customer']
+        cart_items = await self.cart_manager.get_cart(user_id)
+        customer = self.user_sessions[user_id].customer
 
         if not cart_items:
             await query.edit_message_text(
@@ -1734,7 +1774,7 @@ class BotHandlers:
         # Create payment request with proper callback URL
         callback_url = "https://www.zarinpal.com/pg/services/WebGate/wsdl"  # Temporary callback
 
-        payment_result = self.zarinpal.create_payment_request(
+        payment_result = await self.zarinpal.create_payment_request(
             amount=amount,
             description=description,
             callback_url=callback_url,
@@ -1743,7 +1783,7 @@ class BotHandlers:
 
         if payment_result['success']:
             # Store payment info in session
-            self.user_sessions[user_id]['payment_info'] = {
+            self.user_sessions[user_id].payment_info = {
                 'authority': payment_result['authority'],
                 'amount': amount,
                 'payment_type': payment_type,
@@ -1795,8 +1835,8 @@ class BotHandlers:
                                            discount_rate: float):
         """Handle card-to-card payment"""
         user_id = query.from_user.id
-        cart_items = self.cart_manager.get_cart(user_id)
-        customer = self.user_sessions[user_id]['customer']
+        cart_items = await self.cart_manager.get_cart(user_id)
+        customer = self.user_sessions[user_id].customer
 
         if not cart_items:
             await query.edit_message_text(
@@ -1811,7 +1851,7 @@ class BotHandlers:
         final_amount = subtotal - discount
 
         # Store payment info in session
-        self.user_sessions[user_id]['payment_info'] = {
+        self.user_sessions[user_id].payment_info = {
             'payment_type':
             payment_type,
             'payment_method':
@@ -1845,12 +1885,7 @@ class BotHandlers:
                 f"👤 به نام:نیما کریمی\n\n"
                 f"📸 پس از واریز، لطفاً عکس فیش واریزی را ارسال کنید:")
             # Create keyboard for cash payment
-            keyboard = [[
-                InlineKeyboardButton("📸 ارسال فیش واریزی",
-                                     callback_data="upload_receipt")
-            ], [
-                InlineKeyboardButton("🔙 بازگشت", callback_data="view_invoice")
-            ]]
+            keyboard = _UPLOAD_RECEIPT_KB
 
         elif payment_type == "60day":
             payment_details = (
@@ -1863,16 +1898,7 @@ class BotHandlers:
                 f"درصورت پرداخت به صورت چکی، تاریخ سر رسید چک در همین دوماه باشد\n\n"
                 f"نوع پرداخت خود را انتخاب کنید:")
             # Create keyboard for 60-day payment with cash/check options
-            keyboard = [[
-                InlineKeyboardButton("💰 پرداخت نقدی",
-                                     callback_data="payment_type_cash_60day")
-            ], [
-                InlineKeyboardButton("📋 پرداخت چکی",
-                                     callback_data="payment_type_check_60day")
-            ], [
-                InlineKeyboardButton("🔙 بازگشت",
-                                     callback_data="view_invoice")
-            ]]
+            keyboard = _PAYMENT_TYPE_60DAY_KB
 
         elif payment_type == "90day":
             advance_payment = int(final_amount * 0.25)
@@ -1886,25 +1912,16 @@ class BotHandlers:
                 f"نوع پرداخت خود را انتخاب کنید:"
             )
             # Create keyboard for 90-day payment with cash/check options
-            keyboard = [[
-                InlineKeyboardButton("💰 پرداخت نقدی",
-                                     callback_data="payment_type_cash_90day")
-            ], [
-                InlineKeyboardButton("📋 پرداخت چکی",
-                                     callback_data="payment_type_check_90day")
-            ], [
-                InlineKeyboardButton("🔙 بازگشت", callback_data="view_invoice")
-            ]]
+            keyboard = _PAYMENT_TYPE_90DAY_KB
 
-        await query.edit_message_text(
-            payment_details, reply_markup=InlineKeyboardMarkup(keyboard))
+        await query.edit_message_text(payment_details, reply_markup=keyboard)
 
     async def _handle_check_payment(self, query, payment_type: str,
                                     payment_method: str, discount_rate: float):
         """Handle check payment method"""
         user_id = query.from_user.id
-        cart_items = self.cart_manager.get_cart(user_id)
-        customer = self.user_sessions[user_id]['customer']
+        cart_items = await self.cart_manager.get_cart(user_id)
+        customer = self.user_sessions[user_id].customer
 
         if not cart_items:
             await query.edit_message_text(
@@ -1919,7 +1936,7 @@ class BotHandlers:
         final_amount = subtotal - discount
 
         # Store payment info in session
-        self.user_sessions[user_id]['payment_info'] = {
+        self.user_sessions[user_id].payment_info = {
             'payment_type': payment_type,
             'payment_method': payment_method,
             'amount': final_amount,
@@ -1941,13 +1958,8 @@ class BotHandlers:
             f"📝 نکته: درصورت خرید به صورت چکی لطفاً چک را به کارخانه ارسال کنید"
         )
 
-        keyboard = [[
-            InlineKeyboardButton("📸  ارسال چک ثبت شده ",
-                                 callback_data="upload_receipt")
-        ], [InlineKeyboardButton("🔙 بازگشت", callback_data="view_invoice")]]
-
-        await query.edit_message_text(
-            payment_details, reply_markup=InlineKeyboardMarkup(keyboard))
+        await query.edit_message_text(payment_details,
+                                      reply_markup=_UPLOAD_CHECK_KB)
 
     async def _handle_payment_terms_confirmation(self, query):
         """Handle payment terms confirmation for 60-day and 90-day payments"""
@@ -1957,15 +1969,15 @@ class BotHandlers:
             await query.edit_message_text("❌ ابتدا باید احراز هویت کنید.")
             return
 
-        payment_info = self.user_sessions[user_id].get('payment_info')
+        payment_info = self.user_sessions[user_id].payment_info
         if not payment_info:
             await query.edit_message_text(
                 "❌ اطلاعات پرداخت یافت نشد.",
                 reply_markup=self.keyboards.get_main_menu(authenticated=True))
             return
 
-        customer = self.user_sessions[user_id]['customer']
-        cart_items = self.cart_manager.get_cart(user_id)
+        customer = self.user_sessions[user_id].customer
+        cart_items = await self.cart_manager.get_cart(user_id)
 
         # Send invoice to support group
         invoice_text = self.pricing_manager.generate_final_invoice(
@@ -2036,12 +2048,7 @@ class BotHandlers:
             f"💰 مبلغ پیش‌پرداخت: {format_price(payment_info['amount'])} تومان\n"
             f"📅 یادآوری ماهانه برای مابقی پرداخت تنظیم شد\n\n"
             f"📸 لطفاً عکس فیش واریز پیش‌پرداخت را ارسال کنید:",
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("📸 ارسال فیش واریزی",
-                                     callback_data="upload_receipt")
-            ], [
-                InlineKeyboardButton("🔙 بازگشت", callback_data="view_invoice")
-            ]]))
+            reply_markup=_UPLOAD_RECEIPT_KB)
 
         if payment_type in ["60day", "90day"]:
             keyboard = [[
@@ -2064,7 +2071,7 @@ class BotHandlers:
     async def _handle_upload_receipt_request(self, query):
         """Handle receipt upload request"""
         user_id = query.from_user.id
-        payment_info = self.user_sessions[user_id].get('payment_info', {})
+        payment_info = self.user_sessions[user_id].payment_info or {}
 
         if payment_info.get('is_check_payment'):
             message_text = (
@@ -2100,9 +2107,9 @@ class BotHandlers:
                 reply_markup=self.keyboards.get_main_menu(authenticated=False))
             return
 
-        customer = self.user_sessions[user_id]['customer']
-        cart_items = self.cart_manager.get_cart(user_id)
-        payment_info = self.user_sessions[user_id].get('payment_info')
+        customer = self.user_sessions[user_id].customer
+        cart_items = await self.cart_manager.get_cart(user_id)
+        payment_info = self.user_sessions[user_id].payment_info
 
         if not payment_info:
             await query.edit_message_text(
@@ -2119,9 +2126,9 @@ class BotHandlers:
         try:
             # Get receipt photo if available
             receipt_photo_id = None
-            if 'receipt_photo' in self.user_sessions[user_id]:
-                receipt_photo_id = self.user_sessions[user_id][
-                    'receipt_photo']['file_id']
+            if self.user_sessions[user_id].receipt_photo is not None:
+                receipt_photo_id = self.user_sessions[
+                    user_id].receipt_photo['file_id']
 
             # Send receipt/check photo to support group before creating order
             if receipt_photo_id and self.config.order_group_chat_id:
@@ -2159,11 +2166,9 @@ class BotHandlers:
                 receipt_photo_id=receipt_photo_id)
 
             # Clear cart and payment info
-            self.cart_manager.clear_cart(user_id)
-            if 'payment_info' in self.user_sessions[user_id]:
-                del self.user_sessions[user_id]['payment_info']
-            if 'receipt_photo' in self.user_sessions[user_id]:
-                del self.user_sessions[user_id]['receipt_photo']
+            await self.cart_manager.clear_cart(user_id)
+            self.user_sessions[user_id].payment_info = None
+            self.user_sessions[user_id].receipt_photo = None
 
             # Confirm to customer
             await query.edit_message_text(
@@ -2206,8 +2211,8 @@ class BotHandlers:
                                     payment_method: str):
         """Handle group payment (installment)"""
         user_id = query.from_user.id
-        cart_items = self.cart_manager.get_cart(user_id)
-        customer = self.user_sessions[user_id]['customer']
+        cart_items = await self.cart_manager.get_cart(user_id)
+        customer = self.user_sessions[user_id].customer
 
         # Check if cart is not empty
         if not cart_items:
@@ -2244,7 +2249,7 @@ class BotHandlers:
             ]]
 
             # Store order info for confirmation```python
-            self.user_sessions[user_id]['pending_order'] = {
+            self.user_sessions[user_id].pending_order = {
                 'payment_method': payment_method,
                 'discount_rate': discount_rate,
                 'invoice_text': invoice_text
@@ -2273,9 +2278,9 @@ class BotHandlers:
                 reply_markup=self.keyboards.get_main_menu(authenticated=False))
             return
 
-        customer = self.user_sessions[user_id]['customer']
-        cart_items = self.cart_manager.get_cart(user_id)
-        pending_order = self.user_sessions[user_id].get('pending_order')
+        customer = self.user_sessions[user_id].customer
+        cart_items = await self.cart_manager.get_cart(user_id)
+        pending_order = self.user_sessions[user_id].pending_order
 
         if not pending_order:
             await query.edit_message_text(
@@ -2299,12 +2304,11 @@ class BotHandlers:
                 discount_rate=pending_order['discount_rate'])
 
             # Clear cart and session
-            self.cart_manager.clear_cart(user_id)
-            if 'pending_order' in self.user_sessions[user_id]:
-                del self.user_sessions[user_id]['pending_order']
+            await self.cart_manager.clear_cart(user_id)
+            self.user_sessions[user_id].pending_order = None
 
             # Store order ID in session
-            self.user_sessions[user_id]['last_order_id'] = order_id
+            self.user_sessions[user_id].last_order_id = order_id
 
             # Confirm to customer
             await query.edit_message_text(
@@ -2328,7 +2332,7 @@ class BotHandlers:
             await query.edit_message_text("❌ ابتدا باید احراز هویت کنید.")
             return
 
-        payment_info = self.user_sessions[user_id].get('payment_info')
+        payment_info = self.user_sessions[user_id].payment_info
         if not payment_info:
             await query.edit_message_text(
                 "❌ اطلاعات پرداخت یافت نشد.\n"
@@ -2336,8 +2340,8 @@ class BotHandlers:
                 reply_markup=self.keyboards.get_main_menu(authenticated=True))
             return
 
-        customer = self.user_sessions[user_id]['customer']
-        cart_items = self.cart_manager.get_cart(user_id)
+        customer = self.user_sessions[user_id].customer
+        cart_items = await self.cart_manager.get_cart(user_id)
 
         # Generate final invoice
         discount_rate = self.pricing_manager.discount_rates.get(
@@ -2399,7 +2403,7 @@ class BotHandlers:
                     'status': 'paid',
                     'created_at': datetime.now().isoformat()
                 }
-                self.user_sessions[user_id]['order_info'] = order_info
+                self.user_sessions[user_id].order_info = order_info
 
             except Exception as e:
                 logger.error(
@@ -2418,9 +2422,8 @@ class BotHandlers:
             )
 
         # Clear cart and payment info
-        self.cart_manager.clear_cart(user_id)
-        if 'payment_info' in self.user_sessions[user_id]:
-            del self.user_sessions[user_id]['payment_info']
+        await self.cart_manager.clear_cart(user_id)
+        self.user_sessions[user_id].payment_info = None
 
         text = (
             f"✅ سفارش شما ثبت شد!\n\n"
@@ -2436,7 +2439,7 @@ class BotHandlers:
     async def _handle_payment_verification(self, query):
         """Handle payment verification"""
         user_id = query.from_user.id
-        payment_info = self.user_sessions[user_id].get('payment_info')
+        payment_info = self.user_sessions[user_id].payment_info
 
         if not payment_info:
             await query.edit_message_text(
@@ -2445,13 +2448,13 @@ class BotHandlers:
             return
 
         # Verify payment with ZarinPal
-        verify_result = self.zarinpal.verify_payment(
+        verify_result = await self.zarinpal.verify_payment(
             authority=payment_info['authority'], amount=payment_info['amount'])
 
         if verify_result['success']:
             # Payment successful
-            customer = self.user_sessions[user_id]['customer']
-            cart_items = self.cart_manager.get_cart(user_id)
+            customer = self.user_sessions[user_id].customer
+            cart_items = await self.cart_manager.get_cart(user_id)
 
             # Generate final invoice
             discount_rate = self.pricing_manager.discount_rates[
@@ -2481,9 +2484,8 @@ class BotHandlers:
                         f"Error sending payment confirmation to group: {e}")
 
             # Clear cart and payment info
-            self.cart_manager.clear_cart(user_id)
-            if 'payment_info' in self.user_sessions[user_id]:
-                del self.user_sessions[user_id]['payment_info']
+            await self.cart_manager.clear_cart(user_id)
+            self.user_sessions[user_id].payment_info = None
 
             text = (f"✅ پرداخت با موفقیت انجام شد!\n\n"
                     f"💳 شماره پیگیری: {verify_result['ref_id']}\n\n"
@@ -2514,7 +2516,7 @@ class BotHandlers:
     async def _handle_cart_clear(self, query):
         """Handle cart clear"""
         user_id = query.from_user.id
-        self.cart_manager.clear_cart(user_id)
+        await self.cart_manager.clear_cart(user_id)
 
         text = "🗑️ سبد خرید پاک شد."
         keyboard = self.keyboards.get_main_menu(authenticated=True)
@@ -2528,7 +2530,7 @@ class BotHandlers:
     async def _handle_back_to_alphabet(self, query):
         """Handle back to alphabet"""
         user_id = query.from_user.id
-        category = self.user_sessions[user_id].get('selected_category', 'baby')
+        category = self.user_sessions[user_id].selected_category or 'baby'
 
         text = f"🔤 جستجوی حروف الفبایی\n\nحرف اول نام محصول مورد نظر را انتخاب کنید:"
         keyboard = self.keyboards.get_alphabetical_keyboard(category)
@@ -2546,8 +2548,8 @@ class BotHandlers:
         user_id = query.from_user.id
         session = self.user_sessions[user_id]
 
-        if 'selected_product' in session:
-            product = session['selected_product']
+        if session.selected_product is not None:
+            product = session.selected_product
 
             # Get price based on category
             category = product.get('category_id', 'baby')
@@ -2567,9 +2569,7 @@ class BotHandlers:
         user_id = query.from_user.id
 
         # Store selected category in session
-        if user_id not in self.user_sessions:
-            self.user_sessions[user_id] = {}
-        self.user_sessions[user_id]['selected_category'] = category
+        self._session(user_id).selected_category = category
 
         category_info = get_category_info(category)
         category_name = category_info.get('name', category)
@@ -2613,7 +2613,7 @@ class BotHandlers:
         user_id = int(data.split("_")[2])
 
         # Get customer info
-        customer = self.user_sessions[user_id]['customer']
+        customer = self.user_sessions[user_id].customer
 
         # Send confirmation to customer
         text = (f"✅ پرداخت شما تایید شد!\n\n"
@@ -2634,7 +2634,7 @@ class BotHandlers:
         user_id = int(data.split("_")[2])
 
         # Get customer info
-        customer = self.user_sessions[user_id]['customer']
+        customer = self.user_sessions[user_id].customer
 
         # Edit message in group to confirm
         await query.edit_message_text(
@@ -2646,7 +2646,7 @@ class BotHandlers:
         user_id = int(data.split("_")[2])
 
         # Get customer info
-        customer = self.user_sessions[user_id]['customer']
+        customer = self.user_sessions[user_id].customer
 
         # Schedule reminder
         # self.payment_scheduler.schedule_reminder(user_id)
@@ -2929,13 +2929,7 @@ class BotHandlers:
                 f"📦 آیتم‌ها:\n")
 
             # Add cart items
-            for i, item in enumerate(cart_items, 1):
-                item_total = item.get('price', 0) * item.get('quantity', 0)
-                invoice_text += (
-                    f"{persian_numbers(str(i))}. {item.get('product_name', 'محصول')}\n"
-                    f"   📏 {item.get('size', 'نامشخص')} | "
-                    f"📦 {persian_numbers(str(item.get('quantity', 0)))} عدد | "
-                    f"💰 {format_price(item_total)}\n")
+            invoice_text += _format_invoice_items(cart_items)
 
             # Add pricing
             invoice_text += (
@@ -2969,20 +2963,15 @@ class BotHandlers:
             stats_text = (
                 f"📊 آمار امروز ({persian_numbers(datetime.now().strftime('%Y/%m/%d'))})\n"
                 f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n"
-                f"📦 سفارشات امروز: {persian_numbers(str(len(today_orders)))}\n"
+                f"📦 سفارشات امروز: {persian_numbers(len(today_orders))}\n"
                 f"💰 درآمد امروز: {format_price(stats.get('today_revenue', 0))} تومان\n\n"
                 f"📈 آمار کلی:\n"
-                f"📦 کل سفارشات: {persian_numbers(str(stats.get('total_orders', 0)))}\n"
+                f"📦 کل سفارشات: {persian_numbers(stats.get('total_orders', 0))}\n"
                 f"💳 کل درآمد: {format_price(stats.get('total_revenue', 0))} تومان\n"
             )
 
-            keyboard = [[
-                InlineKeyboardButton("🔙 بازگشت",
-                                     callback_data="back_to_daily_orders")
-            ]]
-
             await query.edit_message_text(
-                stats_text, reply_markup=InlineKeyboardMarkup(keyboard))
+                stats_text, reply_markup=_BACK_TO_DAILY_ORDERS_KB)
 
         except Exception as e:
             logger.error(f"Error showing daily stats: {e}")
@@ -3136,7 +3125,7 @@ class BotHandlers:
         user_id = query.from_user.id
 
         # Store selected sewing type in session
-        self.user_sessions[user_id]['selected_sewing_type'] = sewing_type
+        self.user_sessions[user_id].selected_sewing_type = sewing_type
 
         sewing_type_name = "پانچ" if sewing_type == "panch" else "نواردوزی"
 
@@ -3152,9 +3141,9 @@ class BotHandlers:
         user_id = query.from_user.id
 
         # Store selected fabric in session
-        self.user_sessions[user_id]['selected_fabric'] = fabric
+        self.user_sessions[user_id].selected_fabric = fabric
         category = 'curtain_only'
-        self.user_sessions[user_id]['selected_category'] = category
+        self.user_sessions[user_id].selected_category = category
 
         # Get price based on fabric
         price = get_product_price('', category, fabric=fabric)
@@ -3169,7 +3158,7 @@ class BotHandlers:
         )
 
         # Set flag for height input
-        self.user_sessions[user_id]['awaiting_curtain_height'] = True
+        self.user_sessions[user_id].awaiting_curtain_height = True
 
         keyboard = self.keyboards.get_height_input_keyboard()
         await query.edit_message_text(text, reply_markup=keyboard)
@@ -3187,19 +3176,19 @@ class BotHandlers:
                 return
 
             # Store height and clear input flag
-            self.user_sessions[user_id]['selected_height'] = height
-            self.user_sessions[user_id]['awaiting_curtain_height'] = False
+            self.user_sessions[user_id].selected_height = height
+            self.user_sessions[user_id].awaiting_curtain_height = False
 
             # Create custom size string for curtains
             size = f"عرض: 135 - ارتفاع: {height}م"
-            self.user_sessions[user_id]['selected_size'] = size
+            self.user_sessions[user_id].selected_size = size
 
             # Get price based on fabric
-            fabric = self.user_sessions[user_id]['selected_fabric']
-            category = self.user_sessions[user_id]['selected_category']
+            fabric = self.user_sessions[user_id].selected_fabric
+            category = self.user_sessions[user_id].selected_category
 
             if fabric == 'special':  # For bedside curtain
-                product = self.user_sessions[user_id]['selected_product']
+                product = self.user_sessions[user_id].selected_product
                 price = get_product_price(product['id'], category)
             else:
                 price = get_product_price('', category, fabric=fabric)
@@ -3219,7 +3208,7 @@ class BotHandlers:
         """Handle back to sewing type selection"""
         user_id = query.from_user.id
 
-        product = self.user_sessions[user_id].get('selected_product')
+        product = self.user_sessions[user_id].selected_product
         if product:
             text = (f"📦 {product['name']}\n\n"
                     "عالیه چه نوع دوختی مد نظرته؟")
@@ -3231,11 +3220,10 @@ class BotHandlers:
         user_id = query.from_user.id
 
         # Clear height input flag
-        if 'awaiting_curtain_height' in self.user_sessions[user_id]:
-            del self.user_sessions[user_id]['awaiting_curtain_height']
+        self.user_sessions[user_id].awaiting_curtain_height = False
 
-        sewing_type = self.user_sessions[user_id].get('selected_sewing_type',
-                                                      'panch')
+        sewing_type = (self.user_sessions[user_id].selected_sewing_type
+                       or 'panch')
         sewing_type_name = "پانچ" if sewing_type == "panch" else "نواردوزی"
 
         text = (f"✅ نوع دوخت انتخابی: {sewing_type_name}\n\n"
@@ -3263,15 +3251,20 @@ class BotHandlers:
                 await query.answer("درحال پردازش...")
         except Exception as e:
             logger.error(f"Order action error: {e}")
-            try:
+            with suppress(TelegramError):
                 await query.answer("❌ خطا در پردازش سفارش.")
-            except:
-                pass
+
+    def _session(self, user_id: int) -> UserSession:
+        """Get a user's session, starting an empty one if there is none"""
+        session = self.user_sessions.get(user_id)
+        if session is None:
+            session = self.user_sessions[user_id] = UserSession()
+        return session
 
     def _is_authenticated(self, user_id: int) -> bool:
         """Check if user is authenticated"""
         return (user_id in self.user_sessions
-                and self.user_sessions[user_id].get('authenticated', False))
+                and self.user_sessions[user_id].authenticated)
 
     async def test_group_connection(self, bot):
         """Test if bot can send messages to the configured group"""
@@ -3333,15 +3326,15 @@ class BotHandlers:
             await query.edit_message_text("❌ ابتدا باید احراز هویت کنید.")
             return
 
-        payment_info = self.user_sessions[user_id].get('payment_info')
+        payment_info = self.user_sessions[user_id].payment_info
         if not payment_info or payment_info['payment_type'] != '60day':
             await query.edit_message_text(
                 "❌ اطلاعات سفارش 60 روزه یافت نشد. لطفاً دوباره تلاش کنید.",
                 reply_markup=self.keyboards.get_main_menu(authenticated=True))
             return
 
-        customer = self.user_sessions[user_id]['customer']
-        cart_items = self.cart_manager.get_cart(user_id)
+        customer = self.user_sessions[user_id].customer
+        cart_items = await self.cart_manager.get_cart(user_id)
 
         # Schedule the 60-day payment reminder
         total_amount = payment_info['full_amount']
@@ -3368,9 +3361,8 @@ class BotHandlers:
                 discount_rate=payment_info['discount_rate'])
 
             # Clear cart and payment info
-            self.cart_manager.clear_cart(user_id)
-            if 'payment_info' in self.user_sessions[user_id]:
-                del self.user_sessions[user_id]['payment_info']
+            await self.cart_manager.clear_cart(user_id)
+            self.user_sessions[user_id].payment_info = None
 
             # Confirm to customer
             await query.edit_message_text(
@@ -3393,39 +3385,59 @@ class BotHandlers:
                 reply_markup=self.keyboards.get_main_menu(authenticated=True))
 
     # Pagination handlers
+    async def _edit_icon_page(self, query, category, page):
+        """Show one page of a paginated icon category"""
+        keyboard = self.keyboards.get_icon_page(category, page)
+        await query.edit_message_text(_ICON_PAGE_TITLES[category],
+                                      reply_markup=keyboard)
+
+    async def _handle_page_cursor(self, query, data):
+        """Handle cursor-based icon category pagination"""
+        resolved = resolve_page_cursor(data)
+        if resolved is None:
+            await query.edit_message_text("❌ داده نامعتبر.")
+            return
+        category, page = resolved
+        await self._edit_icon_page(query, category, page)
+
+    # Page-number callbacks are kept for keyboards sent before cursors
     async def _handle_baby_page(self, query, data):
         """Handle baby category pagination"""
         page = int(data.split("_")[-1])
-        text = "👶 کالای خواب نوزاد\n\nعالیه! حالا بگو کدوم طرح؟"
-        keyboard = self.keyboards.get_baby_subcategories(page)
-        await query.edit_message_text(text, reply_markup=keyboard)
+        await self._edit_icon_page(query, 'baby', page)
 
     async def _handle_curtain_page(self, query, data):
         """Handle curtain category pagination"""
         page = int(data.split("_")[-1])
-        text = " پرده\n\nعالیه! حالا بگو کدوم طرح؟"
-        keyboard = self.keyboards.get_curtain_subcategories(page)
-        await query.edit_message_text(text, reply_markup=keyboard)
+        await self._edit_icon_page(query, 'curtain_only', page)
 
     async def _handle_cushion_page(self, query, data):
         """Handle cushion category pagination"""
         page = int(data.split("_")[-1])
-        text = " کوسن\n\nعالیه! حالا بگو کدوم طرح؟"
-        keyboard = self.keyboards.get_cushion_subcategories(page)
-        await query.edit_message_text(text, reply_markup=keyboard)
+        await self._edit_icon_page(query, 'cushion', page)
 
     async def _handle_tablecloth_page(self, query, data):
         """Handle tablecloth category pagination"""
         page = int(data.split("_")[-1])
-        text = " فرشینه\n\nعالیه! حالا بگو کدوم طرح؟"
-        keyboard = self.keyboards.get_tablecloth_subcategories(page)
+        await self._edit_icon_page(query, 'tablecloth', page)
+
+    async def _handle_alpha_cursor(self, query, data):
+        """Handle cursor-based alphabet pagination"""
+        resolved = resolve_alphabet_cursor(data)
+        if resolved is None:
+            await query.edit_message_text("❌ داده نامعتبر.")
+            return
+        category, page = resolved
+        text = f"🔤 جستجوی حروف الفبایی\n\nحرف اول نام محصول مورد نظر را انتخاب کنید:"
+        keyboard = self.keyboards.get_alphabetical_keyboard(category, page)
         await query.edit_message_text(text, reply_markup=keyboard)
 
     async def _handle_alpha_page(self, query, data):
         """Handle alphabet pagination"""
-        parts = data.split("_")
-        category = parts[2]
-        page = int(parts[3])
+        # Categories such as curtain_only contain underscores themselves,
+        # so the page number is split off the end
+        category, page = data[len("alpha_page_"):].rsplit("_", 1)
+        page = int(page)
         text = f"🔤 جستجوی حروف الفبایی\n\nحرف اول نام محصول مورد نظر را انتخاب کنید:"
         keyboard = self.keyboards.get_alphabetical_keyboard(category, page)
         await query.edit_message_text(text, reply_markup=keyboard)
@@ -3471,25 +3483,14 @@ class BotHandlers:
             )
             
             # ذخیره اطلاعات واریز مانده در session
-            if user_id not in self.user_sessions:
-                self.user_sessions[user_id] = {}
-            
-            self.user_sessions[user_id]['remaining_payment'] = {
+            self._session(user_id).remaining_payment = {
                 'order_id': order_id,
                 'amount': remaining_amount,
                 'awaiting_receipt': True
             }
             
-            keyboard = [[
-                InlineKeyboardButton("📸 ارسال فیش واریزی", 
-                                   callback_data="upload_remaining_receipt")
-            ], [
-                InlineKeyboardButton("🔙 بازگشت", 
-                                   callback_data="main_menu")
-            ]]
-            
-            await query.edit_message_text(bank_info, 
-                                        reply_markup=InlineKeyboardMarkup(keyboard))
+            await query.edit_message_text(
+                bank_info, reply_markup=_REMAINING_RECEIPT_UPLOAD_KB)
                                         
         except Exception as e:
             logger.error(f"❌ خطا در پردازش واریز مانده حساب: {e}")
@@ -3502,15 +3503,15 @@ class BotHandlers:
             
             # بررسی session
             if (user_id not in self.user_sessions or 
-                'remaining_payment' not in self.user_sessions[user_id] or
-                'receipt_photo' not in self.user_sessions[user_id]):
+                self.user_sessions[user_id].remaining_payment is None or
+                self.user_sessions[user_id].receipt_photo is None):
                 await query.edit_message_text("❌ اطلاعات پرداخت یافت نشد.")
                 return
                 
-            remaining_payment = self.user_sessions[user_id]['remaining_payment']
+            remaining_payment = self.user_sessions[user_id].remaining_payment
             order_id = remaining_payment['order_id']
             amount = remaining_payment['amount']
-            receipt_photo = self.user_sessions[user_id]['receipt_photo']
+            receipt_photo = self.user_sessions[user_id].receipt_photo
             
             # دریافت اطلاعات سفارش و مشتری
             order_data = await self.order_server.get_order_details(order_id)
@@ -3566,10 +3567,8 @@ class BotHandlers:
             )
             
             # پاک کردن اطلاعات از session
-            if 'remaining_payment' in self.user_sessions[user_id]:
-                del self.user_sessions[user_id]['remaining_payment']
-            if 'receipt_photo' in self.user_sessions[user_id]:
-                del self.user_sessions[user_id]['receipt_photo']
+            self.user_sessions[user_id].remaining_payment = None
+            self.user_sessions[user_id].receipt_photo = None
                 
             logger.info(f"✅ واریز مانده حساب تایید شد برای سفارش {order_id}")
             
@@ -3675,15 +3674,15 @@ class BotHandlers:
                 return
                 
             # Get customer and cart info
-            customer = self.user_sessions[user_id]['customer']
-            cart_items = self.cart_manager.get_cart(user_id)
-            check_info = self.user_sessions[user_id].get('check_payment_info', {})
+            customer = self.user_sessions[user_id].customer
+            cart_items = await self.cart_manager.get_cart(user_id)
+            check_info = self.user_sessions[user_id].check_payment_info or {}
             
             # Generate order ID for final submission
             order_id = await self.order_server.generate_order_id()
             
             # Create final invoice text with order management buttons
-            cart_items = self.cart_manager.get_cart(user_id)
+            cart_items = await self.cart_manager.get_cart(user_id)
             invoice_text = (f"📋 سفارش نهایی - چک\n"
                            f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n"
                            f"📋 شماره سفارش: {order_id}\n"
@@ -3696,18 +3695,13 @@ class BotHandlers:
                            f"📦 آیتم‌ها:\n")
             
             # Add cart items
-            for i, item in enumerate(cart_items, 1):
-                item_total = item.get('price', 0) * item.get('quantity', 0)
-                invoice_text += (f"{persian_numbers(str(i))}. {item.get('product_name', 'محصول')}\n"
-                               f"   📏 {item.get('size', 'نامشخص')} | "
-                               f"📦 {persian_numbers(str(item.get('quantity', 0)))} عدد | "
-                               f"💰 {format_price(item_total)}\n")
+            invoice_text += _format_invoice_items(cart_items)
             
             invoice_text += (f"\n🕐 چک باید طی ۱۰ روز کاری به کارخانه ارسال شود\n"
                            f"✅ مشتری تایید کرد - آماده پردازش")
             
             # Get stored check photo
-            receipt_photo = self.user_sessions[user_id].get('receipt_photo')
+            receipt_photo = self.user_sessions[user_id].receipt_photo
             
             if receipt_photo and self.config.order_group_chat_id:
                 # Order management buttons for support group only (simplified)
@@ -3742,11 +3736,11 @@ class BotHandlers:
                 )
                 
                 # Clear cart and session data
-                self.cart_manager.clear_cart(user_id)
+                await self.cart_manager.clear_cart(user_id)
                 if user_id in self.user_sessions:
-                    self.user_sessions[user_id].pop('check_payment_info', None)
-                    self.user_sessions[user_id].pop('receipt_photo', None)
-                    self.user_sessions[user_id].pop('payment_info', None)
+                    self.user_sessions[user_id].check_payment_info = None
+                    self.user_sessions[user_id].receipt_photo = None
+                    self.user_sessions[user_id].payment_info = None
                 
                 logger.info(f"Check order {order_id} submitted to support group with management buttons")
                 
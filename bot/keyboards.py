@@ -4,681 +4,769 @@ Bot Keyboards
 Manages all inline keyboards for the Telegram bot.
 """
 
+import functools
+import sys
+
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-from typing import List, Dict, Any
-from data.product_data import PERSIAN_ALPHABET, get_category_product_icons, search_products_by_icon
+from typing import List, Dict, Any, Final, Optional, Sequence, Tuple
+from data.product_data import (PERSIAN_ALPHABET, PRODUCT_CATEGORIES,
+                               get_category_product_icons,
+                               get_data_version, search_products_by_icon)
 
+# Buttons shared by many keyboards. InlineKeyboardButton is immutable, so one
+# instance of each is reused instead of being rebuilt for every keyboard.
+_BACK_TO_CATEGORIES: Final = InlineKeyboardButton(
+    "🔙 بازگشت", callback_data=sys.intern("back_to_categories"))
+_MAIN_MENU_BTN: Final = InlineKeyboardButton(
+    "🏠 منوی اصلی", callback_data=sys.intern("main_menu"))
 
-class BotKeyboards:
-    """Class to manage all bot keyboards"""
-
-    def get_main_menu(self,
-                      authenticated: bool = False) -> InlineKeyboardMarkup:
-        """Get main menu keyboard"""
-        buttons = []
-
-        if authenticated:
-            buttons.extend([[
-                InlineKeyboardButton("🛒 شروع خرید",
-                                     callback_data="start_shopping")
-            ], [
-                InlineKeyboardButton("🛍️ سبد خرید", callback_data="view_cart")
-            ],
-                            [
-                                InlineKeyboardButton(
-                                    "📋 مشاهده پیش فاکتور",
-                                    callback_data="view_invoice")
-                            ]])
-
-        return InlineKeyboardMarkup(buttons)
-
-    def get_categories_keyboard(self) -> InlineKeyboardMarkup:
-        """Get main product categories keyboard"""
-        buttons = [
-            [
-                InlineKeyboardButton(" کالای خواب نوزاد",
-                                     callback_data="category_baby")
-            ],
-            [
-                InlineKeyboardButton(" کالای خواب نوجوان",
-                                     callback_data="category_teen")
-            ],
-            [
-                InlineKeyboardButton("کالای خواب بزرگسال",
-                                     callback_data="category_adult")
-            ],
-            [
-                InlineKeyboardButton(" پرده",
-                                     callback_data="category_curtain_only")
-            ],
-            [InlineKeyboardButton(" کوسن ", callback_data="category_cushion")],
-            [
-                InlineKeyboardButton(" فرشینه",
-                                     callback_data="category_tablecloth")
-            ],
-            [InlineKeyboardButton("🏠 منوی اصلی", callback_data="main_menu")]
-        ]
-        return InlineKeyboardMarkup(buttons)
-
-    def get_curtain_subcategories(self, page: int = 0) -> InlineKeyboardMarkup:
-        """Get curtain subcategories keyboard with icon navigation and pagination"""
-        buttons = []
-
-        # Get product icons for curtain_only category
-        product_icons = get_category_product_icons('curtain_only')
-
-        # Pagination settings
-        items_per_page = 8  # 4 rows * 2 buttons
-        start_idx = page * items_per_page
-        end_idx = start_idx + items_per_page
-        page_icons = product_icons[start_idx:end_idx]
+# Tables derived from the product catalog. They are filled by
+# _rebuild_caches() at import time and rebuilt in place whenever the catalog
+# version changes, so every name below stays bound to the same dict.
 
-        # Create buttons for each unique icon - 2 buttons per row
-        row = []
-        for i, (icon, description, product_id) in enumerate(page_icons):
-            button_text = description
-            callback_data = f"product_{product_id}"
-            row.append(
-                InlineKeyboardButton(button_text, callback_data=callback_data))
+# (icon, description, product_id) tuples per category, read once instead of
+# on every keyboard build.
+_ICON_CACHE: Final[Dict[str, Tuple[tuple, ...]]] = {}
 
-            # Create rows of 2 buttons each
-            if (i + 1) % 2 == 0:
-                buttons.append(row)
-                row = []
+# Callback strings are formatted and interned once. Product buttons are also
+# built at request time for alphabet search results, so they reuse these.
+_CB_PRODUCT: Final[Dict[str, str]] = {}
 
-        # Add remaining button if any
-        if row:
-            buttons.append(row)
+# Letter buttons of the alphabet search, one per letter in alphabet order
+_ALPHA_BTNS: Final[Dict[str, Tuple[InlineKeyboardButton, ...]]] = {}
 
-        # Add pagination buttons
-        nav_row = []
-        total_pages = (len(product_icons) + items_per_page -
-                       1) // items_per_page
+_ALPHA_BTN: Final[Dict[str, InlineKeyboardButton]] = {}
 
-        if page > 0:
-            nav_row.append(
-                InlineKeyboardButton("⬅️ صفحه قبل",
-                                     callback_data=f"curtain_page_{page-1}"))
 
-        if page < total_pages - 1:
-            nav_row.append(
-                InlineKeyboardButton("➡️ صفحه بعد",
-                                     callback_data=f"curtain_page_{page+1}"))
-
-        if nav_row:
-            buttons.append(nav_row)
-
-        # Add alphabet search button
-        buttons.append([
-            InlineKeyboardButton("🔤 جستجوی حروف الفبایی",
-                                 callback_data="alphabet_search_curtain_only")
-        ])
-
-        # Add back button
-        buttons.append([
-            InlineKeyboardButton("🔙 بازگشت",
-                                 callback_data="back_to_categories")
-        ])
-
-        return InlineKeyboardMarkup(buttons)
-
-    def get_curtain_only_subcategories(self) -> InlineKeyboardMarkup:
-        """Get curtain only subcategories keyboard with icon navigation"""
-        buttons = []
-
-        # Get product icons for curtain_only category
-        product_icons = get_category_product_icons('curtain_only')
-
-        # Create buttons for each unique icon - 2 buttons per row
-        row = []
-        for i, (icon, description, product_id) in enumerate(product_icons):
-            button_text = description
-            callback_data = f"product_{product_id}"
-            row.append(
-                InlineKeyboardButton(button_text, callback_data=callback_data))
-
-            # Create rows of 2 buttons each
-            if (i + 1) % 2 == 0:
-                buttons.append(row)
-                row = []
-
-        # Add remaining button if any
-        if row:
-            buttons.append(row)
-
-        # Add alphabet search button
-        buttons.append([
-            InlineKeyboardButton("🔤 جستجوی حروف الفبایی",
-                                 callback_data="alphabet_search_curtain_only")
-        ])
-
-        # Add back button
-        buttons.append([
-            InlineKeyboardButton("🔙 بازگشت",
-                                 callback_data="back_to_curtain_subcategories")
-        ])
-
-        return InlineKeyboardMarkup(buttons)
-
-    def get_cushion_subcategories(self, page: int = 0) -> InlineKeyboardMarkup:
-        """Get cushion subcategories keyboard with icon navigation and pagination"""
-        buttons = []
-
-        # Get product icons for cushion category
-        product_icons = get_category_product_icons('cushion')
-
-        # Pagination settings (کوسن کم محصول دارد - 6 تا)
-        items_per_page = 6  # همه در یک صفحه
-        start_idx = page * items_per_page
-        end_idx = start_idx + items_per_page
-        page_icons = product_icons[start_idx:end_idx]
+def _alpha_button(category: str) -> InlineKeyboardButton:
+    """Return the alphabet search button of a category"""
+    button = _ALPHA_BTN.get(category)
+    if button is None:
+        button = InlineKeyboardButton(
+            "🔤 جستجوی حروف الفبایی",
+            callback_data=f"alphabet_search_{category}")
+    return button
 
-        # Create buttons for each unique icon - 2 buttons per row
-        row = []
-        for i, (icon, description, product_id) in enumerate(page_icons):
-            button_text = description
-            callback_data = f"icon_cushion_{icon}"
-            row.append(
-                InlineKeyboardButton(button_text, callback_data=callback_data))
 
-            # Create rows of 2 buttons each
-            if (i + 1) % 2 == 0:
-                buttons.append(row)
-                row = []
+def _chunk_rows(buttons: Sequence[InlineKeyboardButton],
+                size: int) -> List[Tuple[InlineKeyboardButton, ...]]:
+    """Split a flat sequence of buttons into rows of at most size buttons"""
+    return [
+        tuple(buttons[i:i + size]) for i in range(0, len(buttons), size)
+    ]
 
-        # Add remaining button if any
-        if row:
-            buttons.append(row)
 
-        # Add pagination buttons (if needed)
-        nav_row = []
-        total_pages = (len(product_icons) + items_per_page -
-                       1) // items_per_page
+# Keyboards below are pure functions of their arguments, so they are built
+# once and shared. InlineKeyboardMarkup objects are frozen by
+# python-telegram-bot, which makes it safe to hand the same instance to every
+# caller.
 
-        if page > 0:
-            nav_row.append(
-                InlineKeyboardButton("⬅️ صفحه قبل",
-                                     callback_data=f"cushion_page_{page-1}"))
 
-        if page < total_pages - 1:
-            nav_row.append(
-                InlineKeyboardButton("➡️ صفحه بعد",
-                                     callback_data=f"cushion_page_{page+1}"))
+_MAIN_MENU_AUTH: Final = InlineKeyboardMarkup((
+    (InlineKeyboardButton("🛒 شروع خرید", callback_data="start_shopping"), ),
+    (InlineKeyboardButton("🛍️ سبد خرید", callback_data="view_cart"), ),
+    (InlineKeyboardButton("📋 مشاهده پیش فاکتور",
+                          callback_data="view_invoice"), ),
+))
+_MAIN_MENU_ANON: Final = InlineKeyboardMarkup(())
 
-        if nav_row:
-            buttons.append(nav_row)
 
-        # Add alphabet search button
-        buttons.append([
-            InlineKeyboardButton("🔤 جستجوی حروف الفبایی",
-                                 callback_data="alphabet_search_cushion")
-        ])
+def get_main_menu(authenticated: bool = False) -> InlineKeyboardMarkup:
+    """Get main menu keyboard"""
+    return _MAIN_MENU_AUTH if authenticated else _MAIN_MENU_ANON
 
-        # Add back button
-        buttons.append([
-            InlineKeyboardButton("🔙 بازگشت",
-                                 callback_data="back_to_categories")
-        ])
 
-        return InlineKeyboardMarkup(buttons)
+@functools.lru_cache(maxsize=None)
+def get_categories_keyboard() -> InlineKeyboardMarkup:
+    """Get main product categories keyboard"""
+    buttons = [
+        [
+            InlineKeyboardButton(" کالای خواب نوزاد",
+                                 callback_data="category_baby")
+        ],
+        [
+            InlineKeyboardButton(" کالای خواب نوجوان",
+                                 callback_data="category_teen")
+        ],
+        [
+            InlineKeyboardButton("کالای خواب بزرگسال",
+                                 callback_data="category_adult")
+        ],
+        [
+            InlineKeyboardButton(" پرده",
+                                 callback_data="category_curtain_only")
+        ],
+        [InlineKeyboardButton(" کوسن ", callback_data="category_cushion")],
+        [
+            InlineKeyboardButton(" فرشینه",
+                                 callback_data="category_tablecloth")
+        ],
+        [_MAIN_MENU_BTN]
+    ]
+    return InlineKeyboardMarkup(tuple(buttons))
+
 
-    def get_baby_subcategories(self, page: int = 0) -> InlineKeyboardMarkup:
-        """Get baby subcategories keyboard with icon navigation and pagination"""
-        buttons = []
+# Fixed keyboards, declared as rows of (label, callback data) pairs. Shared
+# buttons may be used in place of a pair.
+_STATIC_SPECS: Final = {
+    'teen_sub': (
+        (("📏 انتخاب سایز", "size_selection_teen"), ),
+        (_BACK_TO_CATEGORIES, ),
+    ),
+    'adult_sub': (
+        (("📏 انتخاب سایز", "size_selection_adult"), ),
+        (_BACK_TO_CATEGORIES, ),
+    ),
+    'sewing': (
+        (("پانچ", "sewing_panch"), ("نواردوزی", "sewing_navardozi")),
+        (_BACK_TO_CATEGORIES, ),
+    ),
+    'fabric': (
+        (("حریر کتان", "fabric_silk_cotton"), ("مخمل", "fabric_velvet")),
+        (("🔙 بازگشت", "back_to_sewing_type"), ),
+    ),
+    'height': ((("🔙 بازگشت", "back_to_fabric_selection"), ), ),
+    'cash': (
+        ((" ارسال فیش واریزی", "upload_receipt"), ),
+        ((" بازگشت", "view_invoice"), ),
+    ),
+    'check': (
+        ((" ارسال عکس چک", "upload_check_photo"), ),
+        ((" در حال پیگیری", "check_follow_up"), ),
+        ((" بازگشت", "view_invoice"), ),
+    ),
+    'check_confirmation': (
+        (("✅ چک را ثبت و ارسال می‌کنم به کارخانه",
+          "confirm_check_submission"), ),
+        (("🔄 ارسال عکس چک جدید", "upload_check_photo"), ),
+    ),
+}
+
+
+def _build(spec: Tuple[tuple, ...]) -> InlineKeyboardMarkup:
+    """Build a keyboard from a _STATIC_SPECS entry"""
+    return InlineKeyboardMarkup(
+        tuple(
+            tuple(button if isinstance(button, InlineKeyboardButton) else
+                  InlineKeyboardButton(button[0], callback_data=button[1])
+                  for button in row) for row in spec))
+
+
+_KB: Final[Dict[str, InlineKeyboardMarkup]] = {
+    name: _build(spec)
+    for name, spec in _STATIC_SPECS.items()
+}
+
+
+def get_teen_subcategories() -> InlineKeyboardMarkup:
+    """Get teen subcategories keyboard with size selection"""
+    return _KB['teen_sub']
+
+
+def get_adult_subcategories() -> InlineKeyboardMarkup:
+    """Get adult subcategories keyboard with size selection"""
+    return _KB['adult_sub']
+
+
+def get_sewing_type_keyboard() -> InlineKeyboardMarkup:
+    """Get sewing type selection keyboard for curtains"""
+    return _KB['sewing']
+
+
+def get_fabric_selection_keyboard() -> InlineKeyboardMarkup:
+    """Get fabric selection keyboard for curtains"""
+    return _KB['fabric']
+
+
+def get_height_input_keyboard() -> InlineKeyboardMarkup:
+    """Get height input keyboard for curtains"""
+    return _KB['height']
+
+
+def get_cash_payment_keyboard() -> InlineKeyboardMarkup:
+    """Get cash payment confirmation keyboard"""
+    return _KB['cash']
+
+
+def get_check_payment_keyboard() -> InlineKeyboardMarkup:
+    """Get check payment keyboard"""
+    return _KB['check']
+
+
+def get_check_confirmation_keyboard() -> InlineKeyboardMarkup:
+    """Get check confirmation keyboard after admin message"""
+    return _KB['check_confirmation']
+
+
+# Quantities 1-10 in rows of 5 buttons each, plus the back button
+_QTY_ROWS: Final = tuple(
+    tuple(InlineKeyboardButton(str(i), callback_data=f"qty_{i}") for i in r)
+    for r in (range(1, 6), range(6, 11)))
+_QTY_KB: Final = InlineKeyboardMarkup(_QTY_ROWS + ((InlineKeyboardButton(
+    " بازگشت", callback_data="back_to_products"), ), ))
+
+
+def get_quantity_keyboard() -> InlineKeyboardMarkup:
+    """Get quantity selection keyboard"""
+    return _QTY_KB
+
+
+@functools.lru_cache(maxsize=None)
+def get_payment_keyboard() -> InlineKeyboardMarkup:
+    """Get payment options keyboard"""
+    buttons = [[
+        InlineKeyboardButton(" پرداخت نقدی (۳۰٪ تخفیف)",
+                             callback_data="payment_cash_card")
+    ],
+               [
+                   InlineKeyboardButton(" پرداخت ۶۰ روز (۲۵٪ تخفیف)",
+                                        callback_data="payment_60day_card")
+               ],
+               [
+                   InlineKeyboardButton(
+                       " پرداخت ۹۰ روز (۲۵٪ تخفیف + ۲۵٪ پیش‌پرداخت)",
+                       callback_data="payment_90day_card")
+               ],
+               [
+                   InlineKeyboardButton(" بازگشت به سبد خرید",
+                                        callback_data="view_cart")
+               ],
+               [
+                   InlineKeyboardButton(" منوی اصلی",
+                                        callback_data="main_menu")
+               ]]
+    return InlineKeyboardMarkup(tuple(buttons))
 
-        # Get product icons for baby category
-        product_icons = get_category_product_icons('baby')
 
-        # Pagination settings
-        items_per_page = 8  # 4 rows * 2 buttons
+@functools.lru_cache(maxsize=None)
+def get_cart_management_keyboard() -> InlineKeyboardMarkup:
+    """Get cart management keyboard"""
+    buttons = [[
+        InlineKeyboardButton(" مشاهده پیش فاکتور",
+                             callback_data="view_invoice")
+    ], [
+        InlineKeyboardButton(" ادامه خرید", callback_data="start_shopping")
+    ], [InlineKeyboardButton(" پاک کردن سبد", callback_data="cart_clear")
+        ], [InlineKeyboardButton(" منوی اصلی", callback_data="main_menu")]]
+    return InlineKeyboardMarkup(tuple(buttons))
+
+
+def _build_payment_type_keyboard(payment_method: str) -> InlineKeyboardMarkup:
+    """Build the payment type selection keyboard (Cash vs Check)"""
+    buttons = [
+        [
+            InlineKeyboardButton(
+                " پرداخت نقدی",
+                callback_data=f"payment_type_cash_{payment_method}")
+        ],
+        [
+            InlineKeyboardButton(
+                " پرداخت چکی",
+                callback_data=f"payment_type_check_{payment_method}")
+        ], [InlineKeyboardButton(" بازگشت", callback_data="view_invoice")]
+    ]
+    return InlineKeyboardMarkup(tuple(buttons))
+
+
+# Payment type keyboards of the payment methods offered by
+# get_payment_keyboard. The method comes from callback data, so other values
+# are built on demand rather than cached without bound.
+_PAYMENT_TYPE_KB: Final[Dict[str, InlineKeyboardMarkup]] = {
+    method: _build_payment_type_keyboard(method)
+    for method in ('cash', '60day', '90day')
+}
+
+
+def get_payment_type_keyboard(payment_method: str) -> InlineKeyboardMarkup:
+    """Get payment type selection keyboard (Cash vs Check)"""
+    keyboard = _PAYMENT_TYPE_KB.get(payment_method)
+    if keyboard is None:
+        keyboard = _build_payment_type_keyboard(payment_method)
+    return keyboard
+
+
+def _build_icon_page(category: str,
+                     page: int,
+                     items_per_page: Optional[int],
+                     callback_fmt: str,
+                     back_callback: str = "back_to_categories"
+                     ) -> InlineKeyboardMarkup:
+    """Build an icon keyboard page for a category
+
+    callback_fmt is formatted with ``icon`` and ``product_id`` for each
+    product button. Navigation rows come from _NAV_ROWS. When items_per_page
+    is None every product is shown on a single page without navigation
+    buttons.
+    """
+
+    # Get product icons for this category
+    product_icons = _ICON_CACHE.get(category, ())
+
+    # Pagination settings
+    if items_per_page is None:
+        page_icons = product_icons
+    else:
         start_idx = page * items_per_page
         end_idx = start_idx + items_per_page
         page_icons = product_icons[start_idx:end_idx]
 
-        # Create buttons for each unique icon - 2 buttons per row
-        row = []
-        for i, (icon, description, product_id) in enumerate(page_icons):
-            button_text = description
-            callback_data = f"icon_baby_{icon}"
-            row.append(
-                InlineKeyboardButton(button_text, callback_data=callback_data))
-
-            # Create rows of 2 buttons each
-            if (i + 1) % 2 == 0:
-                buttons.append(row)
-                row = []
-
-        # Add remaining button if any
-        if row:
-            buttons.append(row)
-
-        # Add pagination buttons
+    # Create buttons for each unique icon - 2 buttons per row
+    buttons = _chunk_rows([
+        InlineKeyboardButton(description,
+                             callback_data=callback_fmt.format(
+                                 icon=icon, product_id=product_id))
+        for icon, description, product_id in page_icons
+    ], 2)
+
+    # Add pagination buttons
+    if items_per_page is not None:
+        nav_rows = _NAV_ROWS.get((category, items_per_page), ())
+        if 0 <= page < len(nav_rows) and nav_rows[page]:
+            buttons.append(nav_rows[page])
+
+    # Add alphabet search button
+    buttons.append((_alpha_button(category), ))
+
+    # Add back button
+    if back_callback == "back_to_categories":
+        buttons.append((_BACK_TO_CATEGORIES, ))
+    else:
+        buttons.append((InlineKeyboardButton("🔙 بازگشت",
+                                             callback_data=back_callback), ))
+
+    return InlineKeyboardMarkup(tuple(buttons))
+
+
+def _build_paged_category(category: str, page: int) -> InlineKeyboardMarkup:
+    """Build one page of a paginated icon category"""
+    items_per_page, callback_fmt, _ = _PAGED_CATEGORIES[category]
+    return _build_icon_page(category, page, items_per_page, callback_fmt)
+
+
+def _build_category_products(category: str) -> InlineKeyboardMarkup:
+    """Get category products keyboard with icons"""
+    return _build_icon_page(category, 0, None, "product_{product_id}")
+
+
+def _build_curtain_only() -> InlineKeyboardMarkup:
+    """Build the curtain only keyboard with every product on one page"""
+    return _build_icon_page('curtain_only',
+                            0,
+                            None,
+                            "product_{product_id}",
+                            back_callback="back_to_curtain_subcategories")
+
+
+def _build_alphabet_page(category: str,
+                         page: int = 0) -> InlineKeyboardMarkup:
+    """Get alphabetical search keyboard with pagination"""
+
+    # Pagination settings
+    letters_per_page = ALPHABET_LETTERS_PER_PAGE  # 4 rows * 4 letters
+    start_idx = page * letters_per_page
+    end_idx = start_idx + letters_per_page
+    page_letters = PERSIAN_ALPHABET[start_idx:end_idx]
+
+    # Create rows of 4 buttons each with a consistent callback data format
+    letter_buttons = _ALPHA_BTNS.get(category)
+    if letter_buttons is None:
+        letter_buttons = tuple(
+            InlineKeyboardButton(letter,
+                                 callback_data=f"alpha_{category}_{letter}")
+            for letter in PERSIAN_ALPHABET)
+    buttons = _chunk_rows(letter_buttons[start_idx:end_idx], 4)
+
+    # Add pagination buttons
+    nav_row = []
+    total_pages = (len(PERSIAN_ALPHABET) + letters_per_page -
+                   1) // letters_per_page
+
+    if page > 0 and page_letters:
+        nav_row.append(
+            InlineKeyboardButton(
+                "⬅️ صفحه قبل",
+                callback_data=f"alpha_before_{category}_{page_letters[0]}"))
+
+    if page < total_pages - 1:
+        nav_row.append(
+            InlineKeyboardButton(
+                "➡️ صفحه بعد",
+                callback_data=f"alpha_after_{category}_{page_letters[-1]}"))
+
+    if nav_row:
+        buttons.append(tuple(nav_row))
+
+    # Add back button
+    buttons.append((_BACK_TO_CATEGORIES, ))
+
+    return InlineKeyboardMarkup(tuple(buttons))
+
+
+# Icon categories that are browsed page by page:
+# (items per page, product button callback format, page cursor prefix)
+_PAGED_CATEGORIES: Final = {
+    'curtain_only': (8, "product_{product_id}", "curtain"),
+    'cushion': (6, "icon_cushion_{icon}", "cushion"),
+    'baby': (8, "icon_baby_{icon}", "baby"),
+    'tablecloth': (8, "product_{product_id}", "tablecloth"),
+}
+_CURSOR_CATEGORIES: Final = {
+    cursor_prefix: category
+    for category, (_, _, cursor_prefix) in _PAGED_CATEGORIES.items()
+}
+# Callback data prefixes of icon page cursors, for routing in the handlers
+PAGE_CURSOR_PREFIXES: Final = tuple(f"{cursor_prefix}_{direction}_"
+                                    for cursor_prefix in _CURSOR_CATEGORIES
+                                    for direction in ("after", "before"))
+ALPHABET_LETTERS_PER_PAGE: Final = 16
+
+# Every page is materialized once at import time and again only when the
+# catalog version changes.
+PAGE_CACHE: Final[Dict[Tuple[str, int], InlineKeyboardMarkup]] = {}
+# Alphabet search pages of each category, indexed by page
+_ALPHA_PAGES: Final[Dict[str, Tuple[InlineKeyboardMarkup, ...]]] = {}
+CATEGORY_PRODUCTS_CACHE: Final[Dict[str, InlineKeyboardMarkup]] = {}
+# Single-page product keyboard shown from the curtain subcategory menu
+_CURTAIN_ONLY_CACHE: Final[Dict[str, InlineKeyboardMarkup]] = {}
+
+# Navigation row of every page: (category, items_per_page) -> rows by page.
+# A row is empty when the category fits on a single page.
+_NAV_ROWS: Final[Dict[Tuple[str, int],
+                      Tuple[Tuple[InlineKeyboardButton, ...], ...]]] = {}
+
+# Page lookup for cursor callbacks: (category, product_id) -> page and
+# letter -> alphabet page.
+PAGE_INDEX: Final[Dict[Tuple[str, str], int]] = {}
+ALPHA_PAGE_INDEX: Final[Dict[str, int]] = {
+    letter: i // ALPHABET_LETTERS_PER_PAGE
+    for i, letter in enumerate(PERSIAN_ALPHABET)
+}
+
+
+def _page_count(item_count: int, per_page: int) -> int:
+    """Number of pages needed to show item_count items (at least one)"""
+    return max(1, (item_count + per_page - 1) // per_page)
+
+
+def _build_nav_rows(category: str, items_per_page: int,
+                    cursor_prefix: str
+                    ) -> Tuple[Tuple[InlineKeyboardButton, ...], ...]:
+    """Build the navigation row of each page of an icon category
+
+    Buttons carry a cursor instead of a page number:
+    ``{cursor_prefix}_after_{last_id}`` for the next page and
+    ``{cursor_prefix}_before_{first_id}`` for the previous one.
+    """
+    product_icons = _ICON_CACHE[category]
+    total_pages = _page_count(len(product_icons), items_per_page)
+
+    nav_rows = []
+    for page in range(total_pages):
+        page_icons = product_icons[page * items_per_page:(page + 1) *
+                                   items_per_page]
         nav_row = []
-        total_pages = (len(product_icons) + items_per_page -
-                       1) // items_per_page
-
         if page > 0:
+            first_id = page_icons[0][2]
             nav_row.append(
-                InlineKeyboardButton("⬅️ صفحه قبل",
-                                     callback_data=f"baby_page_{page-1}"))
-
+                InlineKeyboardButton(
+                    "⬅️ صفحه قبل",
+                    callback_data=f"{cursor_prefix}_before_{first_id}"))
         if page < total_pages - 1:
+            last_id = page_icons[-1][2]
             nav_row.append(
-                InlineKeyboardButton("➡️ صفحه بعد",
-                                     callback_data=f"baby_page_{page+1}"))
-
-        if nav_row:
-            buttons.append(nav_row)
-
-        # Add alphabet search button
-        buttons.append([
-            InlineKeyboardButton("🔤 جستجوی حروف الفبایی",
-                                 callback_data="alphabet_search_baby")
-        ])
-
-        # Add back button
-        buttons.append([
-            InlineKeyboardButton("🔙 بازگشت",
-                                 callback_data="back_to_categories")
-        ])
-
-        return InlineKeyboardMarkup(buttons)
-
-    def get_teen_subcategories(self) -> InlineKeyboardMarkup:
-        """Get teen subcategories keyboard with size selection"""
-        buttons = [[
-            InlineKeyboardButton("📏 انتخاب سایز",
-                                 callback_data="size_selection_teen")
-        ],
-                   [
-                       InlineKeyboardButton("🔙 بازگشت",
-                                            callback_data="back_to_categories")
-                   ]]
-        return InlineKeyboardMarkup(buttons)
-
-    def get_adult_subcategories(self) -> InlineKeyboardMarkup:
-        """Get adult subcategories keyboard with size selection"""
-        buttons = [[
-            InlineKeyboardButton("📏 انتخاب سایز",
-                                 callback_data="size_selection_adult")
-        ],
-                   [
-                       InlineKeyboardButton("🔙 بازگشت",
-                                            callback_data="back_to_categories")
-                   ]]
-        return InlineKeyboardMarkup(buttons)
-
-    def get_tablecloth_subcategories(self,
-                                     page: int = 0) -> InlineKeyboardMarkup:
-        """Get tablecloth subcategories keyboard with icon navigation and pagination"""
-        buttons = []
-
-        # Get product icons for tablecloth category
-        product_icons = get_category_product_icons('tablecloth')
-
-        # Pagination settings
-        items_per_page = 8  # 4 rows * 2 buttons
-        start_idx = page * items_per_page
-        end_idx = start_idx + items_per_page
-        page_icons = product_icons[start_idx:end_idx]
+                InlineKeyboardButton(
+                    "➡️ صفحه بعد",
+                    callback_data=f"{cursor_prefix}_after_{last_id}"))
+        nav_rows.append(tuple(nav_row))
+    return tuple(nav_rows)
+
+
+def _precompute_catalog_tables():
+    """Read the catalog into the icon, callback and button tables"""
+    for category in PRODUCT_CATEGORIES:
+        _ICON_CACHE[category] = tuple(get_category_product_icons(category))
+        _ALPHA_BTNS[category] = tuple(
+            InlineKeyboardButton(
+                letter, callback_data=sys.intern(f"alpha_{category}_{letter}"))
+            for letter in PERSIAN_ALPHABET)
+        _ALPHA_BTN[category] = InlineKeyboardButton(
+            "🔤 جستجوی حروف الفبایی",
+            callback_data=sys.intern(f"alphabet_search_{category}"))
+        for _, _, product_id in _ICON_CACHE[category]:
+            _CB_PRODUCT[product_id] = sys.intern(f"product_{product_id}")
+
+
+def _precompute_keyboards():
+    """Build every paginated and per-category keyboard once"""
+    for category, (per_page, _, cursor_prefix) in _PAGED_CATEGORIES.items():
+        product_icons = _ICON_CACHE[category]
+        _NAV_ROWS[(category, per_page)] = _build_nav_rows(
+            category, per_page, cursor_prefix)
+        for i, (_, _, product_id) in enumerate(product_icons):
+            PAGE_INDEX[(category, product_id)] = i // per_page
+        for page in range(_page_count(len(product_icons), per_page)):
+            PAGE_CACHE[(category, page)] = _build_paged_category(
+                category, page)
+
+    _CURTAIN_ONLY_CACHE['curtain_only'] = _build_curtain_only()
+
+    alphabet_pages = _page_count(len(PERSIAN_ALPHABET),
+                                 ALPHABET_LETTERS_PER_PAGE)
+    for category in PRODUCT_CATEGORIES:
+        CATEGORY_PRODUCTS_CACHE[category] = _build_category_products(category)
+        _ALPHA_PAGES[category] = tuple(
+            _build_alphabet_page(category, page)
+            for page in range(alphabet_pages))
+
+
+def _get_icon_page(category: str, page: int) -> InlineKeyboardMarkup:
+    """Return a cached icon page, building out-of-range pages on demand"""
+    _refresh_if_stale()
+    keyboard = PAGE_CACHE.get((category, page))
+    if keyboard is None:
+        keyboard = _build_paged_category(category, page)
+    return keyboard
+
+
+def _get_alphabet_page(category: str, page: int) -> InlineKeyboardMarkup:
+    """Return a cached alphabet page, building unknown ones on demand"""
+    _refresh_if_stale()
+    pages = _ALPHA_PAGES.get(category, ())
+    if 0 <= page < len(pages):
+        return pages[page]
+    return _build_alphabet_page(category, page)
+
+
+def _get_category_products(category: str) -> InlineKeyboardMarkup:
+    """Return the cached product keyboard of a category"""
+    _refresh_if_stale()
+    keyboard = CATEGORY_PRODUCTS_CACHE.get(category)
+    if keyboard is None:
+        keyboard = _build_category_products(category)
+    return keyboard
+
+
+def _step_from_cursor(direction: str, page: Optional[int]) -> Optional[int]:
+    """Move one page after/before the page holding the cursor item"""
+    if page is None:
+        return None
+    if direction == "after":
+        return page + 1
+    if direction == "before":
+        return page - 1
+    return None
+
+
+def resolve_page_cursor(data: str) -> Optional[Tuple[str, int]]:
+    """Resolve an icon page cursor like ``baby_after_baby_8``
+
+    Returns (category, page) or None when the cursor is unknown.
+    """
+    _refresh_if_stale()
+    parts = data.split("_", 2)
+    if len(parts) < 3:
+        return None
+    cursor_prefix, direction, product_id = parts
+    category = _CURSOR_CATEGORIES.get(cursor_prefix)
+    page = _step_from_cursor(direction,
+                             PAGE_INDEX.get((category, product_id)))
+    if page is None or page < 0:
+        return None
+    return category, page
+
+
+def resolve_alphabet_cursor(data: str) -> Optional[Tuple[str, int]]:
+    """Resolve an alphabet page cursor like ``alpha_after_baby_ع``
+
+    Returns (category, page) or None when the cursor is unknown.
+    """
+    parts = data.split("_", 2)
+    if len(parts) < 3 or "_" not in parts[2]:
+        return None
+    category, letter = parts[2].rsplit("_", 1)
+    page = _step_from_cursor(parts[1], ALPHA_PAGE_INDEX.get(letter))
+    if page is None or page < 0:
+        return None
+    return category, page
 
-        # Create buttons for each unique icon - 2 buttons per row
-        row = []
-        for i, (icon, description, product_id) in enumerate(page_icons):
-            button_text = description  # Remove icon from button text
-            callback_data = f"product_{product_id}"
-            row.append(
-                InlineKeyboardButton(button_text, callback_data=callback_data))
 
-            # Create rows of 2 buttons each
-            if (i + 1) % 2 == 0:
-                buttons.append(row)
-                row = []
 
-        # Add remaining button if any
-        if row:
-            buttons.append(row)
+def get_curtain_subcategories(page: int = 0) -> InlineKeyboardMarkup:
+    """Get curtain subcategories keyboard with icon navigation and pagination"""
+    return _get_icon_page('curtain_only', page)
 
-        # Add pagination buttons
-        nav_row = []
-        total_pages = (len(product_icons) + items_per_page -
-                       1) // items_per_page
 
-        if page > 0:
-            nav_row.append(
-                InlineKeyboardButton(
-                    "⬅️ صفحه قبل", callback_data=f"tablecloth_page_{page-1}"))
+def get_curtain_only_subcategories() -> InlineKeyboardMarkup:
+    """Get curtain only subcategories keyboard with icon navigation"""
+    _refresh_if_stale()
+    keyboard = _CURTAIN_ONLY_CACHE.get('curtain_only')
+    if keyboard is None:
+        keyboard = _build_curtain_only()
+    return keyboard
 
-        if page < total_pages - 1:
-            nav_row.append(
-                InlineKeyboardButton(
-                    "➡️ صفحه بعد", callback_data=f"tablecloth_page_{page+1}"))
-
-        if nav_row:
-            buttons.append(nav_row)
-
-        # Add alphabet search button
-        buttons.append([
-            InlineKeyboardButton("🔤 جستجوی حروف الفبایی",
-                                 callback_data="alphabet_search_tablecloth")
-        ])
-
-        # Add back button
-        buttons.append([
-            InlineKeyboardButton("🔙 بازگشت",
-                                 callback_data="back_to_categories")
-        ])
-
-        return InlineKeyboardMarkup(buttons)
-
-    def get_alphabetical_keyboard(self,
-                                  category: str,
-                                  page: int = 0) -> InlineKeyboardMarkup:
-        """Get alphabetical search keyboard with pagination"""
-        buttons = []
-        row = []
-
-        # Pagination settings
-        letters_per_page = 16  # 4 rows * 4 letters
-        start_idx = page * letters_per_page
-        end_idx = start_idx + letters_per_page
-        page_letters = PERSIAN_ALPHABET[start_idx:end_idx]
-
-        for i, letter in enumerate(page_letters):
-            # Create consistent callback data format
-            callback_data = f"alpha_{category}_{letter}"
-            row.append(
-                InlineKeyboardButton(letter, callback_data=callback_data))
-
-            # Create rows of 4 buttons each
-            if (i + 1) % 4 == 0:
-                buttons.append(row)
-                row = []
-
-        # Add remaining buttons if any
-        if row:
-            buttons.append(row)
-
-        # Add pagination buttons
-        nav_row = []
-        total_pages = (len(PERSIAN_ALPHABET) + letters_per_page -
-                       1) // letters_per_page
 
-        if page > 0:
-            nav_row.append(
-                InlineKeyboardButton(
-                    "⬅️ صفحه قبل",
-                    callback_data=f"alpha_page_{category}_{page-1}"))
+def get_icon_page(category: str, page: int = 0) -> InlineKeyboardMarkup:
+    """Get a page of a paginated icon category"""
+    return _get_icon_page(category, page)
 
-        if page < total_pages - 1:
-            nav_row.append(
-                InlineKeyboardButton(
-                    "➡️ صفحه بعد",
-                    callback_data=f"alpha_page_{category}_{page+1}"))
-
-        if nav_row:
-            buttons.append(nav_row)
-
-        # Add back button
-        buttons.append([
-            InlineKeyboardButton("🔙 بازگشت",
-                                 callback_data="back_to_categories")
-        ])
-
-        return InlineKeyboardMarkup(buttons)
-
-    def get_products_keyboard(self, products: List[Dict],
-                              category: str) -> InlineKeyboardMarkup:
-        """Get products list keyboard"""
-        buttons = []
-
-        for product in products:
-            button_text = product['name']
-            callback_data = f"product_{product['id']}"
-            buttons.append([
-                InlineKeyboardButton(button_text, callback_data=callback_data)
-            ])
-
-        # Add navigation buttons
-        buttons.append(
-            [InlineKeyboardButton("🏠 منوی اصلی", callback_data="main_menu")])
-
-        return InlineKeyboardMarkup(buttons)
-
-    def get_category_products_keyboard(self,
-                                       category: str) -> InlineKeyboardMarkup:
-        """Get category products keyboard with icons"""
-        buttons = []
-
-        # Get product icons for this category
-        product_icons = get_category_product_icons(category)
-
-        # Create buttons for each unique icon - 2 buttons per row
-        row = []
-        for i, (icon, description, product_id) in enumerate(product_icons):
-            button_text = description
-            callback_data = f"product_{product_id}"
-            row.append(
-                InlineKeyboardButton(button_text, callback_data=callback_data))
-
-            # Create rows of 2 buttons each
-            if (i + 1) % 2 == 0:
-                buttons.append(row)
-                row = []
-
-        # Add remaining button if any
-        if row:
-            buttons.append(row)
-
-        # Add alphabet search button
-        buttons.append([
-            InlineKeyboardButton("🔤 جستجوی حروف الفبایی",
-                                 callback_data=f"alphabet_search_{category}")
-        ])
-
-        # Add back button
-        buttons.append([
-            InlineKeyboardButton("🔙 بازگشت",
-                                 callback_data="back_to_categories")
-        ])
-
-        return InlineKeyboardMarkup(buttons)
-
-    def get_size_selection_keyboard(self,
-                                    category: str) -> InlineKeyboardMarkup:
-        """Get size selection keyboard based on category"""
-        if category == 'baby':
-            # Baby category: only 75×160
-            sizes = ["75×160"]
-        elif category in ['teen', 'adult']:
-            # Teen and adult: specific sizes as requested
-            if category == 'teen':
-                sizes = [
-                    "90×200",
-                    "100×200",
-                    "120×200",
-                ]
-            else:  # category == 'adult'
-                sizes = [
-                    "140×200",
-                    "160×200",
-                    "180×200",
-                ]
-        elif category == 'tablecloth':
-            # Tablecloth category: custom sizes with different prices
-            sizes = ["120×80", "100×100", "100×150", "120×180"]
-        else:
-            # Default sizes for other categories
-            sizes = [
-                "140×200",
-                "160×200",
-                "180×200",
-            ]
-
-        buttons = []
-        row = []
-
-        for i, size in enumerate(sizes):
-            row.append(
-                InlineKeyboardButton(size,
-                                     callback_data=f"size_{size}_{category}"))
-
-            # Create rows of 3 buttons each for better layout with more sizes
-            if (i + 1) % 3 == 0:
-                buttons.append(row)
-                row = []
-
-        # Add remaining buttons if any
-        if row:
-            buttons.append(row)
-
-        # Add back button
-        buttons.append([
-            InlineKeyboardButton("🔙 بازگشت",
-                                 callback_data="back_to_categories")
-        ])
-
-        return InlineKeyboardMarkup(buttons)
-
-    def get_sewing_type_keyboard(self) -> InlineKeyboardMarkup:
-        """Get sewing type selection keyboard for curtains"""
-        buttons = [[
-            InlineKeyboardButton("پانچ", callback_data="sewing_panch"),
-            InlineKeyboardButton("نواردوزی", callback_data="sewing_navardozi")
-        ],
-                   [
-                       InlineKeyboardButton("🔙 بازگشت",
-                                            callback_data="back_to_categories")
-                   ]]
-        return InlineKeyboardMarkup(buttons)
-
-    def get_fabric_selection_keyboard(self) -> InlineKeyboardMarkup:
-        """Get fabric selection keyboard for curtains"""
-        buttons = [[
-            InlineKeyboardButton("حریر کتان",
-                                 callback_data="fabric_silk_cotton"),
-            InlineKeyboardButton("مخمل", callback_data="fabric_velvet")
-        ],
-                   [
-                       InlineKeyboardButton(
-                           "🔙 بازگشت", callback_data="back_to_sewing_type")
-                   ]]
-        return InlineKeyboardMarkup(buttons)
-
-    def get_height_input_keyboard(self) -> InlineKeyboardMarkup:
-        """Get height input keyboard for curtains"""
-        buttons = [[
-            InlineKeyboardButton("🔙 بازگشت",
-                                 callback_data="back_to_fabric_selection")
-        ]]
-        return InlineKeyboardMarkup(buttons)
-
-    def get_quantity_keyboard(self) -> InlineKeyboardMarkup:
-        """Get quantity selection keyboard"""
-        buttons = []
-        row = []
-
-        # Quantities 1-10
-        for i in range(1, 11):
-            row.append(InlineKeyboardButton(str(i), callback_data=f"qty_{i}"))
-
-            # Create rows of 5 buttons each
-            if i % 5 == 0:
-                buttons.append(row)
-                row = []
-
-        # Add navigation buttons
-        buttons.append([
-            InlineKeyboardButton(" بازگشت", callback_data="back_to_products")
-        ])
-
-        return InlineKeyboardMarkup(buttons)
-
-    def get_payment_keyboard(self) -> InlineKeyboardMarkup:
-        """Get payment options keyboard"""
-        buttons = [[
-            InlineKeyboardButton(" پرداخت نقدی (۳۰٪ تخفیف)",
-                                 callback_data="payment_cash_card")
-        ],
-                   [
-                       InlineKeyboardButton(" پرداخت ۶۰ روز (۲۵٪ تخفیف)",
-                                            callback_data="payment_60day_card")
-                   ],
-                   [
-                       InlineKeyboardButton(
-                           " پرداخت ۹۰ روز (۲۵٪ تخفیف + ۲۵٪ پیش‌پرداخت)",
-                           callback_data="payment_90day_card")
-                   ],
-                   [
-                       InlineKeyboardButton(" بازگشت به سبد خرید",
-                                            callback_data="view_cart")
-                   ],
-                   [
-                       InlineKeyboardButton(" منوی اصلی",
-                                            callback_data="main_menu")
-                   ]]
-        return InlineKeyboardMarkup(buttons)
-
-    def get_cart_management_keyboard(self) -> InlineKeyboardMarkup:
-        """Get cart management keyboard"""
-        buttons = [[
-            InlineKeyboardButton(" مشاهده پیش فاکتور",
-                                 callback_data="view_invoice")
-        ], [
-            InlineKeyboardButton(" ادامه خرید", callback_data="start_shopping")
-        ], [InlineKeyboardButton(" پاک کردن سبد", callback_data="cart_clear")
-            ], [InlineKeyboardButton(" منوی اصلی", callback_data="main_menu")]]
-        return InlineKeyboardMarkup(buttons)
-
-    def get_payment_type_keyboard(self,
-                                  payment_method: str) -> InlineKeyboardMarkup:
-        """Get payment type selection keyboard (Cash vs Check)"""
-        buttons = [
-            [
-                InlineKeyboardButton(
-                    " پرداخت نقدی",
-                    callback_data=f"payment_type_cash_{payment_method}")
-            ],
-            [
-                InlineKeyboardButton(
-                    " پرداخت چکی",
-                    callback_data=f"payment_type_check_{payment_method}")
-            ], [InlineKeyboardButton(" بازگشت", callback_data="view_invoice")]
-        ]
-        return InlineKeyboardMarkup(buttons)
-
-    def get_cash_payment_keyboard(self) -> InlineKeyboardMarkup:
-        """Get cash payment confirmation keyboard"""
-        buttons = [[
-            InlineKeyboardButton(" ارسال فیش واریزی",
-                                 callback_data="upload_receipt")
-        ], [InlineKeyboardButton(" بازگشت", callback_data="view_invoice")]]
-        return InlineKeyboardMarkup(buttons)
-
-    def get_check_payment_keyboard(self) -> InlineKeyboardMarkup:
-        """Get check payment keyboard"""
-        buttons = [[
-            InlineKeyboardButton(" ارسال عکس چک",
-                                 callback_data="upload_check_photo")
-        ],
-                   [
-                       InlineKeyboardButton(" در حال پیگیری",
-                                            callback_data="check_follow_up")
-                   ],
-                   [
-                       InlineKeyboardButton(" بازگشت",
-                                            callback_data="view_invoice")
-                   ]]
-        return InlineKeyboardMarkup(buttons)
-
-    def get_check_confirmation_keyboard(self) -> InlineKeyboardMarkup:
-        """Get check confirmation keyboard after admin message"""
-        buttons = [[
-            InlineKeyboardButton("✅ چک را ثبت و ارسال می‌کنم به کارخانه",
-                                 callback_data="confirm_check_submission")
-        ],
-                   [
-                       InlineKeyboardButton("🔄 ارسال عکس چک جدید",
-                                            callback_data="upload_check_photo")
-                   ]]
-        return InlineKeyboardMarkup(buttons)
+
+def get_cushion_subcategories(page: int = 0) -> InlineKeyboardMarkup:
+    """Get cushion subcategories keyboard with icon navigation and pagination"""
+    return _get_icon_page('cushion', page)
+
+
+def get_baby_subcategories(page: int = 0) -> InlineKeyboardMarkup:
+    """Get baby subcategories keyboard with icon navigation and pagination"""
+    return _get_icon_page('baby', page)
+
+
+def get_tablecloth_subcategories(page: int = 0) -> InlineKeyboardMarkup:
+    """Get tablecloth subcategories keyboard with icon navigation and pagination"""
+    return _get_icon_page('tablecloth', page)
+
+
+def get_alphabetical_keyboard(category: str,
+                              page: int = 0) -> InlineKeyboardMarkup:
+    """Get alphabetical search keyboard with pagination"""
+    return _get_alphabet_page(category, page)
+
+
+def get_products_keyboard(products: List[Dict],
+                          category: str) -> InlineKeyboardMarkup:
+    """Get products list keyboard"""
+    _refresh_if_stale()
+    buttons = []
+
+    for product in products:
+        button_text = product['name']
+        callback_data = (_CB_PRODUCT.get(product['id'])
+                         or f"product_{product['id']}")
+        buttons.append((InlineKeyboardButton(button_text,
+                                             callback_data=callback_data), ))
+
+    # Add navigation buttons
+    buttons.append((_MAIN_MENU_BTN, ))
+
+    return InlineKeyboardMarkup(tuple(buttons))
+
+
+def get_category_products_keyboard(category: str) -> InlineKeyboardMarkup:
+    """Get category products keyboard with icons"""
+    return _get_category_products(category)
+
+
+# Sizes offered per category; other categories use _DEFAULT_SIZES
+_SIZES: Final[Dict[str, Tuple[str, ...]]] = {
+    'baby': ("75×160", ),
+    'teen': ("90×200", "100×200", "120×200"),
+    'adult': ("140×200", "160×200", "180×200"),
+    # Tablecloth category: custom sizes with different prices
+    'tablecloth': ("120×80", "100×100", "100×150", "120×180"),
+}
+_DEFAULT_SIZES: Final[Tuple[str, ...]] = ("140×200", "160×200",
+                                          "180×200")
+_CB_SIZE: Final[Dict[str, Dict[str, str]]] = {}
+
+
+def _build_size_keyboard(category: str) -> InlineKeyboardMarkup:
+    """Build the size selection keyboard of a category"""
+    sizes = _SIZES.get(category, _DEFAULT_SIZES)
+    callbacks = _CB_SIZE.get(category, {})
+
+    # Create rows of 3 buttons each for better layout with more sizes
+    buttons = _chunk_rows([
+        InlineKeyboardButton(
+            size, callback_data=callbacks.get(size) or f"size_{size}_{category}")
+        for size in sizes
+    ], 3)
+
+    # Add back button
+    buttons.append((_BACK_TO_CATEGORIES, ))
+
+    return InlineKeyboardMarkup(tuple(buttons))
+
+
+# Size callbacks embed the category, so each category gets its own keyboard
+_SIZE_KB: Final[Dict[str, InlineKeyboardMarkup]] = {}
+
+
+def _precompute_size_keyboards():
+    """Build the size callbacks and keyboard of every category"""
+    for category in PRODUCT_CATEGORIES:
+        _CB_SIZE[category] = {
+            size: sys.intern(f"size_{size}_{category}")
+            for size in _SIZES.get(category, _DEFAULT_SIZES)
+        }
+        _SIZE_KB[category] = _build_size_keyboard(category)
+
+
+def get_size_selection_keyboard(category: str) -> InlineKeyboardMarkup:
+    """Get size selection keyboard based on category"""
+    _refresh_if_stale()
+    keyboard = _SIZE_KB.get(category)
+    if keyboard is None:
+        keyboard = _build_size_keyboard(category)
+    return keyboard
+
+
+# Every table filled from the catalog, cleared before a rebuild
+_CATALOG_TABLES: Final = (_ICON_CACHE, _CB_PRODUCT, _ALPHA_BTNS, _ALPHA_BTN,
+                          _NAV_ROWS, PAGE_INDEX, PAGE_CACHE, _ALPHA_PAGES,
+                          CATEGORY_PRODUCTS_CACHE, _CURTAIN_ONLY_CACHE,
+                          _CB_SIZE, _SIZE_KB)
+# Catalog version the tables were last built from
+_built_version: Optional[int] = None
+
+
+def _rebuild_caches():
+    """Rebuild every catalog-derived table from the current catalog"""
+    global _built_version
+    version = get_data_version()
+    for table in _CATALOG_TABLES:
+        table.clear()
+    _precompute_catalog_tables()
+    _precompute_keyboards()
+    _precompute_size_keyboards()
+    _built_version = version
+
+
+def _refresh_if_stale():
+    """Rebuild the cached keyboards after data.product_data.bump_data_version"""
+    if _built_version != get_data_version():
+        _rebuild_caches()
+
+
+_rebuild_caches()
+
+
+class BotKeyboards:
+    """Class to manage all bot keyboards
+
+    Every keyboard is a module-level function; this class exposes them as
+    static methods for callers that use a ``BotKeyboards`` instance.
+    """
+
+    get_main_menu = staticmethod(get_main_menu)
+    get_categories_keyboard = staticmethod(get_categories_keyboard)
+    get_curtain_subcategories = staticmethod(get_curtain_subcategories)
+    get_curtain_only_subcategories = staticmethod(get_curtain_only_subcategories)
+    get_icon_page = staticmethod(get_icon_page)
+    get_cushion_subcategories = staticmethod(get_cushion_subcategories)
+    get_baby_subcategories = staticmethod(get_baby_subcategories)
+    get_teen_subcategories = staticmethod(get_teen_subcategories)
+    get_adult_subcategories = staticmethod(get_adult_subcategories)
+    get_tablecloth_subcategories = staticmethod(get_tablecloth_subcategories)
+    get_alphabetical_keyboard = staticmethod(get_alphabetical_keyboard)
+    get_products_keyboard = staticmethod(get_products_keyboard)
+    get_category_products_keyboard = staticmethod(get_category_products_keyboard)
+    get_size_selection_keyboard = staticmethod(get_size_selection_keyboard)
+    get_sewing_type_keyboard = staticmethod(get_sewing_type_keyboard)
+    get_fabric_selection_keyboard = staticmethod(get_fabric_selection_keyboard)
+    get_height_input_keyboard = staticmethod(get_height_input_keyboard)
+    get_quantity_keyboard = staticmethod(get_quantity_keyboard)
+    get_payment_keyboard = staticmethod(get_payment_keyboard)
+    get_cart_management_keyboard = staticmethod(get_cart_management_keyboard)
+    get_payment_type_keyboard = staticmethod(get_payment_type_keyboard)
+    get_cash_payment_keyboard = staticmethod(get_cash_payment_keyboard)
+    get_check_payment_keyboard = staticmethod(get_check_payment_keyboard)
+    get_check_confirmation_keyboard = staticmethod(get_check_confirmation_keyboard)
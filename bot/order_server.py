@@ -15,8 +15,27 @@ from bot.hesabfa_integration import HesabfaAPI
 from utils.logger import setup_logger
 from utils.persian_utils import format_price, persian_numbers
 
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib encoder
+    orjson = None
+
 logger = setup_logger(__name__)
 
+
+def _dumps(order_data: Dict) -> bytes:
+    """Encode an order as indented UTF-8 JSON"""
+    if orjson is not None:
+        return orjson.dumps(order_data, option=orjson.OPT_INDENT_2)
+    return json.dumps(order_data, ensure_ascii=False, indent=2).encode('utf-8')
+
+
+def _loads(data: bytes) -> Dict:
+    """Decode an order saved as JSON"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
 class OrderStatus:
     """وضعیت‌های مختلف سفارش"""
     PENDING = "pending"           # در انتظار
@@ -174,8 +193,8 @@ class OrderManagementServer:
             data_to_save = order_data
 
         try:
-            with open(order_file, 'w', encoding='utf-8') as f:
-                json.dump(data_to_save, f, ensure_ascii=False, indent=2)
+            with open(order_file, 'wb') as f:
+                f.write(_dumps(data_to_save))
             return True
         except Exception as e:
             logger.error(f"خطا در ذخیره سفارش: {e}")
@@ -265,9 +284,9 @@ class OrderManagementServer:
         for i, item in enumerate(cart_items, 1):
             item_total = item['price'] * item['quantity']
             invoice_text += (
-                f"{persian_numbers(str(i))}. {item['product_name']}\n"
+                f"{persian_numbers(i)}. {item['product_name']}\n"
                 f"   📏 سایز: {item['size']}\n"
-                f"   📦 تعداد: {persian_numbers(str(item['quantity']))}\n"
+                f"   📦 تعداد: {persian_numbers(item['quantity'])}\n"
                 f"   💰 قیمت: {format_price(item_total)} تومان\n\n"
             )
 
@@ -278,7 +297,7 @@ class OrderManagementServer:
         )
 
         if pricing['discount'] > 0:
-            invoice_text += f"🎁 تخفیف ({persian_numbers(str(int(pricing['discount_rate'] * 100)))}٪): {format_price(pricing['discount'])} تومان\n"
+            invoice_text += f"🎁 تخفیف ({persian_numbers(int(pricing['discount_rate'] * 100))}٪): {format_price(pricing['discount'])} تومان\n"
 
         invoice_text += (
             f"📊 مالیات (۹٪): {format_price(pricing['tax'])} تومان\n"
@@ -371,8 +390,8 @@ class OrderManagementServer:
 
         try:
             if os.path.exists(order_file):
-                with open(order_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                with open(order_file, 'rb') as f:
+                    return _loads(f.read())
             return None
         except Exception as e:
             logger.error(f"خطا در بارگیری سفارش {order_id}: {e}")
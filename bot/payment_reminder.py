@@ -14,6 +14,9 @@ from utils.logger import setup_logger
 
 logger = setup_logger(__name__)
 
+# Upper bound on reminders in flight at once
+_MAX_CONCURRENT_REMINDERS = 10
+
 class PaymentReminderBot:
     """Automated payment reminder system"""
     
@@ -33,8 +36,13 @@ class PaymentReminderBot:
             
             logger.info(f"Found {len(pending_reminders)} payment reminders to send")
             
-            for reminder in pending_reminders:
-                await self._send_reminder_to_group(reminder)
+            semaphore = asyncio.Semaphore(_MAX_CONCURRENT_REMINDERS)
+
+            async def send_one(reminder):
+                async with semaphore:
+                    await self._send_reminder_to_group(reminder)
+
+            await asyncio.gather(*(send_one(reminder) for reminder in pending_reminders))
                 
         except Exception as e:
             logger.error(f"Error sending daily reminders: {e}")
@@ -240,9 +240,9 @@ class PaymentScheduler:
                 f"🏙️ شهر: {customer['city']}",
                 f"🆔 کد مشتری: {customer['customer_id']}",
                 "",
-                f"📅 قسط شماره: {persian_numbers(str(payment_num))} از ۳",
+                f"📅 قسط شماره: {persian_numbers(payment_num)} از ۳",
                 f"💰 مبلغ قسط: {format_price(amount)} تومان",
-                f"📊 اقساط باقی‌مانده: {persian_numbers(str(remaining - 1))}",
+                f"📊 اقساط باقی‌مانده: {persian_numbers(remaining - 1)}",
                 "",
                 "📞 لطفاً با مشتری تماس بگیرید تا پرداخت را انجام دهد.",
                 "",
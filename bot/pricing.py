@@ -4,9 +4,120 @@ Pricing and Invoice Management
 Handles price calculations and invoice generation.
 """
 
-from typing import List, Dict, Any
-from utils.persian_utils import format_price, persian_numbers
-from datetime import datetime
+import functools
+from operator import itemgetter, mul
+from typing import List, Dict, Any, Tuple
+from utils.persian_utils import (PERSIAN_MONTHS, format_price,
+                                 gregorian_to_jalali, persian_numbers)
+from datetime import date, datetime
+
+_get_price = itemgetter('price')
+_get_quantity = itemgetter('quantity')
+# Rendered fields of a cart item, fetched with one C call per item
+_item_key = itemgetter('product_name', 'size', 'price', 'quantity')
+
+# %-format templates of the order invoice blocks
+_ORDER_HEADER_TPL = ("%s\n"
+                     "شماره سفارش: %s\n"
+                     "%s\n"
+                     "👤 نام مشتری: %s\n"
+                     "🏙️ شهر: %s\n"
+                     "📅 تاریخ: %s\n\n"
+                     "📋 جزئیات سفارش:\n"
+                     "%s\n")
+_ORDER_ITEM_TPL = ("%s. %s\n"
+                   "   📏 سایز: %s\n"
+                   "   📦 تعداد: %s\n"
+                   "   💰 قیمت: %s تومان\n\n")
+
+
+@functools.lru_cache(maxsize=128)
+def _render_item_lines(
+        items: Tuple[Tuple[Any, ...], ...]) -> Tuple[Tuple[str, ...], int]:
+    """Render (product_name, size, price, quantity) rows as invoice lines"""
+    lines = []
+    subtotal = 0
+    for i, (product_name, size, price, quantity) in enumerate(items, 1):
+        item_total = price * quantity
+        subtotal += item_total
+        lines.extend([
+            f"{persian_numbers(i)}. {product_name}",
+            f"   📏 سایز: {size}",
+            f"   📦 تعداد: {persian_numbers(quantity)}",
+            f"   💰 قیمت واحد: {format_price(price)} تومان",
+            f"   💰 قیمت کل: {format_price(item_total)} تومان", ""
+        ])
+    return tuple(lines), subtotal
+
+
+@functools.lru_cache(maxsize=8)
+def _persian_date_for(ordinal: int) -> str:
+    """Persian date like '۱۴ مرداد ۱۴۰۴' of a Gregorian day ordinal"""
+    day = date.fromordinal(ordinal)
+    year, month, day_of_month = gregorian_to_jalali(day.year, day.month,
+                                                    day.day)
+    return persian_numbers(
+        f"{day_of_month} {PERSIAN_MONTHS[month - 1]} {year}")
+
+
+@functools.lru_cache(maxsize=8)
+def _persian_numeric_date_for(ordinal: int) -> str:
+    """Persian date like '۱۴۰۴/۰۵/۱۴' of a Gregorian day ordinal"""
+    day = date.fromordinal(ordinal)
+    year, month, day_of_month = gregorian_to_jalali(day.year, day.month,
+                                                    day.day)
+    return persian_numbers(f"{year}/{month:02d}/{day_of_month:02d}")
+
+
+def _percent_of(amount: int, rate: float) -> int:
+    """Whole toman share of amount at rate, without float rounding errors"""
+    return int(amount * round(rate * 100) // 100)
+
+
+@functools.lru_cache(maxsize=256)
+def _render_final_invoice(items: Tuple[Tuple[Any, ...], ...],
+                          customer: Tuple[Any, Any, Any],
+                          payment_method: str, discount_rate: float,
+                          today: int) -> str:
+    """Render a final invoice from hashable cart and customer fields"""
+    name, city, customer_id = customer
+
+    # Format cart items and sum their totals in one pass
+    item_lines, subtotal = _render_item_lines(items)
+    discount = _percent_of(subtotal, discount_rate)
+    total = subtotal - discount
+
+    # Generate invoice text
+    invoice_lines = [
+        "📋 فاکتور نهایی", "=" * 30, "", f"👤 مشتری: {name}",
+        f"🏙️ شهر: {city}",
+        f"🆔 کد مشتری: {customer_id}",
+        f"📅 تاریخ: {_persian_date_for(today)}",
+        f"💳 روش پرداخت: {payment_method}", "", "📦 اقلام سفارش:", "-" * 20
+    ]
+
+    # Add cart items
+    invoice_lines.extend(item_lines)
+
+    # Add calculations
+    invoice_lines.extend([
+        "-" * 20, f"💰 مجموع: {format_price(subtotal)} تومان",
+        f"🎁 تخفیف ({persian_numbers(int(discount_rate * 100))}٪): {format_price(discount)} تومان",
+        f"💰 مبلغ قابل پرداخت: {format_price(total)} تومان"
+    ])
+
+    # Add special details for installment payment
+    if payment_method == "پرداخت اقساطی":
+        invoice_lines.extend([
+            "", "💳 جزئیات پرداخت اقساطی:",
+            f"🎁 تخفیف ویژه: {persian_numbers(int(discount_rate * 100))}٪",
+            "📞 جزئیات اقساط با تماس کارشناس اعلام خواهد شد"
+        ])
+
+    invoice_lines.extend(
+        ["", "✅ سفارش شما ثبت شد و به زودی با شما تماس خواهیم گرفت."])
+
+    return "\n".join(invoice_lines)
 
 
 class PricingManager:
@@ -28,19 +139,28 @@ class PricingManager:
             'account_holder': 'نیما کریمی'
         }
 
-    def calculate_subtotal(self, cart_items: List[Dict[str, Any]]) -> float:
+        # Invoice text that never changes between invoices
+        self._sep = "━" * 30
+        self._bank_block = (
+            f"🏪 نام صاحب حساب: {self.bank_info['account_holder']}\n"
+            f"💳 شماره کارت: {self.bank_info['card_number']}\n"
+            f"🏦 شماره شبا: IR{self.bank_info['sheba_number']}")
+
+    def calculate_subtotal(self, cart_items: List[Dict[str, Any]]) -> int:
         """Calculate subtotal from cart items"""
-        return sum(item['price'] * item['quantity'] for item in cart_items)
+        return sum(
+            map(mul, map(_get_price, cart_items),
+                map(_get_quantity, cart_items)))
 
-    def calculate_discount(self, subtotal: float, discount_rate: float) -> int:
+    def calculate_discount(self, subtotal: int, discount_rate: float) -> int:
         """محاسبه تخفیف"""
-        return int(subtotal * discount_rate)
+        return _percent_of(subtotal, discount_rate)
 
     def calculate_tax(self, amount: int) -> int:
         """محاسبه مالیات ()"""
-        return int(amount * 0.09)
+        return _percent_of(amount, 0.09)
 
-    def calculate_total(self, subtotal: float, discount: float = 0) -> float:
+    def calculate_total(self, subtotal: int, discount: int = 0) -> int:
         """Calculate final total"""
         return subtotal - discount
 
@@ -50,8 +170,8 @@ class PricingManager:
         if not cart_items:
             return "❌ سبد خرید خالی است."
 
-        # Calculate amounts
-        subtotal = self.calculate_subtotal(cart_items)
+        # Format cart items and sum their totals in one pass
+        item_lines, subtotal = self._item_lines(cart_items)
 
         # Calculate discounts for each option
         cash_discount = self.calculate_discount(subtotal, 0.30)
@@ -59,7 +179,7 @@ class PricingManager:
 
         cash_total = subtotal - cash_discount
         installment_total = subtotal - installment_discount
-        advance_payment_90 = installment_total * 0.25
+        advance_payment_90 = _percent_of(installment_total, 0.25)
 
         # Generate invoice text
         invoice_lines = [
@@ -71,15 +191,7 @@ class PricingManager:
         ]
 
         # Add cart items
-        for i, item in enumerate(cart_items, 1):
-            item_total = item['price'] * item['quantity']
-            invoice_lines.extend([
-                f"{persian_numbers(str(i))}. {item['product_name']}",
-                f"   📏 سایز: {item['size']}",
-                f"   📦 تعداد: {persian_numbers(str(item['quantity']))}",
-                f"   💰 قیمت واحد: {format_price(item['price'])} تومان",
-                f"   💰 قیمت کل: {format_price(item_total)} تومان", ""
-            ])
+        invoice_lines.extend(item_lines)
 
         # Add total amount
         invoice_lines.extend([
@@ -97,210 +209,153 @@ class PricingManager:
         if not cart_items:
             return "❌ سبد خرید خالی است."
 
-        # Calculate amounts
-        subtotal = self.calculate_subtotal(cart_items)
-        discount = self.calculate_discount(subtotal, discount_rate)
-        total = subtotal - discount
-
-        # Generate invoice text
-        invoice_lines = [
-            "📋 فاکتور نهایی", "=" * 30, "", f"👤 مشتری: {customer['name']}",
-            f"🏙️ شهر: {customer['city']}",
-            f"🆔 کد مشتری: {customer['customer_id']}",
-            f"📅 تاریخ: {self._get_persian_date()}",
-            f"💳 روش پرداخت: {payment_method}", "", "📦 اقلام سفارش:", "-" * 20
-        ]
-
-        # Add cart items
-        for i, item in enumerate(cart_items, 1):
-            item_total = item['price'] * item['quantity']
-            invoice_lines.extend([
-                f"{persian_numbers(str(i))}. {item['product_name']}",
-                f"   📏 سایز: {item['size']}",
-                f"   📦 تعداد: {persian_numbers(str(item['quantity']))}",
-                f"   💰 قیمت واحد: {format_price(item['price'])} تومان",
-                f"   💰 قیمت کل: {format_price(item_total)} تومان", ""
-            ])
-
-        # Add calculations
-        invoice_lines.extend([
-            "-" * 20, f"💰 مجموع: {format_price(subtotal)} تومان",
-            f"🎁 تخفیف ({persian_numbers(str(int(discount_rate * 100)))}٪): {format_price(discount)} تومان",
-            f"💰 مبلغ قابل پرداخت: {format_price(total)} تومان"
-        ])
-
-        # Add special details for installment payment
-        if payment_method == "پرداخت اقساطی":
-            invoice_lines.extend([
-                "", "💳 جزئیات پرداخت اقساطی:",
-                f"🎁 تخفیف ویژه: {persian_numbers(str(int(discount_rate * 100)))}٪",
-                "📞 جزئیات اقساط با تماس کارشناس اعلام خواهد شد"
-            ])
-
-        invoice_lines.extend(
-            ["", "✅ سفارش شما ثبت شد و به زودی با شما تماس خواهیم گرفت."])
-
-        return "\n".join(invoice_lines)
+        # The same invoice is often shown again (back/forward, resend), so
+        # rendering is cached on everything that appears in it
+        return _render_final_invoice(
+            tuple(map(_item_key, cart_items)),
+            (customer['name'], customer['city'], customer['customer_id']),
+            payment_method, discount_rate, date.today().toordinal())
 
     def generate_invoice_text(self, order_data: Dict) -> str:
         """تولید متن پیش‌فاکتور"""
         customer = order_data["customer"]
         cart_items = order_data["items"]
 
-        subtotal = sum(item['price'] * item['quantity'] for item in cart_items)
+        item_parts, subtotal = self._order_item_parts(cart_items)
         discount_rate = 0.25
-        discount = subtotal * discount_rate
+        discount = self.calculate_discount(subtotal, discount_rate)
         total = subtotal - discount
-        advance_payment = total * 0.25
+        advance_payment = _percent_of(total, 0.25)
 
-        invoice_text = (
+        parts = [(
             f"🆕 سفارش جدید - شماره: {order_data['order_id']}\n"
-            f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n"
+            f"{self._sep}\n"
             f"👤 نام مشتری: {customer['name']}\n"
             f"🏙️ شهر: {customer['city']}\n"
             f"💰 قیمت کل: {format_price(subtotal)} تومان\n"
             f"🎁 تخفیف (25٪): {format_price(discount)} تومان\n"
             f"💰 مبلغ قابل پرداخت: {format_price(total)} تومان\n"
             f"💳 پیش‌پرداخت (25٪): {format_price(advance_payment)} تومان\n"
-            f"📅 تاریخ: ۱۴۰۴/۰۵/۱۴\n"
+            f"📅 تاریخ: {_persian_numeric_date_for(date.today().toordinal())}\n"
             f"📋 جزئیات سفارش:\n"
-            f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n")
-        for i, item in enumerate(cart_items, 1):
-            item_total = item['price'] * item['quantity']
-            invoice_text += (
-                f"{persian_numbers(str(i))}. {item['product_name']}\n"
-                f"   📏 سایز: {item['size']}\n"
-                f"   📦 تعداد: {persian_numbers(str(item['quantity']))}\n"
-                f"   💰 قیمت: {format_price(item_total)} تومان\n\n")
-        return invoice_text
+            f"{self._sep}\n")]
+        parts.extend(item_parts)
+        return "".join(parts)
 
     def generate_cash_payment_invoice(self, order_data: Dict) -> str:
         """تولید فاکتور پرداخت نقدی با تخفیف 30%"""
-        customer = order_data["customer"]
-        cart_items = order_data["items"]
-
-        subtotal = sum(item['price'] * item['quantity'] for item in cart_items)
-        discount_rate = 0.30  # 30% discount for cash payment
-        discount = subtotal * discount_rate
-        total = subtotal - discount
-
-        invoice_text = (f"💳 پرداخت نقدی (30% تخفیف)\n"
-                        f"شماره سفارش: {order_data['order_id']}\n"
-                        f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n"
-                        f"👤 نام مشتری: {customer['name']}\n"
-                        f"🏙️ شهر: {customer['city']}\n"
-                        f"📅 تاریخ: {self._get_persian_date()}\n\n"
-                        f"📋 جزئیات سفارش:\n"
-                        f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n")
-
-        # Add cart items
-        for i, item in enumerate(cart_items, 1):
-            item_total = item['price'] * item['quantity']
-            invoice_text += (
-                f"{persian_numbers(str(i))}. {item['product_name']}\n"
-                f"   📏 سایز: {item['size']}\n"
-                f"   📦 تعداد: {persian_numbers(str(item['quantity']))}\n"
-                f"   💰 قیمت: {format_price(item_total)} تومان\n\n")
-
-        # Add totals
-        invoice_text += (
-            f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n"
-            f"💰 مبلغ کل: {format_price(subtotal)} تومان\n"
-            f"🎁 مبلغ تخفیف ({persian_numbers('30')}٪): {format_price(discount)} تومان\n\n"
-            f"💳 اطلاعات پرداخت:\n"
-            f"🏪 نام صاحب حساب: {self.bank_info['account_holder']}\n"
-            f"💳 شماره کارت: {self.bank_info['card_number']}\n"
-            f"🏦 شماره شبا: IR{self.bank_info['sheba_number']}\n\n"
-            f"✅ پس از واریز، لطفاً فیش واریزی را ارسال کنید.")
-
-        return invoice_text
+        return self._render_payment_invoice(
+            order_data,
+            title="💳 پرداخت نقدی (30% تخفیف)",
+            discount_rate=0.30,  # 30% discount for cash payment
+            bank_title="💳 اطلاعات پرداخت:",
+            footer="✅ پس از واریز، لطفاً فیش واریزی را ارسال کنید.")
 
     def generate_installment_payment_invoice(self, order_data: Dict) -> str:
         """تولید فاکتور پرداخت اقساطی با تخفیف 25%"""
-        customer = order_data["customer"]
-        cart_items = order_data["items"]
-
-        subtotal = sum(item['price'] * item['quantity'] for item in cart_items)
-        discount_rate = 0.25  # 25% discount for installment payment
-        discount = subtotal * discount_rate
-        total = subtotal - discount
-
-        invoice_text = (f"📅 پرداخت اقساطی (25% تخفیف)\n"
-                        f"شماره سفارش: {order_data['order_id']}\n"
-                        f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n"
-                        f"👤 نام مشتری: {customer['name']}\n"
-                        f"🏙️ شهر: {customer['city']}\n"
-                        f"📅 تاریخ: {self._get_persian_date()}\n\n"
-                        f"📋 جزئیات سفارش:\n"
-                        f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n")
-
-        # Add cart items
-        for i, item in enumerate(cart_items, 1):
-            item_total = item['price'] * item['quantity']
-            invoice_text += (
-                f"{persian_numbers(str(i))}. {item['product_name']}\n"
-                f"   📏 سایز: {item['size']}\n"
-                f"   📦 تعداد: {persian_numbers(str(item['quantity']))}\n"
-                f"   💰 قیمت: {format_price(item_total)} تومان\n\n")
-
-        # Add totals
-        invoice_text += (
-            f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n"
-            f"💰 مبلغ کل: {format_price(subtotal)} تومان\n"
-            f"🎁 مبلغ تخفیف ({persian_numbers('25')}٪): {format_price(discount)} تومان\n"
-            f"💰 مبلغ نهایی: {format_price(total)} تومان")
-
-        return invoice_text
+        return self._render_payment_invoice(
+            order_data,
+            title="📅 پرداخت اقساطی (25% تخفیف)",
+            discount_rate=0.25,  # 25% discount for installment payment
+            show_total=True)
 
     def generate_60day_payment_invoice(self, order_data: Dict) -> str:
         """تولید فاکتور پرداخت 60 روزه با تخفیف 25% + پیش پرداخت 25%"""
+        return self._render_payment_invoice(
+            order_data,
+            title="🕐 پرداخت 60 روزه (25% تخفیف)",
+            discount_rate=0.25,  # 25% discount
+            show_total=True,
+            show_advance=True,  # 25% advance payment from final amount
+            bank_title="💳 اطلاعات پرداخت پیش‌پرداخت:",
+            footer=("📅 شرایط پرداخت:\n"
+                    "• پیش‌پرداخت 25٪ از مبلغ نهایی\n"
+                    "• مابقی 60 روز پس از تحویل\n"
+                    "• تخفیف ویژه 25٪ اعمال شده\n\n"
+                    "✅ پس از واریز پیش‌پرداخت، فیش واریزی را ارسال کنید."))
+
+    def _render_payment_invoice(self,
+                                order_data: Dict,
+                                *,
+                                title: str,
+                                discount_rate: float,
+                                show_total: bool = False,
+                                show_advance: bool = False,
+                                bank_title: str = "",
+                                footer: str = "") -> str:
+        """Render an order invoice for one payment method
+
+        The header and item list are shared by every method; the flags add
+        the final amount, the 25% advance payment, the bank account block
+        and a closing note.
+        """
         customer = order_data["customer"]
         cart_items = order_data["items"]
 
-        subtotal = sum(item['price'] * item['quantity'] for item in cart_items)
-        discount_rate = 0.25  # 25% discount
-        discount = subtotal * discount_rate
+        item_parts, subtotal = self._order_item_parts(cart_items)
+        discount = self.calculate_discount(subtotal, discount_rate)
         total = subtotal - discount
-        advance_payment = total * 0.25  # 25% advance payment from final amount
+        percent = persian_numbers(round(discount_rate * 100))
 
-        invoice_text = (f"🕐 پرداخت 60 روزه (25% تخفیف)\n"
-                        f"شماره سفارش: {order_data['order_id']}\n"
-                        f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n"
-                        f"👤 نام مشتری: {customer['name']}\n"
-                        f"🏙️ شهر: {customer['city']}\n"
-                        f"📅 تاریخ: {self._get_persian_date()}\n\n"
-                        f"📋 جزئیات سفارش:\n"
-                        f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n")
+        parts = [
+            _ORDER_HEADER_TPL %
+            (title, order_data['order_id'], self._sep, customer['name'],
+             customer['city'], self._get_persian_date(), self._sep)
+        ]
 
         # Add cart items
-        for i, item in enumerate(cart_items, 1):
-            item_total = item['price'] * item['quantity']
-            invoice_text += (
-                f"{persian_numbers(str(i))}. {item['product_name']}\n"
-                f"   📏 سایز: {item['size']}\n"
-                f"   📦 تعداد: {persian_numbers(str(item['quantity']))}\n"
-                f"   💰 قیمت: {format_price(item_total)} تومان\n\n")
-
-        # Add totals and payment terms
-        invoice_text += (
-            f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n"
-            f"💰 مبلغ کل: {format_price(subtotal)} تومان\n"
-            f"🎁 مبلغ تخفیف ({persian_numbers('25')}٪): {format_price(discount)} تومان\n"
-            f"💰 مبلغ نهایی: {format_price(total)} تومان\n"
-            f"💳 مبلغ پیش‌پرداخت ({persian_numbers('25')}٪): {format_price(advance_payment)} تومان\n\n"
-            f"💳 اطلاعات پرداخت پیش‌پرداخت:\n"
-            f"🏪 نام صاحب حساب: {self.bank_info['account_holder']}\n"
-            f"💳 شماره کارت: {self.bank_info['card_number']}\n"
-            f"🏦 شماره شبا: IR{self.bank_info['sheba_number']}\n\n"
-            f"📅 شرایط پرداخت:\n"
-            f"• پیش‌پرداخت 25٪ از مبلغ نهایی\n"
-            f"• مابقی 60 روز پس از تحویل\n"
-            f"• تخفیف ویژه 25٪ اعمال شده\n\n"
-            f"✅ پس از واریز پیش‌پرداخت، فیش واریزی را ارسال کنید.")
+        parts.extend(item_parts)
 
-        return invoice_text
+        # Add totals
+        lines = [
+            self._sep, f"💰 مبلغ کل: {format_price(subtotal)} تومان",
+            f"🎁 مبلغ تخفیف ({percent}٪): {format_price(discount)} تومان"
+        ]
+        if show_total:
+            lines.append(f"💰 مبلغ نهایی: {format_price(total)} تومان")
+        if show_advance:
+            advance_payment = _percent_of(total, 0.25)
+            lines.append(f"💳 مبلغ پیش‌پرداخت ({persian_numbers('25')}٪): "
+                         f"{format_price(advance_payment)} تومان")
+
+        # Add payment details
+        if bank_title:
+            lines.extend(["", bank_title, self._bank_block])
+        if footer:
+            lines.extend(["", footer])
+        parts.append("\n".join(lines))
+
+        return "".join(parts)
+
+    def _item_lines(
+            self, cart_items: List[Dict[str, Any]]) -> Tuple[List[str], int]:
+        """Invoice lines of every cart item with unit and total price
+
+        Returns the lines and the subtotal of the cart. The preview and the
+        final invoice usually render the same cart, so results are cached on
+        the rendered fields of the items.
+        """
+        lines, subtotal = _render_item_lines(tuple(map(_item_key,
+                                                       cart_items)))
+        return list(lines), subtotal
+
+    def _order_item_parts(
+            self, cart_items: List[Dict[str, Any]]) -> Tuple[List[str], int]:
+        """Order details block of every cart item with its total price
+
+        Returns the blocks and the subtotal of the cart.
+        """
+        parts = []
+        subtotal = 0
+        for i, (product_name, size, price,
+                quantity) in enumerate(map(_item_key, cart_items), 1):
+            item_total = price * quantity
+            subtotal += item_total
+            parts.append(_ORDER_ITEM_TPL %
+                         (persian_numbers(i), product_name, size,
+                          persian_numbers(quantity), format_price(item_total)))
+        return parts, subtotal
 
     def _get_persian_date(self) -> str:
         """Get current date in Persian format"""
-        # Return current Persian date: 1404/5/14
-        return persian_numbers("14 مرداد 1404")
+        return _persian_date_for(date.today().toordinal())
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+User Sessions
+Per-user conversation state kept by the bot handlers.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+
+@dataclass(slots=True)
+class UserSession:
+    """Conversation state of one user
+
+    Optional fields are None until the step that fills them in has run.
+    The payment dicts keep the per-flow keys the handlers already use.
+    """
+    authenticated: bool = False
+    customer: Optional[Dict[str, Any]] = None
+
+    # Input the bot is waiting for
+    awaiting_customer_code: bool = False
+    awaiting_curtain_height: bool = False
+    awaiting_check_photo: bool = False
+
+    # Product selection
+    selected_category: Optional[str] = None
+    selected_subcategory: Optional[str] = None
+    selected_product: Optional[Mapping[str, Any]] = None
+    selected_size: Optional[str] = None
+    selected_fabric: Optional[str] = None
+    selected_sewing_type: Optional[str] = None
+    selected_height: Optional[float] = None
+    filtered_products: Optional[Tuple[Mapping[str, Any], ...]] = None
+
+    # Payment and order
+    selected_payment_method: Optional[str] = None
+    payment_type: Optional[str] = None
+    payment_info: Optional[Dict[str, Any]] = None
+    check_payment_info: Optional[Dict[str, Any]] = None
+    check_photo: Optional[Dict[str, Any]] = None
+    receipt_photo: Optional[Dict[str, Any]] = None
+    remaining_payment: Optional[Dict[str, Any]] = None
+    pending_order: Optional[Dict[str, Any]] = None
+    order_info: Optional[Dict[str, Any]] = None
+    last_order_id: Optional[str] = None
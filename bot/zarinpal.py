@@ -5,13 +5,81 @@ ZarinPal Payment Integration
 Handles payment processing through ZarinPal gateway.
 """
 
-import requests
+import asyncio
+import httpx
 import json
+from collections import OrderedDict
+from types import MappingProxyType
 from typing import Dict, Any, Optional
 from utils.logger import setup_logger
 
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib encoder
+    orjson = None
+
 logger = setup_logger(__name__)
 
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Retry policy for transient gateway failures
+_MAX_RETRIES = 3
+_BACKOFF_FACTOR = 0.3
+_RETRY_STATUSES = frozenset((500, 502, 503, 504))
+# Failures that happen before the gateway can have seen the request
+_CONNECT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout)
+
+# Short connect timeout so a stalled handshake fails fast; the read budget
+# stays generous for the gateway's own processing time
+_TIMEOUT = httpx.Timeout(12.0, connect=3.05)
+
+# Verification can be repeated safely: if it has not answered after this
+# many seconds a second request is raced against the first
+_HEDGE_DELAY = 3.0
+
+# Verification statuses meaning the payment went through. 101 ("already
+# verified") is accepted because a hedged or retried verify reaches the
+# gateway twice and whichever answer lands first may be the duplicate's;
+# it carries the same RefID. The verification cache only short-circuits
+# repeat callbacks after a success was seen, so it cannot cover this race.
+_VERIFIED_STATUSES = frozenset((100, 101))
+
+# Successful verifications remembered to answer repeated callbacks locally
+_VERIFY_CACHE_SIZE = 1024
+
+# Persian messages for ZarinPal status codes
+_ERROR_MESSAGES = MappingProxyType({
+    -1: "اطلاعات ارسال شده ناقص است",
+    -2: "IP یا مرچنت کد پذیرنده صحیح نیست",
+    -3: "با توجه به محدودیت‌های شاپرک امکان پردازش وجود ندارد",
+    -4: "سطح تأیید پذیرنده پایین‌تر از سطح نقره‌ای است",
+    -11: "درخواست مورد نظر یافت نشد",
+    -12: "امکان ویرایش درخواست میسر نمی‌باشد",
+    -21: "هیچ نوع عملیات مالی برای این تراکنش یافت نشد",
+    -22: "تراکنش ناموفق می‌باشد",
+    -33: "رقم تراکنش با رقم پرداخت شده مطابقت ندارد",
+    -34: "سقف تقسیم تراکنش از لحاظ تعداد یا رقم عبور نموده است",
+    -40: "اجازه دسترسی به متد مربوطه وجود ندارد",
+    -41: "اطلاعات ارسال شده مربوط به AdditionalData غیر معتبر می‌باشد",
+    -42: "مدت زمان معتبر طول عمر شناسه پرداخت باید بین ۳۰ دقیقه تا ۴۵ روز باشد",
+    -54: "درخواست مورد نظر آرشیو شده است",
+})
+
+
+def _dumps(data: Dict[str, Any]) -> bytes:
+    """Encode a request body as JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data).encode()
+
+
+def _loads(content: bytes) -> Any:
+    """Decode a JSON response body"""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
 class ZarinPalGateway:
     """ZarinPal payment gateway integration"""
 
@@ -28,22 +96,50 @@ class ZarinPalGateway:
             self.verify_url = "https://www.zarinpal.com/pg/rest/WebGate/PaymentVerification.json"
             self.gateway_url = "https://www.zarinpal.com/pg/StartPay/"
 
-    def create_payment_request(self, amount: int, description: str, 
+        # Fixed part of every request body
+        self._request_template = {"MerchantID": merchant_id}
+
+        # (authority, amount) -> successful verification result, LRU order
+        self._verify_cache: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+
+        # Shared async client, created on first use inside the running event
+        # loop. It keeps the TLS connection alive between calls and lets
+        # concurrent payment operations run without blocking the bot.
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Return the shared HTTP client, creating it if needed"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=_TIMEOUT,
+                limits=httpx.Limits(max_connections=20,
+                                    max_keepalive_connections=8))
+        return self._client
+
+    async def close(self):
+        """Close the shared HTTP client at shutdown"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def create_payment_request(self, amount: int, description: str, 
                              callback_url: str, customer_email: str = "",
                              customer_mobile: str = "") -> Dict[str, Any]:
         """Create payment request"""
         try:
-            data = {
-                "MerchantID": self.merchant_id,
-                "Amount": amount,
-                "Description": description,
-                "CallbackURL": callback_url,
-                "Email": customer_email,
-                "Mobile": customer_mobile
-            }
+            data = dict(self._request_template,
+                        Amount=amount,
+                        Description=description,
+                        CallbackURL=callback_url,
+                        Email=customer_email,
+                        Mobile=customer_mobile)
 
-            response = requests.post(self.request_url, json=data, timeout=10)
-            result = response.json()
+            # Creating a payment is not idempotent: a request that reached
+            # the gateway must not be resent, or it may create a second
+            # authority
+            response = await self._post(self.request_url, data,
+                                        retry_reads=False)
+            result = _loads(response.content)
 
             if result["Status"] == 100:
                 authority = result["Authority"]
@@ -63,7 +159,7 @@ class ZarinPalGateway:
                     "error": error_msg
                 }
 
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"Request error: {e}")
             return {
                 "success": False,
@@ -76,26 +172,33 @@ class ZarinPalGateway:
                 "error": "خطای غیرمنتظره در ایجاد درخواست پرداخت"
             }
 
-    def verify_payment(self, authority: str, amount: int) -> Dict[str, Any]:
+    async def verify_payment(self, authority: str, amount: int) -> Dict[str, Any]:
         """Verify payment"""
+        key = (authority, amount)
+        cached = self._verify_cache.get(key)
+        if cached is not None:
+            self._verify_cache.move_to_end(key)
+            logger.info(f"Payment already verified. RefID: {cached['ref_id']}")
+            return dict(cached)
+
         try:
-            data = {
-                "MerchantID": self.merchant_id,
-                "Authority": authority,
-                "Amount": amount
-            }
+            data = dict(self._request_template,
+                        Authority=authority,
+                        Amount=amount)
 
-            response = requests.post(self.verify_url, json=data, timeout=10)
-            result = response.json()
+            response = await self._post_hedged(self.verify_url, data)
+            result = _loads(response.content)
 
-            if result["Status"] == 100:
-                ref_id = result["RefID"]
+            if result["Status"] in _VERIFIED_STATUSES:
+                ref_id = result.get("RefID")
                 logger.info(f"Payment verified successfully. RefID: {ref_id}")
-                return {
+                verified = {
                     "success": True,
                     "ref_id": ref_id,
                     "status": "verified"
                 }
+                self._remember_verification(key, verified)
+                return dict(verified)
             else:
                 error_msg = self._get_error_message(result["Status"])
                 logger.error(f"Payment verification failed: {error_msg}")
@@ -104,7 +207,7 @@ class ZarinPalGateway:
                     "error": error_msg
                 }
 
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"Request error during verification: {e}")
             return {
                 "success": False,
@@ -117,24 +220,71 @@ class ZarinPalGateway:
                 "error": "خطای غیرمنتظره در تأیید پرداخت"
             }
 
+    async def _post(self, url: str, data: Dict[str, Any],
+                    retry_reads: bool = True) -> httpx.Response:
+        """POST JSON to the gateway, retrying transient failures with backoff
+
+        Network errors and 5xx responses are retried up to _MAX_RETRIES times,
+        waiting _BACKOFF_FACTOR * 2**attempt seconds between attempts. With
+        retry_reads=False only connection failures are retried, for requests
+        that must not reach the gateway twice.
+        """
+        body = _dumps(data)
+        retry_errors = httpx.TransportError if retry_reads else _CONNECT_ERRORS
+        for attempt in range(_MAX_RETRIES + 1):
+            try:
+                response = await self._get_client().post(
+                    url, content=body, headers=_JSON_HEADERS)
+            except retry_errors as e:
+                if attempt == _MAX_RETRIES:
+                    raise
+                logger.warning(f"ZarinPal request failed, retrying: {e}")
+            else:
+                if (not retry_reads
+                        or response.status_code not in _RETRY_STATUSES
+                        or attempt == _MAX_RETRIES):
+                    return response
+                logger.warning(
+                    f"ZarinPal returned {response.status_code}, retrying")
+            await asyncio.sleep(_BACKOFF_FACTOR * 2**attempt)
+
+    async def _post_hedged(self, url: str,
+                           data: Dict[str, Any]) -> httpx.Response:
+        """POST a repeatable request, hedging it when the gateway is slow
+
+        If no answer arrives within _HEDGE_DELAY seconds a duplicate request
+        is sent and whichever succeeds first wins. Only safe for calls that
+        can be repeated and whose callers accept the repeat's answer, such
+        as payment verification, where the loser may see status 101.
+        """
+        tasks = [asyncio.ensure_future(self._post(url, data))]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=_HEDGE_DELAY)
+            if not done:
+                logger.warning("ZarinPal is slow to answer, hedging request")
+                tasks.append(asyncio.ensure_future(self._post(url, data)))
+
+            pending = set(tasks)
+            while True:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                if not pending:
+                    return done.pop().result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def _remember_verification(self, key: tuple, result: Dict[str, Any]):
+        """Cache a successful verification, evicting the oldest entry"""
+        self._verify_cache[key] = result
+        self._verify_cache.move_to_end(key)
+        if len(self._verify_cache) > _VERIFY_CACHE_SIZE:
+            self._verify_cache.popitem(last=False)
+
     def _get_error_message(self, status_code: int) -> str:
         """Get Persian error message for status code"""
-        error_messages = {
-            -1: "اطلاعات ارسال شده ناقص است",
-            -2: "IP یا مرچنت کد پذیرنده صحیح نیست",
-            -3: "با توجه به محدودیت‌های شاپرک امکان پردازش وجود ندارد",
-            -4: "سطح تأیید پذیرنده پایین‌تر از سطح نقره‌ای است",
-            -11: "درخواست مورد نظر یافت نشد",
-            -12: "امکان ویرایش درخواست میسر نمی‌باشد",
-            -21: "هیچ نوع عملیات مالی برای این تراکنش یافت نشد",
-            -22: "تراکنش ناموفق می‌باشد",
-            -33: "رقم تراکنش با رقم پرداخت شده مطابقت ندارد",
-            -34: "سقف تقسیم تراکنش از لحاظ تعداد یا رقم عبور نموده است",
-            -40: "اجازه دسترسی به متد مربوطه وجود ندارد",
-            -41: "اطلاعات ارسال شده مربوط به AdditionalData غیر معتبر می‌باشد",
-            -42: "مدت زمان معتبر طول عمر شناسه پرداخت باید بین ۳۰ دقیقه تا ۴۵ روز باشد",
-            -54: "درخواست مورد نظر آرشیو شده است",
-            101: "عملیات پرداخت موفق بوده و قبلاً PaymentVerification تراکنش انجام شده است"
-        }
-        
-        return error_messages.get(status_code, f"خطای نامشخص با کد {status_code}")
+        return _ERROR_MESSAGES.get(status_code,
+                                   f"خطای نامشخص با کد {status_code}")
@@ -6,15 +6,71 @@ Handles payment processing through ZarinPal gateway.
 
 import requests
 import json
-from typing import Dict, Any, Optional
+import logging
+from collections import OrderedDict
+from requests.adapters import HTTPAdapter
+from types import MappingProxyType
+from typing import Dict, Any, ClassVar, Mapping, Optional, Tuple
+from urllib3.util.retry import Retry
 from utils.logger import setup_logger
 
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib encoder
+    orjson = None
+
 logger = setup_logger(__name__)
 
+# (connect, read): fail fast on a stalled handshake, wait for the gateway
+_TIMEOUT = (3.05, 12)
+
+# Successful verifications remembered to answer repeated callbacks locally
+_VERIFY_CACHE_SIZE = 1024
+
+
+def _dumps(data: Dict[str, Any]) -> bytes:
+    """Encode a request body as UTF-8 JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False).encode()
+
+
+def _loads(content: bytes) -> Any:
+    """Decode a JSON response body
+
+    orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers
+    handle both parsers with the same except clause.
+    """
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
 
 class ZarinPalGateway:
     """ZarinPal payment gateway integration"""
 
+    # Persian messages for ZarinPal status codes
+    _ERROR_MESSAGES: ClassVar[Mapping[int, str]] = MappingProxyType({
+        -1: "اطلاعات ارسال شده ناقص است",
+        -2: "IP یا مرچنت کد پذیرنده صحیح نیست",
+        -3: "با توجه به محدودیت‌های شاپرک امکان پردازش وجود ندارد",
+        -4: "سطح تأیید پذیرنده پایین‌تر از سطح نقره‌ای است",
+        -11: "درخواست مورد نظر یافت نشد",
+        -12: "امکان ویرایش درخواست میسر نمی‌باشد",
+        -21: "هیچ نوع عملیات مالی برای این تراکنش یافت نشد",
+        -22: "تراکنش ناموفق می‌باشد",
+        -33: "رقم تراکنش با رقم پرداخت شده مطابقت ندارد",
+        -34: "سقف تقسیم تراکنش از لحاظ تعداد یا رقم عبور نموده است",
+        -40: "اجازه دسترسی به متد مربوطه وجود ندارد",
+        -41: "اطلاعات ارسال شده مربوط به AdditionalData غیر معتبر می‌باشد",
+        -42:
+        "مدت زمان معتبر طول عمر شناسه پرداخت باید بین ۳۰ دقیقه تا ۴۵ روز باشد",
+        -54: "درخواست مورد نظر آرشیو شده است",
+        101:
+        "عملیات پرداخت موفق بوده و قبلاً PaymentVerification تراکنش انجام شده است",
+        -999: "خطای نامشخص - پاسخ از سرور دریافت نشد"
+    })
+
     def __init__(self, merchant_id: str, sandbox: bool = True):
         self.merchant_id = merchant_id
         self.sandbox = sandbox
@@ -24,11 +80,59 @@ class ZarinPalGateway:
             self.request_url = "https://sandbox.zarinpal.com/pg/rest/WebGate/PaymentRequest.json"
             self.verify_url = "https://sandbox.zarinpal.com/pg/rest/WebGate/PaymentVerification.json"
             self.gateway_url = "https://sandbox.zarinpal.com/pg/StartPay/"
+            # Fixed part of every request body and the request headers
+            self._request_template = {"MerchantID": merchant_id}
+            self._headers = {'Content-Type': 'application/json'}
+            # Request/response shapes differ per API version; pick them once
+            self._build_payment_request = self._v3_payment_request
+            self._build_verify_request = self._v3_verify_request
+            self._parse_response = self._v3_parse_response
         else:
             # Production URLs - API v4
             self.request_url = "https://api.zarinpal.com/pg/v4/payment/request/"
             self.verify_url = "https://api.zarinpal.com/pg/v4/payment/verify/"
             self.gateway_url = "https://www.zarinpal.com/pg/StartPay/"
+            self._request_template = {"merchant_id": merchant_id}
+            self._headers = {
+                'Content-Type': 'application/json',
+                'Accept': 'application/json'
+            }
+            self._build_payment_request = self._v4_payment_request
+            self._build_verify_request = self._v4_verify_request
+            self._parse_response = self._v4_parse_response
+
+        # (authority, amount) -> successful verification result, LRU order
+        self._verify_cache: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+
+        # Keep-alive session: the TLS handshake is paid once per connection
+        # instead of once per call; gateway hiccups are retried with backoff
+        retry = Retry(total=2,
+                      backoff_factor=0.3,
+                      status_forcelist=[502, 503, 504],
+                      allowed_methods=frozenset(['POST']))
+        self._session = requests.Session()
+        self._session.mount(
+            "https://",
+            HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry))
+        # Creating a payment is not idempotent, so a request that may have
+        # reached the gateway is never resent; only failed connects retry.
+        # The longer prefix wins over the adapter above.
+        connect_retry = Retry(total=2, connect=2, read=0, status=0,
+                              backoff_factor=0.3)
+        self._session.mount(
+            self.request_url,
+            HTTPAdapter(pool_connections=1, pool_maxsize=16,
+                        max_retries=connect_retry))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Release the pooled connections"""
+        self._session.close()
 
     def create_payment_request(self,
                                amount: int,
@@ -38,46 +142,24 @@ class ZarinPalGateway:
                                customer_mobile: str = "") -> Dict[str, Any]:
         """Create payment request"""
         try:
-            if self.sandbox:
-                # Sandbox API (v3 format)
-                data = {
-                    "MerchantID": self.merchant_id,
-                    "Amount": amount,
-                    "Description": description,
-                    "CallbackURL": callback_url,
-                    "Email": customer_email,
-                    "Mobile": customer_mobile
-                }
-                headers = {'Content-Type': 'application/json'}
-            else:
-                # Production API (v4 format)
-                data = {
-                    "merchant_id": self.merchant_id,
-                    "amount": amount,
-                    "description": description,
-                    "callback_url": callback_url,
-                    "metadata": {
-                        "email": customer_email,
-                        "mobile": customer_mobile
-                    }
-                }
-                headers = {
-                    'Content-Type': 'application/json',
-                    'Accept': 'application/json'
-                }
+            data = self._build_payment_request(amount, description,
+                                               callback_url, customer_email,
+                                               customer_mobile)
 
+            body = _dumps(data)
             logger.info(f"Sending payment request to: {self.request_url}")
-            logger.info(
-                f"Request data: {json.dumps(data, ensure_ascii=False)}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Request data: %s", body.decode())
 
-            response = requests.post(self.request_url,
-                                     json=data,
-                                     headers=headers,
-                                     timeout=15)
+            response = self._session.post(self.request_url,
+                                          data=body,
+                                          headers=self._headers,
+                                          timeout=_TIMEOUT)
 
-            logger.info(f"Response status: {response.status_code}")
-            logger.info(f"Response headers: {dict(response.headers)}")
-            logger.info(f"Response text: {response.text}")
+            logger.info("Response status: %s", response.status_code)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Response headers: %r", response.headers)
+                logger.debug("Response text: %s", response.text)
 
             if response.status_code != 200:
                 return {
@@ -86,48 +168,25 @@ class ZarinPalGateway:
                     f"HTTP Error {response.status_code}: {response.text}"
                 }
 
-            result = response.json()
-
-            if self.sandbox:
-                # Sandbox response format
-                if result.get("Status") == 100:
-                    authority = result.get("Authority")
-                    payment_url = f"{self.gateway_url}{authority}"
-
-                    logger.info(
-                        f"Payment request created successfully. Authority: {authority}"
-                    )
-                    return {
-                        "success": True,
-                        "authority": authority,
-                        "payment_url": payment_url
-                    }
-                else:
-                    error_msg = self._get_error_message(
-                        result.get("Status", -999))
-                    logger.error(
-                        f"ZarinPal payment request failed: {error_msg}")
-                    return {"success": False, "error": error_msg}
+            result = _loads(response.content)
+
+            payload, error_msg = self._parse_response(result)
+
+            if payload is not None:
+                authority = payload.get("authority")
+                payment_url = f"{self.gateway_url}{authority}"
+
+                logger.info(
+                    f"Payment request created successfully. Authority: {authority}"
+                )
+                return {
+                    "success": True,
+                    "authority": authority,
+                    "payment_url": payment_url
+                }
             else:
-                # Production response format
-                if result.get("data") and result["data"].get("code") == 100:
-                    authority = result["data"].get("authority")
-                    payment_url = f"{self.gateway_url}{authority}"
-
-                    logger.info(
-                        f"Payment request created successfully. Authority: {authority}"
-                    )
-                    return {
-                        "success": True,
-                        "authority": authority,
-                        "payment_url": payment_url
-                    }
-                else:
-                    error_msg = result.get("errors",
-                                           {}).get("message", "خطای نامشخص")
-                    logger.error(
-                        f"ZarinPal payment request failed: {error_msg}")
-                    return {"success": False, "error": error_msg}
+                logger.error(f"ZarinPal payment request failed: {error_msg}")
+                return {"success": False, "error": error_msg}
 
         except requests.exceptions.Timeout:
             logger.error("Request timeout")
@@ -158,37 +217,27 @@ class ZarinPalGateway:
 
     def verify_payment(self, authority: str, amount: int) -> Dict[str, Any]:
         """Verify payment"""
+        key = (authority, amount)
+        cached = self._verify_cache.get(key)
+        if cached is not None:
+            self._verify_cache.move_to_end(key)
+            logger.info(f"Payment already verified. RefID: {cached['ref_id']}")
+            return dict(cached)
+
         try:
-            if self.sandbox:
-                # Sandbox API (v3 format)
-                data = {
-                    "MerchantID": self.merchant_id,
-                    "Authority": authority,
-                    "Amount": amount
-                }
-                headers = {'Content-Type': 'application/json'}
-            else:
-                # Production API (v4 format)
-                data = {
-                    "merchant_id": self.merchant_id,
-                    "authority": authority,
-                    "amount": amount
-                }
-                headers = {
-                    'Content-Type': 'application/json',
-                    'Accept': 'application/json'
-                }
+            data = self._build_verify_request(authority, amount)
 
             logger.info(f"Verifying payment with authority: {authority}")
 
-            response = requests.post(self.verify_url,
-                                     json=data,
-                                     headers=headers,
-                                     timeout=15)
+            response = self._session.post(self.verify_url,
+                                          data=_dumps(data),
+                                          headers=self._headers,
+                                          timeout=_TIMEOUT)
 
-            logger.info(
-                f"Verification response status: {response.status_code}")
-            logger.info(f"Verification response: {response.text}")
+            logger.info("Verification response status: %s",
+                        response.status_code)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Verification response: %s", response.text)
 
             if response.status_code != 200:
                 return {
@@ -197,40 +246,23 @@ class ZarinPalGateway:
                     f"HTTP Error {response.status_code}: {response.text}"
                 }
 
-            result = response.json()
-
-            if self.sandbox:
-                # Sandbox response format
-                if result.get("Status") == 100:
-                    ref_id = result.get("RefID")
-                    logger.info(
-                        f"Payment verified successfully. RefID: {ref_id}")
-                    return {
-                        "success": True,
-                        "ref_id": ref_id,
-                        "status": "verified"
-                    }
-                else:
-                    error_msg = self._get_error_message(
-                        result.get("Status", -999))
-                    logger.error(f"Payment verification failed: {error_msg}")
-                    return {"success": False, "error": error_msg}
+            result = _loads(response.content)
+
+            payload, error_msg = self._parse_response(result)
+
+            if payload is not None:
+                ref_id = payload.get("ref_id")
+                logger.info(f"Payment verified successfully. RefID: {ref_id}")
+                verified = {
+                    "success": True,
+                    "ref_id": ref_id,
+                    "status": "verified"
+                }
+                self._remember_verification(key, verified)
+                return dict(verified)
             else:
-                # Production response format
-                if result.get("data") and result["data"].get("code") == 100:
-                    ref_id = result["data"].get("ref_id")
-                    logger.info(
-                        f"Payment verified successfully. RefID: {ref_id}")
-                    return {
-                        "success": True,
-                        "ref_id": ref_id,
-                        "status": "verified"
-                    }
-                else:
-                    error_msg = result.get("errors",
-                                           {}).get("message", "خطای نامشخص")
-                    logger.error(f"Payment verification failed: {error_msg}")
-                    return {"success": False, "error": error_msg}
+                logger.error(f"Payment verification failed: {error_msg}")
+                return {"success": False, "error": error_msg}
 
         except requests.exceptions.Timeout:
             logger.error("Verification request timeout")
@@ -257,28 +289,69 @@ class ZarinPalGateway:
                 "error": "خطای غیرمنتظره در تأیید پرداخت"
             }
 
+    def _v3_payment_request(self, amount: int, description: str,
+                            callback_url: str, customer_email: str,
+                            customer_mobile: str) -> Dict[str, Any]:
+        """Sandbox (v3) payment request body"""
+        return dict(self._request_template,
+                    Amount=amount,
+                    Description=description,
+                    CallbackURL=callback_url,
+                    Email=customer_email,
+                    Mobile=customer_mobile)
+
+    def _v4_payment_request(self, amount: int, description: str,
+                            callback_url: str, customer_email: str,
+                            customer_mobile: str) -> Dict[str, Any]:
+        """Production (v4) payment request body"""
+        return dict(self._request_template,
+                    amount=amount,
+                    description=description,
+                    callback_url=callback_url,
+                    metadata={
+                        "email": customer_email,
+                        "mobile": customer_mobile
+                    })
+
+    def _v3_verify_request(self, authority: str,
+                           amount: int) -> Dict[str, Any]:
+        """Sandbox (v3) verification body"""
+        return dict(self._request_template, Authority=authority, Amount=amount)
+
+    def _v4_verify_request(self, authority: str,
+                           amount: int) -> Dict[str, Any]:
+        """Production (v4) verification body"""
+        return dict(self._request_template, authority=authority, amount=amount)
+
+    def _v3_parse_response(
+            self, result: Dict[str, Any]
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """Return (payload, None) for a successful sandbox response,
+        or (None, error message) otherwise"""
+        if result.get("Status") == 100:
+            return {
+                "authority": result.get("Authority"),
+                "ref_id": result.get("RefID")
+            }, None
+        return None, self._get_error_message(result.get("Status", -999))
+
+    def _v4_parse_response(
+            self, result: Dict[str, Any]
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """Return (payload, None) for a successful production response,
+        or (None, error message) otherwise"""
+        if result.get("data") and result["data"].get("code") == 100:
+            return result["data"], None
+        return None, result.get("errors", {}).get("message", "خطای نامشخص")
+
+    def _remember_verification(self, key: tuple, result: Dict[str, Any]):
+        """Cache a successful verification, evicting the oldest entry"""
+        self._verify_cache[key] = result
+        self._verify_cache.move_to_end(key)
+        if len(self._verify_cache) > _VERIFY_CACHE_SIZE:
+            self._verify_cache.popitem(last=False)
+
     def _get_error_message(self, status_code: int) -> str:
         """Get Persian error message for status code"""
-        error_messages = {
-            -1: "اطلاعات ارسال شده ناقص است",
-            -2: "IP یا مرچنت کد پذیرنده صحیح نیست",
-            -3: "با توجه به محدودیت‌های شاپرک امکان پردازش وجود ندارد",
-            -4: "سطح تأیید پذیرنده پایین‌تر از سطح نقره‌ای است",
-            -11: "درخواست مورد نظر یافت نشد",
-            -12: "امکان ویرایش درخواست میسر نمی‌باشد",
-            -21: "هیچ نوع عملیات مالی برای این تراکنش یافت نشد",
-            -22: "تراکنش ناموفق می‌باشد",
-            -33: "رقم تراکنش با رقم پرداخت شده مطابقت ندارد",
-            -34: "سقف تقسیم تراکنش از لحاظ تعداد یا رقم عبور نموده است",
-            -40: "اجازه دسترسی به متد مربوطه وجود ندارد",
-            -41: "اطلاعات ارسال شده مربوط به AdditionalData غیر معتبر می‌باشد",
-            -42:
-            "مدت زمان معتبر طول عمر شناسه پرداخت باید بین ۳۰ دقیقه تا ۴۵ روز باشد",
-            -54: "درخواست مورد نظر آرشیو شده است",
-            101:
-            "عملیات پرداخت موفق بوده و قبلاً PaymentVerification تراکنش انجام شده است",
-            -999: "خطای نامشخص - پاسخ از سرور دریافت نشد"
-        }
-
-        return error_messages.get(status_code,
-                                  f"خطای نامشخص با کد {status_code}")
+        return self._ERROR_MESSAGES.get(status_code,
+                                        f"خطای نامشخص با کد {status_code}")
@@ -7,30 +7,35 @@ Run this script daily to send payment reminders for 90-day payment plans.
 
 import asyncio
 import sys
-import os
-
-# Add project root to path
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from bot.payment_reminder import run_daily_reminder_check
 from utils.logger import setup_logger
 
 logger = setup_logger(__name__)
 
+# Wall-clock budget for one run, so a hung endpoint cannot overlap the next cron run
+REMINDER_JOB_TIMEOUT = 600
+
 async def main():
     """Main function to run daily reminders"""
     logger.info("Starting daily payment reminder check...")
     
     try:
-        await run_daily_reminder_check()
+        await asyncio.wait_for(run_daily_reminder_check(), timeout=REMINDER_JOB_TIMEOUT)
         logger.info("Daily payment reminder check completed successfully")
         
+    except asyncio.TimeoutError:
+        logger.error("Daily reminder check exceeded its 10 minute budget")
+        return 2
     except Exception as e:
         logger.error(f"Error in daily reminder check: {e}")
         return 1
     
     return 0
 
+def main_sync():
+    """Entry point for cron: run the check and exit with its status"""
+    sys.exit(asyncio.run(main()))
+
 if __name__ == "__main__":
-    exit_code = asyncio.run(main())
-    sys.exit(exit_code)
+    main_sync()
@@ -1,7 +1,9 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-from typing import List, Dict, Any, Optional
+import unicodedata
+from types import MappingProxyType
+from typing import List, Dict, Any, Mapping, Optional, Tuple
 
 # Persian alphabet for search
 PERSIAN_ALPHABET = [
@@ -46,7 +48,7 @@ SPECIAL_PRODUCT_PRICES = {
 }
 
 # Product categories with updated icons and search characters
-PRODUCT_CATEGORIES = {
+PRODUCT_CATEGORIES: Mapping[str, Dict[str, Any]] = MappingProxyType({
     'baby': {
         'name':
         '👶 کالای خواب نوزاد',
@@ -484,68 +486,180 @@ PRODUCT_CATEGORIES = {
             'search_char': 'م'
         }]
     }
-}
-
-
-def get_products_by_category(category_id: str) -> List[Dict[str, Any]]:
+})
+
+# Bumped whenever the catalog above is edited at runtime, so caches built
+# from it know they are stale.
+_DATA_VERSION = 0
+
+
+def get_data_version() -> int:
+    """Get the current catalog version"""
+    return _DATA_VERSION
+
+
+def bump_data_version() -> int:
+    """Mark the catalog as changed after a runtime edit"""
+    global _DATA_VERSION
+    _DATA_VERSION += 1
+    return _DATA_VERSION
+
+
+# Lookup tables derived from PRODUCT_CATEGORIES, rebuilt when the catalog
+# version changes. Products in them are read-only copies with category_id
+# (and special_price, by id) filled in once, shared by every caller, and the
+# lookups below return the shared tuples directly. Callers that need to
+# modify a product or a result must copy it first.
+Product = Mapping[str, Any]
+_PRODUCT_INDEX: Dict[str, Product] = {}
+_CATEGORY_PRODUCTS: Dict[str, Tuple[Product, ...]] = {}
+# category_id -> first letter of search_char -> products
+_SEARCH_INDEX: Dict[str, Dict[str, Tuple[Product, ...]]] = {}
+# category_id -> icon -> products
+_ICON_INDEX: Dict[str, Dict[str, Tuple[Product, ...]]] = {}
+# category_id -> (icon, name, id) for each product, for the icon keyboards
+_CATEGORY_ICON_TUPLES: Dict[str, Tuple[Tuple[str, str, str], ...]] = {}
+# (category_id, size or fabric) -> price, with (category_id, None) holding
+# the category's base price. Special per-product prices are checked first.
+_PRICE_TABLE: Dict[Tuple[str, Optional[str]], int] = {}
+# category_id -> character trie over normalised product names. Each node maps
+# the next character to its child node, and '' to the products whose names
+# start with the prefix spelled by the path to that node.
+_NAME_TRIES: Dict[str, Dict[str, Any]] = {}
+_index_version = -1
+
+
+def _name_key(text: str) -> str:
+    """Normalise a product name or query for prefix matching"""
+    return unicodedata.normalize('NFC', text).casefold()
+
+
+def _freeze_trie(node: Dict[str, Any]):
+    """Turn the product lists collected in a trie into shared tuples"""
+    for char, child in node.items():
+        if char:
+            child[''] = tuple(child[''])
+            _freeze_trie(child)
+
+
+def _refresh_indexes():
+    """Rebuild the lookup tables if the catalog changed since the last build"""
+    global _index_version
+    if _index_version == _DATA_VERSION:
+        return
+
+    _PRODUCT_INDEX.clear()
+    _CATEGORY_PRODUCTS.clear()
+    _SEARCH_INDEX.clear()
+    _ICON_INDEX.clear()
+    _NAME_TRIES.clear()
+    _CATEGORY_ICON_TUPLES.clear()
+    _PRICE_TABLE.clear()
+    for category_id, price in PRODUCT_PRICES.items():
+        _PRICE_TABLE[(category_id, None)] = price
+    for size, price in TABLECLOTH_SIZE_PRICES.items():
+        _PRICE_TABLE[('tablecloth', size)] = price
+    for fabric, price in CURTAIN_FABRIC_PRICES.items():
+        _PRICE_TABLE[('curtain_only', fabric)] = price
+    for category_id, category_info in PRODUCT_CATEGORIES.items():
+        products = []
+        by_letter: Dict[str, List[Product]] = {}
+        by_icon: Dict[str, List[Product]] = {}
+        for product in category_info.get('products', []):
+            product_id = product['id']
+            baked = MappingProxyType(dict(product, category_id=category_id))
+            products.append(baked)
+            search_char = product.get('search_char', '')
+            if search_char:
+                by_letter.setdefault(search_char[0], []).append(baked)
+            by_icon.setdefault(product.get('icon', '🛍️'), []).append(baked)
+            # First category wins, as with the old linear search
+            if product_id not in _PRODUCT_INDEX:
+                if product_id in SPECIAL_PRODUCT_PRICES:
+                    baked = MappingProxyType(dict(
+                        baked, special_price=SPECIAL_PRODUCT_PRICES[product_id]))
+                _PRODUCT_INDEX[product_id] = baked
+        _CATEGORY_PRODUCTS[category_id] = tuple(products)
+        _CATEGORY_ICON_TUPLES[category_id] = tuple(
+            (product.get('icon', '🛍️'), product['name'], product['id'])
+            for product in products)
+        _SEARCH_INDEX[category_id] = {
+            letter: tuple(matches)
+            for letter, matches in by_letter.items()
+        }
+        _ICON_INDEX[category_id] = {
+            icon: tuple(matches)
+            for icon, matches in by_icon.items()
+        }
+        trie: Dict[str, Any] = {}
+        for baked in products:
+            node = trie
+            for char in _name_key(baked['name']):
+                node = node.setdefault(char, {})
+                node.setdefault('', []).append(baked)
+        _freeze_trie(trie)
+        _NAME_TRIES[category_id] = trie
+    _index_version = _DATA_VERSION
+
+
+def get_products_by_category(category_id: str) -> Tuple[Product, ...]:
     """Get all products for a specific category"""
-    category = PRODUCT_CATEGORIES.get(category_id, {})
-    products = category.get('products', [])
-
-    # Add category_id to each product
-    for product in products:
-        product['category_id'] = category_id
-
-    return products
+    _refresh_indexes()
+    return _CATEGORY_PRODUCTS.get(category_id, ())
 
 
-def get_product_by_id(product_id: str) -> Optional[Dict[str, Any]]:
+def get_product_by_id(product_id: str) -> Optional[Product]:
     """Find a product by its ID across all categories"""
-    for category_id, category_info in PRODUCT_CATEGORIES.items():
-        for product in category_info.get('products', []):
-            if product['id'] == product_id:
-                product['category_id'] = category_id
-                # Add special price if exists
-                if product_id in SPECIAL_PRODUCT_PRICES:
-                    product['special_price'] = SPECIAL_PRODUCT_PRICES[
-                        product_id]
-                return product
-    return None
+    _refresh_indexes()
+    return _PRODUCT_INDEX.get(product_id)
 
 
 def get_product_price(product_id: str, category_id: str, size: str = None, fabric: str = None) -> int:
     """Get price for a specific product, checking for special pricing first"""
-    if product_id in SPECIAL_PRODUCT_PRICES:
-        return SPECIAL_PRODUCT_PRICES[product_id]
-    
-    # Size-based pricing for tablecloth category
-    if category_id == 'tablecloth' and size and size in TABLECLOTH_SIZE_PRICES:
-        return TABLECLOTH_SIZE_PRICES[size]
-    
-    # Fabric-based pricing for curtains
-    if category_id == 'curtain_only' and fabric and fabric in CURTAIN_FABRIC_PRICES:
-        return CURTAIN_FABRIC_PRICES[fabric]
-    
-    return PRODUCT_PRICES.get(category_id, 2800000)
+    price = SPECIAL_PRODUCT_PRICES.get(product_id)
+    if price is not None:
+        return price
+
+    _refresh_indexes()
+    # Tablecloths are priced by size and curtains by fabric
+    if category_id == 'tablecloth':
+        option = size
+    elif category_id == 'curtain_only':
+        option = fabric
+    else:
+        option = None
+
+    price = _PRICE_TABLE.get((category_id, option))
+    if price is None and option is not None:
+        price = _PRICE_TABLE.get((category_id, None))
+    return 2800000 if price is None else price
 
 
 def search_products_by_name(
         category_id: str,
         search_letter: str,
-        subcategory_id: Optional[str] = None) -> List[Dict[str, Any]]:
-    """Search products by first letter in a category"""
+        subcategory_id: Optional[str] = None) -> Tuple[Product, ...]:
+    """Search products by first letter in a category
+    
+    A single letter matches the products' search_char, as used by the
+    alphabet keyboard. Longer text is matched as a prefix of product names.
+    """
     # Handle subcategory mapping
     actual_category = subcategory_id if subcategory_id else category_id
 
-    products = get_products_by_category(actual_category)
+    if not search_letter:
+        return get_products_by_category(actual_category)
 
-    # Filter by first letter
-    filtered_products = []
-    for product in products:
-        if product.get('search_char', '').startswith(search_letter):
-            filtered_products.append(product)
+    _refresh_indexes()
+    if len(search_letter) == 1:
+        return _SEARCH_INDEX.get(actual_category, {}).get(search_letter, ())
 
-    return filtered_products
+    node = _NAME_TRIES.get(actual_category, {})
+    for char in _name_key(search_letter):
+        node = node.get(char)
+        if node is None:
+            return ()
+    return node.get('', ())
 
 
 def get_category_info(category_id: str) -> Dict[str, Any]:
@@ -558,30 +672,17 @@ def get_all_categories() -> Dict[str, Any]:
     return PRODUCT_CATEGORIES
 
 
-def get_category_product_icons(category_id: str) -> List[tuple]:
-    """Get individual products with their icons and descriptions for a category"""
-    products = get_products_by_category(category_id)
-
-    # Return individual products instead of grouping
-    result = []
-    for product in products:
-        icon = product.get('icon', '🛍️')
-        description = product['name']  # Just the product name without emoji
-        result.append((icon, description,
-                       product['id']))  # Include product ID for callback
+def get_category_product_icons(category_id: str) -> Tuple[Tuple[str, str, str], ...]:
+    """Get individual products with their icons and descriptions for a category
 
-    return result
+    Each entry is (icon, product name, product ID for the callback).
+    """
+    _refresh_indexes()
+    return _CATEGORY_ICON_TUPLES.get(category_id, ())
 
 
 def search_products_by_icon(category_id: str,
-                            target_icon: str) -> List[Dict[str, Any]]:
+                            target_icon: str) -> Tuple[Product, ...]:
     """Search products by icon in a category"""
-    products = get_products_by_category(category_id)
-
-    # Filter by icon
-    filtered_products = []
-    for product in products:
-        if product.get('icon', '🛍️') == target_icon:
-            filtered_products.append(product)
-
-    return filtered_products
+    _refresh_indexes()
+    return _ICON_INDEX.get(category_id, {}).get(target_icon, ())
@@ -5,15 +5,57 @@ DecoTeen Telegram Bot - Main Entry Point
 """
 
 import logging
-from telegram.ext import ApplicationBuilder
+import os
+import tempfile
+from telegram.ext import AIORateLimiter, ApplicationBuilder
 from bot.handlers import BotHandlers
 from bot.config import Config
 from utils.logger import setup_logger
 from reminder_scheduler import reminder_scheduler
 
+try:
+    import fcntl
+except ImportError:  # not available on Windows; run without the guard
+    fcntl = None
+
 # تنظیم لاگر
 logger = setup_logger(__name__)
 
+# Held for the life of the process so only one instance polls Telegram
+LOCK_FILE = os.path.join(tempfile.gettempdir(), "decoteen_bot.lock")
+
+
+def acquire_instance_lock():
+    """Take the single-instance lock
+
+    Returns the open lock file, which must stay open while the bot runs,
+    or None if another instance already holds the lock.
+    """
+    lock_file = open(LOCK_FILE, "a")
+    if fcntl is None:
+        return lock_file
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return None
+    return lock_file
+
+
+def build_rate_limiter():
+    """Create the limiter that keeps outbound calls within Telegram's limits
+
+    It queues requests above the global and per-group rates and retries
+    ones Telegram answers with RetryAfter. Returns None when the optional
+    aiolimiter dependency (python-telegram-bot[rate-limiter]) is missing.
+    """
+    try:
+        return AIORateLimiter(max_retries=3)
+    except RuntimeError:
+        logger.warning(
+            "⚠️ aiolimiter not installed - outbound messages are not rate limited")
+        return None
+
 
 def main():
     """تابع اصلی برای اجرای ربات"""
@@ -28,12 +70,30 @@ def main():
 
         config.print_config_status()
 
-        # ایجاد Application
-        app = ApplicationBuilder().token(config.bot_token).build()
+        # A second instance would only fight the first one for updates
+        instance_lock = acquire_instance_lock()
+        if instance_lock is None:
+            logger.error("❌ Another bot instance is already running")
+            print("❌ نمونه دیگری از ربات در حال اجراست")
+            return
 
         # ایجاد handlers
         bot_handlers = BotHandlers()
 
+        async def shutdown_handlers(_app):
+            """Stop the group chat workers and release the payment
+            gateway's HTTP connections on shutdown"""
+            await bot_handlers.stop_chat_workers()
+            await bot_handlers.zarinpal.close()
+
+        # ایجاد Application
+        builder = ApplicationBuilder().token(config.bot_token).post_shutdown(
+            shutdown_handlers)
+        rate_limiter = build_rate_limiter()
+        if rate_limiter is not None:
+            builder = builder.rate_limiter(rate_limiter)
+        app = builder.build()
+
         # تنظیم handlers
         bot_handlers.setup_handlers(app)
 
@@ -45,23 +105,15 @@ def main():
         print("✅ ربات شروع شد...")
         print("🔔 سیستم یادآوری فعال شد...")
 
-        # Add error handling for multiple bot instances
-        try:
-            app.run_polling(
-                allowed_updates=["message", "callback_query"],
-                drop_pending_updates=True,
-                timeout=30,
-                read_timeout=10,
-                write_timeout=10,
-                connect_timeout=10,
-                pool_timeout=10
-            )
-        except Exception as polling_error:
-            logger.error(f"Polling error: {polling_error}")
-            # Wait a bit before potentially restarting
-            import time
-            time.sleep(5)
-            raise
+        app.run_polling(
+            allowed_updates=["message", "callback_query"],
+            drop_pending_updates=True,
+            timeout=30,
+            read_timeout=10,
+            write_timeout=10,
+            connect_timeout=10,
+            pool_timeout=10
+        )
 
     except Exception as e:
         logger.error(f"❌ Error starting bot: {e}")
@@ -4,8 +4,9 @@ Persian Language Utilities
 Helper functions for Persian text processing and formatting.
 """
 
+import functools
 import re
-from typing import Union
+from typing import Tuple, Union
 
 # Persian to English digit mapping
 PERSIAN_DIGITS = '۰۱۲۳۴۵۶۷۸۹'
@@ -15,17 +16,42 @@ ENGLISH_DIGITS = '0123456789'
 PERSIAN_TO_ENGLISH = str.maketrans(PERSIAN_DIGITS, ENGLISH_DIGITS)
 ENGLISH_TO_PERSIAN = str.maketrans(ENGLISH_DIGITS, PERSIAN_DIGITS)
 
-def persian_numbers(text: str) -> str:
+# Persian (Solar Hijri) month names
+PERSIAN_MONTHS = (
+    'فروردین', 'اردیبهشت', 'خرداد', 'تیر', 'مرداد', 'شهریور',
+    'مهر', 'آبان', 'آذر', 'دی', 'بهمن', 'اسفند'
+)
+
+@functools.lru_cache(maxsize=4096)
+def _persian_int(number: int) -> str:
+    """
+    Write a whole number with Persian digits
+    
+    Args:
+        number: Number to convert
+    
+    Returns:
+        Number string with Persian digits
+    """
+    return str(number).translate(ENGLISH_TO_PERSIAN)
+
+def persian_numbers(text: Union[str, int]) -> str:
     """
     Convert English numbers to Persian numbers
     
     Args:
-        text: Text containing English digits
+        text: Text containing English digits, or a number to write out
     
     Returns:
         Text with Persian digits
     """
-    return text.translate(ENGLISH_TO_PERSIAN)
+    if isinstance(text, str):
+        return text.translate(ENGLISH_TO_PERSIAN)
+    # Counts and indexes repeat heavily, so whole numbers share a cache;
+    # bool is excluded since True would hit the entry for 1
+    if type(text) is int:
+        return _persian_int(text)
+    return str(text).translate(ENGLISH_TO_PERSIAN)
 
 def english_numbers(text: str) -> str:
     """
@@ -39,6 +65,21 @@ def english_numbers(text: str) -> str:
     """
     return text.translate(PERSIAN_TO_ENGLISH)
 
+@functools.lru_cache(maxsize=4096)
+def _format_int_price(price: int) -> str:
+    """
+    Format a whole price with Persian digits and thousand separators
+    
+    Args:
+        price: Price value
+    
+    Returns:
+        Formatted price string
+    """
+    # Add thousand separators and convert to Persian digits in one pass
+    # through the prebuilt translation table
+    return f"{price:,}".translate(ENGLISH_TO_PERSIAN)
+
 def format_price(price: Union[int, float]) -> str:
     """
     Format price with Persian number separators
@@ -52,13 +93,40 @@ def format_price(price: Union[int, float]) -> str:
     if isinstance(price, float):
         price = int(price)
     
-    # Add thousand separators
-    price_str = f"{price:,}"
+    # Floats are truncated first so that every amount sharing a whole
+    # value shares one cache entry
+    return _format_int_price(price)
+
+def gregorian_to_jalali(year: int, month: int, day: int) -> Tuple[int, int, int]:
+    """
+    Convert a Gregorian date to the Persian (Jalali) calendar
     
-    # Convert to Persian digits
-    price_str = persian_numbers(price_str)
+    Args:
+        year: Gregorian year
+        month: Gregorian month (1-12)
+        day: Gregorian day of month
     
-    return price_str
+    Returns:
+        (year, month, day) in the Jalali calendar
+    """
+    month_offsets = (0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334)
+    leap_year = year + 1 if month > 2 else year
+    days = (355666 + 365 * year + (leap_year + 3) // 4 -
+            (leap_year + 99) // 100 + (leap_year + 399) // 400 + day +
+            month_offsets[month - 1])
+    
+    jalali_year = -1595 + 33 * (days // 12053)
+    days %= 12053
+    jalali_year += 4 * (days // 1461)
+    days %= 1461
+    if days > 365:
+        jalali_year += (days - 1) // 365
+        days = (days - 1) % 365
+    
+    # First six months have 31 days, the rest 30 (29 in Esfand)
+    if days < 186:
+        return jalali_year, 1 + days // 31, 1 + days % 31
+    return jalali_year, 7 + (days - 186) // 30, 1 + (days - 186) % 30
 
 def clean_persian_text(text: str) -> str:
     """